@@ -5,22 +5,66 @@
 #
 ##########################################################################
 
-from PyQt6.QtWidgets import QApplication, QMainWindow, QDialog, QMessageBox, QStatusBar
-from PyQt6.QtGui import QIntValidator, QDoubleValidator, QMovie, QIcon, QPixmap
-from PyQt6.uic import loadUi
-from PyQt6.QtCore import QTimer
-import pyqtgraph as pg
-import random
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QStatusBar, QInputDialog, QFileDialog, \
+    QProgressDialog
+from PyQt6.QtGui import QDoubleValidator, QIcon
+from PyQt6.QtCore import QTimer, Qt
+from ui_loader import setup_ui
+from gif_cache import GifCache, GifPlayer, GIF_CACHE_BUDGET
+from gif_library import GifLibrary
+from app_paths import BUNDLED_GIF_ROOT, user_gif_root
+from latency import now_ns
+from session_store import SessionStore
+from session import SessionEngine
+from error_log import ERROR_LOG_CAPACITY, ErrorLog
+from error_log_model import ErrorLogModel, ErrorLogFilter
+from operators import OPERATORS
+from worksheets import WorksheetJob
+from data_export import ExportJob
+import argparse
+import getpass
+import html
 import os
-import math
-import glob
+import sys
+# Question controls visible for each (operator layout, vertical display)
+QUESTION_LAYOUTS = {
+    ("binary", False): ("inp_1", "lbl_operator", "inp_2", "lbl_equal", "inp_result"),
+    ("power", False): ("inp_2", "inp_power_y", "lbl_equal", "inp_result"),
+    ("sqrt", False): ("inp_2", "lbl_equal", "inp_result"),
+    ("binary", True): ("lbl_inp1", "lbl_operator_1", "lbl_inp2", "lbl_equal", "inp_result"),
+    ("power", True): ("lbl_inp2", "inp_power_y1", "lbl_equal", "inp_result"),
+    ("sqrt", True): ("lbl_inp2", "lbl_equal", "inp_result"),
+}
+QUESTION_CONTROLS = sorted({name for names in QUESTION_LAYOUTS.values() for name in names})
+# Time the answer feedback is shown before the next question in the auto advance mode (milliseconds)
+AUTO_ADVANCE_DELAY = 1500
+# Progress of the worksheet export is read this often, the dialog shows up only for longer exports (milliseconds)
+WORKSHEET_POLL_MS = 100
+WORKSHEET_PROGRESS_DELAY_MS = 500
+# The answer export is polled and shown the same way
+EXPORT_POLL_MS = 100
+EXPORT_PROGRESS_DELAY_MS = 500
+# Slots measured when the application runs with a profiler
+PROFILED_SLOTS = ("validate_result", "start_testing", "show_time", "display_image")
 # pyinstaller --windowed --icon=adalan_icon.ico --add-data="*.ui;."  --add-data="adalan_icon.png;." --add-data="adalan_icon.ico;." --add-data="gifs/;gifs/"  Adalan.py
 
 
+def error_text(error):
+    """
+    Returns the message shown for an error of a background job, with the type of the unexpected ones
+    """
+    if isinstance(error, (OSError, ValueError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}".rstrip(": ")
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, seed=None, gif_cache_budget=GIF_CACHE_BUDGET, gif_root=None, store=None,
+                 error_log_capacity=ERROR_LOG_CAPACITY, profiler=None, recorder=None):
         super().__init__()
-        loadUi("Adalan.ui", self)
+        setup_ui(self, "Adalan.ui")
+        # Clock of the question and answer times, replays set the recorded times
+        self.clock = now_ns
         self.setMaximumWidth(self.width())
         self.setMaximumHeight(self.height())
         self.adalan_version = "2.0"
@@ -32,66 +76,105 @@ class MainWindow(QMainWindow):
         self.count = 0
         self.total_questions = 10
         self.operator_list = []
-        self.operator_dict = {"Addition": "+", "Subtraction": "-", "Multiplication": "X",
-                              "Division": "/", "Square":"x2", "Cube":"x3", "SquareRoot": "sqrt"}
-        self.total_correct = 0
-        self.total_wrong = 0
-        self.movie = None
-        self.passed_gif = None
-        self.failed_gif = None
-        self.answer_response_time = []
-        self.question_index = []
+        # Questions, answers and scores are handled by the session engine, shared with the terminal mode
+        self.engine = SessionEngine(seed, store if store is not None else SessionStore())
+        self.store = self.engine.store
+        # Running test, created when the first question is asked
+        self.test = None
+        self.question = None
+        # Next question of the test, prepared while the feedback of the previous answer is shown
+        self.prepared_question = None
+        # Slots are wrapped before they are connected to the signals
+        self.recorder = recorder
+        self.profiler = profiler
+        if recorder is not None:
+            recorder.attach(self)
+        if profiler is not None:
+            profiler.instrument(self, PROFILED_SLOTS)
+        self.menuDebug.menuAction().setVisible(profiler is not None)
+        self.gif_root = gif_root or user_gif_root()
+        self.gif_library = None
+        # Gifs are decoded in the background and scaled to the display size
+        display_size = self.lbl_disp.contentsRect().size()
+        self.gif_cache = GifCache(display_size.width(), display_size.height(), budget=gif_cache_budget)
+        self.gif_player = GifPlayer(self.lbl_disp)
+        # Next gif to show for correct (True) and wrong (False) answers
+        self.next_gif = {True: None, False: None}
+        # Results dialog, created for the first test and reused
+        self.results = None
+        # Analytics of every saved test, created when it is first shown
+        self.analytics = None
+        # Every answer is saved for the student taking the test
+        self.student = getpass.getuser()
         # To display vertically
         self.vertical_display = False
         self.local_gif = False
 
         # vertical display
         self.vertical_display = False
-        self.lbl_inp1.hide()
-        self.lbl_inp2.hide()
-        self.lbl_operator_1.hide()
-        self.inp_power_y1.hide()
+        # Question controls shown for each (operator layout, vertical display), the others are hidden
+        self.question_layouts = {key: frozenset(getattr(self, name) for name in names)
+                                 for key, names in QUESTION_LAYOUTS.items()}
+        self.visible_controls = frozenset(getattr(self, name) for name in QUESTION_CONTROLS)
 
         # Icon
         self.setWindowIcon(QIcon('adalan_icon.png'))
 
         self.lbl_score_board.setStyleSheet("border-image : url(gifs/scoreboard.jpg);background-position: center;")
-        # Check if local folder is created and has giffs
-        # if os.path.exists("C:\\adalan\\gifs\\correct_gif") and os.path.exists("C:\\adalan\\gifs\\wrong_gif"):
-        if len(glob.glob("C:\\adalan\\gifs\\correct_gif\\*.gif")) != 0 or len(glob.glob("C:\\adalan\\gifs\\wrong_gif\\*.gif")) != 0:
-            self.local_gif = True
 
         # Status barlbl_score_board
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
-        msg = f"Welcome to Adalan {self.adalan_version}. Press Start Test button to start the test. You can use Enter key from keyboard for entering answers and moving to the next question..."
+        msg = f"Welcome to Adalan {self.adalan_version}, {self.student}. Press Start Test button to start the test. You can use Enter key from keyboard for entering answers and moving to the next question..."
         self.status_message(msg)
 
         # Initialization the UI components
         self.chk_add.setChecked(True)
         self.operator_list.append(self.chk_add.text())
-        self.txt_errors.appendPlainText("Wrong answers\n")
+        # Wrong answers log
+        self.error_model = ErrorLogModel(ErrorLog(error_log_capacity), self)
+        self.error_filter = ErrorLogFilter(self.error_model, self)
+        self.tbl_errors.setModel(self.error_filter)
+        self.cmb_error_filter.addItem("Wrong answers - all operators", None)
+        for name in OPERATORS:
+            self.cmb_error_filter.addItem(name, name)
+        self.cmb_error_filter.currentIndexChanged.connect(
+            lambda index: self.error_filter.set_operator(self.cmb_error_filter.itemData(index)))
 
         # Time initialization
         self.timer = QTimer()
         self.timer.timeout.connect(self.show_time)
+        # Auto advance to the next question
+        self.auto_advance_delay = AUTO_ADVANCE_DELAY
+        self.advance_timer = QTimer()
+        self.advance_timer.setSingleShot(True)
+        self.advance_timer.timeout.connect(self.start_testing)
+        # Worksheets written in the background, polled to show the progress
+        self.worksheet_job = None
+        self.worksheet_progress = None
+        self.worksheet_timer = QTimer(self)
+        self.worksheet_timer.setInterval(WORKSHEET_POLL_MS)
+        self.worksheet_timer.timeout.connect(self.poll_worksheets)
+        # Answers exported in the background
+        self.export_job = None
+        self.export_progress = None
+        self.export_timer = QTimer(self)
+        self.export_timer.setInterval(EXPORT_POLL_MS)
+        self.export_timer.timeout.connect(self.poll_export)
         self.dial_delay.setValue(5)
         self.lbl_delay.setText(str(self.dial_delay.value()) + " seconds")
 
-        # Operator selection
-        self.chk_add.stateChanged.connect(lambda : self.op_state(self.chk_add))
-        self.chk_sub.stateChanged.connect(lambda : self.op_state(self.chk_sub))
-        self.chk_mul.stateChanged.connect(lambda : self.op_state(self.chk_mul))
-        self.chk_div.stateChanged.connect(lambda : self.op_state(self.chk_div))
-        self.chk_square.stateChanged.connect(lambda : self.op_state(self.chk_square))
-        self.chk_cbrt.stateChanged.connect(lambda : self.op_state(self.chk_cbrt))
-        self.chk_sqrt.stateChanged.connect(lambda : self.op_state(self.chk_sqrt))
+        # Operator selection, the check box text is the name of the registered operator
+        self.operator_checkboxes = (self.chk_add, self.chk_sub, self.chk_mul, self.chk_div, self.chk_square,
+                                    self.chk_cbrt, self.chk_sqrt, self.chk_percentage, self.chk_fraction,
+                                    self.chk_exponent, self.chk_two_step)
+        for chkbox in self.operator_checkboxes:
+            chkbox.stateChanged.connect(lambda state, chkbox=chkbox: self.op_state(chkbox))
 
         # Vertical display button
         # self.chk_vertical.stateChanged.connect(lambda : self.vertical_change(self.chk_vertical))
 
         # hide inputs
-        self.inp_power_y.hide()
         self.hide_controls()
 
         # Input number validation
@@ -126,6 +209,14 @@ class MainWindow(QMainWindow):
         self.menu_about.triggered.connect(self.about_adalan)
         self.menu_user_gif.triggered.connect(self.setting_local_gif)
         self.menu_req.triggered.connect(self.menu_requirements)
+        self.menu_live_results.triggered.connect(self.show_live_results)
+        self.menu_analytics.triggered.connect(self.show_analytics)
+        self.menu_change_student.triggered.connect(self.change_student)
+        self.menu_export_errors.triggered.connect(self.export_errors)
+        self.menu_export_worksheets.triggered.connect(self.export_worksheets)
+        self.menu_export_answers.triggered.connect(self.export_answers)
+        self.menu_slot_timings.triggered.connect(self.show_slot_timings)
+        self.menu_save_slot_timings.triggered.connect(self.save_slot_timings)
 
         self.inp_1.textChanged.connect(self.lbl_inp1.setText)
         self.inp_2.textChanged.connect(self.lbl_inp2.setText)
@@ -134,7 +225,8 @@ class MainWindow(QMainWindow):
 
         # Default options for ui
         self.disable_user_input()  # disable user inputs
-        self.update_gifs()
+        # Scan the gif folders once the window is shown
+        QTimer.singleShot(0, self.update_gifs)
 
     def status_message(self, msg):
         self.statusBar.clearMessage()
@@ -171,10 +263,10 @@ class MainWindow(QMainWindow):
         """
         message = f"Adalan {self.adalan_version} can pick up user downloaded gif files.\n" \
                   "If you want your own gif files for results animation do the following\n\n" \
-                  "1. Create folder C:\\adalan\\gifs\\\n" \
+                  f"1. Create folder {self.gif_root}\n" \
                   "2. Create two sub folder correct_gif and wrong_gif inside gifs folder \n" \
-                  " 2a. C:\\adalan\\gifs\\correct_gif and\n " \
-                  " 2b. C:\\Adalan\\gifs\\wrong_gif\n" \
+                  f" 2a. {os.path.join(self.gif_root, 'correct_gif')} and\n " \
+                  f" 2b. {os.path.join(self.gif_root, 'wrong_gif')}\n" \
                   "3. Copy the gif you want to show if the answer is correct in correct_gif folder\n" \
                   "4. Copy the gif you want to show if the answer is wrong in wrong_gif folder\n\n" \
                   "You will now see the gif files you stored from the local folders.\n" \
@@ -195,44 +287,238 @@ class MainWindow(QMainWindow):
 
         QMessageBox.about(self, f"About Adalan {self.adalan_version}", message)
 
-    def update_gifs(self):
+    def change_student(self):
+        """
+        Asks the name of the student taking the next test
+        """
+        if self.test is not None:
+            QMessageBox.information(self, "Test in progress", "The student can be changed once the test is completed")
+            return
+        name, ok = QInputDialog.getText(self, "Student", "Name of the student", text=self.student)
+        if ok and name.strip():
+            self.student = name.strip()
+            self.status_message(f"Welcome {self.student}. Press Start Test button to start the test.")
+
+    def test_settings(self):
+        """
+        Returns the settings of the test
+        """
+        return {"range": [self.slider_min, self.slider_position], "total_questions": self.inp_total_question.value(),
+                "delay": self.dial_delay.value(), "operators": list(self.operator_list),
+                "vertical": self.chk_vertical.isChecked(), "adaptive": self.chk_adaptive.isChecked(),
+                "no_repeat": self.chk_no_repeat.isChecked()}
+
+    def apply_test_settings(self, settings):
+        """
+        Sets the controls to the settings of a test, the opposite of test_settings
+        """
+        self.int_range.setValue(settings["range"][1])
+        self.inp_total_question.setValue(settings["total_questions"])
+        self.dial_delay.setValue(settings["delay"])
+        for chkbox in self.operator_checkboxes:
+            chkbox.setChecked(chkbox.text() in settings["operators"])
+        # The operators are asked in the order they were chosen
+        self.operator_list = list(settings["operators"])
+        self.chk_vertical.setChecked(settings.get("vertical", False))
+        self.chk_adaptive.setChecked(settings.get("adaptive", False))
+        self.chk_no_repeat.setChecked(settings.get("no_repeat", False))
+
+    def export_errors(self):
+        """
+        Saves the wrong answers shown in the log to a CSV file
+        """
+        path, _ = QFileDialog.getSaveFileName(self, "Export wrong answers", "wrong_answers.csv", "CSV files (*.csv)")
+        if path:
+            self.error_model.error_log.export_csv(path, self.cmb_error_filter.currentData())
+            self.status_message(f"Wrong answers saved to {path}")
+
+    def export_worksheets(self):
         """
-        Update gifs
+        Writes printable worksheets and their answer key with the current settings, on a background thread
         """
+        if self.worksheet_job is not None:
+            QMessageBox.information(self, "Export worksheets", "Worksheets are already being written")
+            return
+        if len(self.operator_list) == 0:
+            QMessageBox.critical(self, "No operator is chosen !!!", "Chose at least one operator")
+            return
+        pages, ok = QInputDialog.getInt(self, "Export worksheets", "Number of pages", 10, 1, 100000)
+        if not ok:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export worksheets", "worksheets.pdf",
+                                              "PDF files (*.pdf);;HTML files (*.html)")
+        if not path:
+            return
+        settings = self.test_settings()
+        self.worksheet_job = WorksheetJob(path, pages, *settings["range"], settings["operators"],
+                                          settings["vertical"], settings["no_repeat"])
+        self.worksheet_progress = QProgressDialog("Writing worksheets", "Cancel", 0, pages, self)
+        self.worksheet_progress.setWindowTitle("Export worksheets")
+        self.worksheet_progress.setMinimumDuration(WORKSHEET_PROGRESS_DELAY_MS)
+        self.worksheet_progress.canceled.connect(self.worksheet_job.cancel)
+        self.worksheet_timer.start()
+
+    def poll_worksheets(self):
+        """
+        Shows the pages written by the worksheet job and its result when it is done
+        """
+        job = self.worksheet_job
+        if not job.done():
+            if not job.cancelled():
+                self.worksheet_progress.setValue(job.pages_written)
+                self.worksheet_progress.setLabelText(f"Writing worksheets, page {job.pages_written} of {job.pages}")
+            return
+        self.worksheet_timer.stop()
+        self.worksheet_progress.canceled.disconnect()
+        self.worksheet_progress.close()
+        self.worksheet_progress.deleteLater()
+        self.worksheet_progress = None
+        self.worksheet_job = None
+        if job.error is not None:
+            QMessageBox.critical(self, "Export worksheets", error_text(job.error))
+        elif job.result is None:
+            self.status_message("Worksheet export cancelled")
+        else:
+            result = job.result
+            self.status_message(f"{result['pages']} pages saved to {result['worksheet']}, answer key {result['key']}")
+
+    def export_answers(self):
+        """
+        Saves every stored answer to a CSV, Parquet or Arrow file, on a background thread
+        """
+        if self.export_job is not None:
+            QMessageBox.information(self, "Export answer history", "The answers are already being exported")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export answer history", "answers.csv",
+                                              "CSV files (*.csv);;Parquet files (*.parquet);;Arrow files (*.arrow)")
+        if not path:
+            return
+        self.export_job = ExportJob(self.engine.store, path)
+        # The number of answers is not known before they are read, the dialog shows a busy bar
+        self.export_progress = QProgressDialog("Exporting answers", "Cancel", 0, 0, self)
+        self.export_progress.setWindowTitle("Export answer history")
+        self.export_progress.setMinimumDuration(EXPORT_PROGRESS_DELAY_MS)
+        self.export_progress.canceled.connect(self.export_job.cancel)
+        self.export_timer.start()
+
+    def poll_export(self):
+        """
+        Shows the answers written by the export job and its result when it is done
+        """
+        job = self.export_job
+        if not job.done():
+            if not job.cancelled():
+                self.export_progress.setLabelText(f"Exporting answers, {job.rows_written} written")
+            return
+        self.export_timer.stop()
+        self.export_progress.canceled.disconnect()
+        self.export_progress.close()
+        self.export_progress.deleteLater()
+        self.export_progress = None
+        self.export_job = None
+        if job.error is not None:
+            QMessageBox.critical(self, "Export answer history", error_text(job.error))
+        elif job.result is None:
+            self.status_message("Answer export cancelled")
+        else:
+            self.status_message(f"{job.result} answers saved to {job.path}")
 
+    def show_slot_timings(self):
+        """
+        Shows the times of the profiled slots
+        """
+        box = QMessageBox(self)
+        box.setWindowTitle("Slot timings")
+        box.setTextFormat(Qt.TextFormat.RichText)
+        box.setText(f"<pre>{html.escape(self.profiler.report())}</pre>")
+        box.exec()
+        # Owned by the window, it would live until the window is closed
+        box.deleteLater()
+
+    def save_slot_timings(self):
+        """
+        Saves the times of the profiled slots to a JSON or Prometheus text file
+        """
+        path, _ = QFileDialog.getSaveFileName(self, "Save slot timings", "slot_timings.json",
+                                              "JSON files (*.json);;Prometheus text (*.prom)")
+        if path:
+            self.profiler.dump(path)
+            self.status_message(f"Slot timings saved to {path}")
+
+    def results_view(self):
+        """
+        Returns the results dialog, it is created the first time it is needed
+        """
+        if self.results is None:
+            # pyqtgraph is only needed for the results
+            from results import ShowResults
+            if self.profiler is not None:
+                ShowResults = self.profiler.wrap("ShowResults.__init__", ShowResults)
+            self.results = ShowResults(patent=self)
+        return self.results
+
+    def show_live_results(self):
+        """
+        Shows the results of the running test, the dialog is updated after each answer
+        """
+        dialog = self.results_view()
+        dialog.show()
+        dialog.raise_()
+
+    def show_analytics(self):
+        """
+        Shows the trends of every saved test, the dialog is refreshed after each test
+        """
+        if self.analytics is None:
+            from analytics import AnalyticsDialog
+            self.analytics = AnalyticsDialog(self.store, self)
+        self.analytics.show()
+        self.analytics.raise_()
+
+    def update_gifs(self):
+        """
+        Update gifs. The user gifs are used if the user folder has gifs, otherwise the gifs shipped with Adalan.
+        Only the folders changed since the last start are scanned again.
+        """
+        user_library = GifLibrary(self.gif_root)
+        self.local_gif = user_library.has_gifs()
         if self.local_gif:
-            self.passed_gif = ([file for file in os.listdir('C:\\adalan\\gifs\\correct_gif') if file.endswith('.gif')])
-            self.failed_gif = ([file for file in os.listdir('C:\\adalan\\gifs\\wrong_gif') if file.endswith('.gif')])
+            self.gif_library = user_library
         else:
-            self.passed_gif = ([file for file in os.listdir('gifs/correct_gif') if file.endswith('.gif')])
-            self.failed_gif = ([file for file in os.listdir('gifs/wrong_gif') if file.endswith('.gif')])
+            self.gif_library = GifLibrary(BUNDLED_GIF_ROOT)
+            self.gif_library.refresh()
+        self.prefetch_gifs()
+
+    def choose_gif(self, status):
+        """
+        Picks a random gif file for the answer status
+        """
+        if self.gif_library is None:
+            return None
+        return self.gif_library.choose(status)
+
+    def prefetch_gifs(self):
+        """
+        Picks the next correct and wrong gifs and starts decoding them in the background
+        """
+        self.next_gif = {True: self.choose_gif(True), False: self.choose_gif(False)}
+        self.gif_cache.prefetch(self.next_gif[True], self.next_gif[False])
 
     def display_image(self, status):
         """
         Displaying images
         """
-        if status:
-            if self.local_gif:
-                gif_file = "C:\\adalan\\gifs\\correct_gif\\" + random.choice(self.passed_gif)
-            else:
-                gif_file = "gifs/correct_gif/" + random.choice(self.passed_gif)
-            self.movie = QMovie(gif_file)
-        else:
-            if self.local_gif:
-                gif_file = "C:\\adalan\\gifs\\wrong_gif\\" + random.choice(self.failed_gif)
-            else:
-                gif_file = "gifs/wrong_gif/" + random.choice(self.failed_gif)
-            self.movie = QMovie(gif_file)
-
-        self.lbl_disp.setMovie(self.movie)
-        self.lbl_disp.setScaledContents(True)
-        self.movie.start()
+        gif_file = self.next_gif[status] or self.choose_gif(status)
+        if gif_file is not None:
+            # Shown once decoded, the feedback text does not wait for the gif
+            self.gif_player.play_when_ready(self.gif_cache.request(gif_file))
+        self.prefetch_gifs()
 
     def stop_image(self):
         """
         Method which stops the image
         """
-        self.lbl_disp.clear()
+        self.gif_player.stop()
 
     def set_dial_text(self):
         """
@@ -273,94 +559,28 @@ class MainWindow(QMainWindow):
         self.lbl_upper_limt.setText(str(val))
         self.slider_position = val
 
-    def get_random(self, start=1, end=100):
+    def show_controls(self, layout, vertical_control):
         """
-        this method will return a random number between start and end value
-        :param start: stating of the random number
-        :param end:  ending range of the random-number
-        :return random_num: random number between start and end
+        Displays controls
+        :param layout: layout of the operator, "binary", "power" or "sqrt"
+        :param vertical_control: True to display the question vertically
         """
-        random_num = random.randint(start, end)
-        return random_num
+        self.set_question_controls(self.question_layouts[(layout, bool(vertical_control))])
 
-    def show_controls(self, operator, vertical_control):
+    def hide_controls(self):
         """
-        Displays controls
+        Hides controls
         """
-        if vertical_control:
-            # print("Vertical ui is on")
-            self.inp_1.hide()
-            self.inp_2.hide()
-            self.inp_power_y.hide()
-            self.lbl_operator.hide()
-
-            if operator == "x2" or operator == "x3":
-                self.lbl_inp1.hide()
-                self.lbl_operator_1.hide()
-                self.lbl_inp2.show()
-                self.inp_power_y1.show()
-            elif operator == "sqrt":
-                self.lbl_operator.hide()
-                self.lbl_inp1.hide()
-                self.lbl_inp1.hide()
-                self.lbl_operator_1.hide()
-                self.inp_power_y.hide()
-                self.lbl_inp2.show()
-                self.inp_power_y1.hide()
-            else:
-                self.lbl_inp1.show()
-                self.lbl_operator_1.show()
-                self.lbl_inp2.show()
-                self.inp_power_y1.hide()
-        else:
-            # print("Vertical ui is off")
-            if operator == "x2" or operator == "x3":
-                self.inp_1.hide()
-                self.lbl_operator.hide()
-                self.inp_2.show()
-                self.inp_power_y.show()
-                self.lbl_operator_1.hide()
-                self.inp_power_y1.hide()
-                self.lbl_inp1.hide()
-                self.lbl_inp2.hide()
-            elif operator == "sqrt":
-                self.inp_1.hide()
-                self.lbl_operator.hide()
-                self.inp_2.show()
-                self.inp_power_y.hide()
-                self.lbl_operator_1.hide()
-                self.inp_power_y1.hide()
-                self.lbl_inp1.hide()
-                self.lbl_inp2.hide()
-            else:
-                self.inp_1.show()
-                self.inp_2.show()
-                self.lbl_operator.show()
-                self.inp_power_y.hide()
-                self.lbl_inp1.hide()
-                self.lbl_inp2.hide()
-                self.lbl_operator_1.hide()
-
-        # Default ui's
-        self.inp_result.show()
-        self.lbl_equal.show()
-
-    def hide_controls(self, operator=None):
+        self.set_question_controls(frozenset())
+
+    def set_question_controls(self, visible):
         """
-        Hides controls
+        Shows the question controls in visible and hides the others. Only the controls whose visibility
+        changes are touched.
         """
-        # print("Vertical ui is on")
-        self.inp_1.hide()
-        self.inp_2.hide()
-        self.lbl_operator.hide()
-        self.lbl_inp1.hide()
-        self.lbl_inp2.hide()
-        self.lbl_operator_1.hide()
-        # Default ui's
-        self.inp_result.hide()
-        self.lbl_equal.hide()
-        self.inp_power_y.hide()
-        self.inp_power_y1.hide()
+        for control in visible.symmetric_difference(self.visible_controls):
+            control.setVisible(control in visible)
+        self.visible_controls = visible
 
     def disable_user_input(self):
         self.btn_start.setEnabled(True)
@@ -385,6 +605,7 @@ class MainWindow(QMainWindow):
             # print("Throw error to select at least one operator")
             QMessageBox.critical(self, "No operator is chosen !!!", "Chose at least one operator")
         else:
+            self.advance_timer.stop()
             self.lbl_ans_status.hide()
             self.lock_ui()
             # local vertical display
@@ -398,135 +619,74 @@ class MainWindow(QMainWindow):
             self.start = True
             # print("Test in progress...")
 
-            # Generate x and y parameters
-            x = self.get_random(self.slider_min, self.slider_position)
-            y = self.get_random(self.slider_min, self.slider_position)
-            operator = self.operator_dict[random.choice(self.operator_list)]
+            # Generate all the questions of the test when the first question is asked
+            if self.test is None:
+                self.test = self.engine.new_session(self.student, self.test_settings())
+                self.chk_adaptive.setEnabled(False)
+                self.results_view().start_test(self.test.total_questions)
+            # Usually prepared during the feedback of the previous answer, only the controls are shown now
+            self.prepare_question()
+            self.question = self.prepared_question
+            self.prepared_question = None
 
             # Based on the operator show and hide controls
-            self.show_controls(operator=operator, vertical_control=self.chk_vertical.isChecked())
-
-            # Handle divide by division
-            if operator == "/":
-                if x == 0 and y == 0:
-                    x = 1
-                    y = 1
-                res = 1
-                if y == 0:
-                    tmp_val = x
-                    x = y
-                    y = tmp_val
-                res = x * y
-                x = res
-
-            if operator == "x2":
-                # print("Executing square")
-                self.inp_1.setText(str(x))
-                self.inp_2.setText(str(y))
-                self.lbl_operator.setText("x2")
-                self.inp_power_y.setText("2")
-            elif operator == "x3":
-                # print("Executing cube")
-                self.inp_1.setText(str(x))
-                self.inp_2.setText(str(y))
-                self.lbl_operator.setText("x3")
-                self.inp_power_y.setText("3")
-            elif operator == "sqrt":
-                self.lbl_operator.setText("sqrt")
-                self.inp_1.setText(str(x))
-                self.inp_2.setText(f"√{x}")
-                self.inp_power_y.setText(str(x))
-            else:
-                self.inp_1.setText(str(x))
-                self.lbl_operator.setText(operator)
-                self.inp_2.setText(str(y))
+            self.show_controls(layout=self.question.operator.layout, vertical_control=self.chk_vertical.isChecked())
+            self.test.shown(self.clock())
+
+    def prepare_question(self):
+        """
+        Takes the next question of the test and writes it to the question controls, they stay hidden until
+        the question is asked
+        """
+        if self.test is None or self.test.finished or self.prepared_question is not None:
+            return
+        question = self.test.next_question()
+        left, symbol, right, power = question.operator.render(question)
+        self.inp_1.setText(left)
+        self.lbl_operator.setText(symbol)
+        self.inp_2.setText(right)
+        self.inp_power_y.setText(power)
+        self.prepared_question = question
 
     def validate_result(self):
         """
         This method will validate the answers
         """
-        operator = self.lbl_operator.text()
-        if self.inp_result.text() == "":
-            result = 0
-        else:
-            if operator == "sqrt":
-                result = float(self.inp_result.text())
-            else:
-                result = int(self.inp_result.text())
+        answered_ns = self.clock()
+        question = self.question
+        operator = question.operator
+        result = operator.parse_answer(self.inp_result.text())
+
+        # Evaluate statement, the test saves the answer and updates the score
+        answer = self.test.answer(result, answered_ns)
+        result_status = answer.correct
+        tmp_cnt = answer.number
 
         # update the status
-        tmp_cnt = self.inp_total_question.value() - self.total_questions + 1
-        per_complete = int((tmp_cnt / self.inp_total_question.value()) * 100)
-        completion_txt = f"{tmp_cnt}/{self.inp_total_question.value()}  {per_complete} % Completed "
+        per_complete = int((tmp_cnt / self.test.total_questions) * 100)
+        completion_txt = f"{tmp_cnt}/{self.test.total_questions}  {per_complete} % Completed "
         self.lbl_completion_status.setText(completion_txt)
 
         # Fill up the response time
-        time = self.dial_delay.value() - int(self.lbl_timer.text())
-        self.answer_response_time.append(time)
-        self.question_index.append(tmp_cnt)
-
-        if operator == "x2" or operator == "x3":
-            x = int(self.inp_1.text())
-            y = int(self.inp_2.text())
-        elif operator == "sqrt":
-            x = int(self.inp_power_y.text())
-            y = int(self.inp_power_y.text())
-        else:
-            x = int(self.inp_1.text())
-            y = int(self.inp_2.text())
+        time = answer.latency_ns / 1e9
 
+        if operator.layout == "binary":
             # First clear x and y
             self.inp_1.clear()
             self.inp_2.clear()
             self.inp_result.clear()
             self.lbl_operator.clear()
 
-        result_status = False
-        correct_ans = 0
-        # Evaluate statement
-        if operator == "+":
-            correct_ans = x + y
-            result_status = (result == correct_ans)
-        elif operator == "-":
-            correct_ans = x - y
-            result_status = (result == correct_ans)
-        elif operator == "X":
-            correct_ans = x * y
-            result_status = (result == correct_ans)
-        elif operator == "/":
-            correct_ans = round(x / y)
-            result_status = (result == correct_ans)
-        elif operator == "x2":
-            correct_ans = y * y
-            result_status = (result == correct_ans)
-        elif operator == "x3":
-            correct_ans = y * y * y
-            result_status = (result == correct_ans)
-        elif operator == "sqrt":
-            correct_ans = round(math.sqrt(x), 2)
-            result_status = (result == correct_ans)
-
-        # print(f"{result_status} {x} {operator} {y} = {result}")
+        self.results.add_answer(tmp_cnt, time, result_status)
+
         if result_status:
-            self.total_correct += 1
             self.display_image(result_status)
             self.lbl_ans_status.setStyleSheet("background-color : green")
             self.lbl_ans_status.setText("Correct Answer !!!")
             self.status_message(f"Correct answer.. Press the Enter key from your keyboard to get the next question")
         else:
-            self.total_wrong += 1
-            if operator == "x2":
-                tmp = f"{y} x {y}"
-            if operator == "x3":
-                tmp = f"{y} x {y} x {y}"
             self.status_message("The answer you entered is not correct... Press the Enter key from your keyboard to get the next question")
-
-            if operator == "x2" or operator == "x3":
-                self.txt_errors.appendPlainText(f"(Q-{self.total_questions}) {tmp} = {correct_ans}  You entered: {result}\n-------------------------------------")
-            elif operator == "sqrt":
-                self.txt_errors.appendPlainText(f"(Q-{self.total_questions}) √{x} = {correct_ans}  You entered: {result}\n-------------------------------------")
-            else:
-                self.txt_errors.appendPlainText(f"(Q-{self.total_questions}) {x} {operator} {y} = {correct_ans}  You entered: {result}\n-------------------------------------")
+            self.error_model.add(tmp_cnt, question, result)
 
             self.display_image(result_status)
             self.lbl_ans_status.setStyleSheet("background-color : red")
@@ -534,8 +694,8 @@ class MainWindow(QMainWindow):
 
         self.total_questions -= 1
         self.lbl_ques_cnt.setText(str(self.total_questions))
-        self.lbl_passed_cnt.setText(str(self.total_correct))
-        self.lbl_failed_cnt.setText(str(self.total_wrong))
+        self.lbl_passed_cnt.setText(str(self.test.total_correct))
+        self.lbl_failed_cnt.setText(str(self.test.total_wrong))
         self.inp_result.setText("")
         self.start = False
         self.count = self.dial_delay.value()
@@ -543,27 +703,53 @@ class MainWindow(QMainWindow):
         self.btn_start.show()
         self.lbl_ans_status.show()
 
-        if self.total_questions == 0:
+        if self.test.finished:
+            self.test = None
+            self.chk_adaptive.setEnabled(True)
             self.reset_ui()
-            dialog = ShowResults(patent=self)
+            dialog = self.results_view()
+            if dialog.isVisible():
+                # Shown as live results, show it again as a modal dialog
+                dialog.hide()
             dialog.exec()
+            if self.analytics is not None and self.analytics.isVisible():
+                self.analytics.update_students()
+                self.analytics.refresh()
             self.status_message("Press the Start Test button or Enter key from your keyboard to take the next test. You can change the settings/options only now")
-            self.total_correct = 0
-            self.total_wrong = 0
             self.lbl_ans_status.hide()
             self.lbl_completion_status.clear()
-            self.lbl_disp.clear()
+            self.stop_image()
             self.lbl_timer.setText('0')
-            self.txt_errors.clear()
+            self.error_model.clear()
             self.inp_power_y.clear()
-            self.hide_controls(operator=operator)
-            self.txt_errors.appendPlainText("Wrong answers\n")
+            self.hide_controls()
         else:
             self.btn_start.setText("Next Question")
-            self.hide_controls(operator=operator)
+            self.hide_controls()
+            # The next question is prepared once the feedback is painted
+            QTimer.singleShot(0, self.prepare_question)
+            if self.menu_auto_advance.isChecked():
+                self.advance_timer.start(self.auto_advance_delay)
         # local vertical display
         self.chk_vertical.setEnabled(True)
 
+    def closeEvent(self, event):
+        self.advance_timer.stop()
+        if self.worksheet_job is not None:
+            # Files of an unfinished export are removed
+            self.worksheet_timer.stop()
+            self.worksheet_job.cancel()
+            self.worksheet_job.wait()
+        if self.export_job is not None:
+            # The export reads the store, it ends before the store is closed
+            self.export_timer.stop()
+            self.export_job.cancel()
+            self.export_job.wait()
+        self.gif_player.stop()
+        self.gif_cache.shutdown()
+        self.store.close()
+        super().closeEvent(event)
+
     def reset_ui(self):
         self.btn_start.setText("Start Test")
         self.inp_total_question.setEnabled(True)
@@ -600,63 +786,42 @@ class MainWindow(QMainWindow):
             self.lbl_timer.setText(text)
 
 
-class ShowResults(QDialog):
+def main(argv=None):
     """
-    This class is for the plots
+    Starts the application
     """
-    def __init__(self, patent=None):
-        super().__init__(patent)
-        self.parent = patent
-        loadUi("Results.ui", self)
-        self.setMaximumWidth(self.width())
-        self.setMaximumHeight(self.height())
-
-        # Bar chart - Pass Vs Failed chart
-        self.pass_fail_graph.setTitle(title="Pass Vs Failed")
-        total_questions = self.parent.total_questions
-        total_corrects = self.parent.total_correct
-        total_wrongs = self.parent.total_wrong
-        # Calculate the pass percentage
-        pass_percentage = round((total_corrects / total_questions) * 100)
-        self.setWindowIcon(QIcon('adalan_icon.png'))
-        pixmap = QPixmap('adalan_icon.png')
-        self.ada_icon.setPixmap(pixmap)
-        self.ada_icon.setScaledContents(True)
-
-        status_list = ['Failed', 'Passed']
-        ticks = []
-        xval = list(range(1, len(status_list) + 1))
-
-        bargraph = pg.BarGraphItem(x=[1], height=[total_wrongs], width=0.8, brush='red')
-        self.pass_fail_graph.addItem(bargraph)
-        bargraph = pg.BarGraphItem(x=[2], height=[total_corrects], width=0.8, brush='green')
-        self.pass_fail_graph.addItem(bargraph)
-
-        for i, item in enumerate(status_list):
-            ticks.append((xval[i], item))
-        ticks = [ticks]
-        ax = self.pass_fail_graph.getAxis('bottom')
-        ax.setTicks(ticks)
-
-        self.lbl_total.setText(str(total_questions))
-        self.lbl_correct.setText(str(total_corrects))
-        self.lbl_wrong.setText(str(total_wrongs))
-        # self.lbl_quick.setText("1")
-        self.lbl_pass_percentage.setText(str(pass_percentage)+"%")
-
-        # Plotting response graph
-        time_list = self.parent.answer_response_time
-        ques_index = self.parent.question_index
-        self.lbl_summary.setText(f"Out of {total_questions} questions you have answered {total_corrects} correctly and {total_wrongs} incorrectly.\n"
-                                 f"Your pass percentage is {pass_percentage} %.\n")
-
-        self.response_time_graph.setTitle(title="Response Time")
-        self.response_time_graph.plot(ques_index, time_list)
-        self.parent.answer_response_time = []
-        self.parent.question_index = []
-
-
-app = QApplication([])
-win = MainWindow()
-win.show()
-app.exec()
+    parser = argparse.ArgumentParser(description="Adalan")
+    parser.add_argument("--startup-benchmark", action="store_true",
+                        help="print the time of the first paint of the main window and quit")
+    parser.add_argument("--profile", metavar="FILE", default=os.environ.get("ADALAN_PROFILE"),
+                        help="measure the slots and write the times to FILE (.json, or .prom for Prometheus) on exit")
+    parser.add_argument("--profile-memory", action="store_true", help="also trace the memory allocated by the slots")
+    parser.add_argument("--record", metavar="FILE", help="record the session to FILE (.jsonl or .jsonl.gz) for replay.py")
+    parser.add_argument("--seed", type=int, help="seed of the questions, a random one is recorded if missing")
+    args, qt_args = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    app = QApplication(sys.argv[:1] + qt_args)
+    profiler = None
+    if args.profile:
+        from profiling import SlotProfiler
+        profiler = SlotProfiler(args.profile_memory)
+    recorder = None
+    seed = args.seed
+    if args.record:
+        from replay import SessionRecorder, random_seed
+        recorder = SessionRecorder(args.record)
+        seed = random_seed() if seed is None else seed
+    win = MainWindow(seed=seed, profiler=profiler, recorder=recorder)
+    if args.startup_benchmark:
+        from startup_benchmark import report_first_paint
+        report_first_paint(win)
+    win.show()
+    status = app.exec()
+    if recorder is not None:
+        recorder.close()
+    if profiler is not None:
+        profiler.dump(args.profile)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,10 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
 
+# Compile the ui files so the application does not parse them at start up
+sys.path.insert(0, SPECPATH)
+import build_ui
+build_ui.build()
 
 block_cipher = None
 
@@ -9,7 +14,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('*.ui', '.'), ('adalan_icon.png', '.'), ('adalan_icon.ico', '.'), ('gifs/', 'gifs/')],
-    hiddenimports=[],
+    hiddenimports=['ui_adalan', 'ui_results', 'ui_analytics', 'results', 'analytics'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
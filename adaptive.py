@@ -0,0 +1,197 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Adaptive question selection.
+
+The operand range is split in buckets. Error rate and response time are
+kept for every (operator, operand bucket) cell and the next question is
+drawn from the cells with weights taken from these statistics: cells with
+wrong or slow answers are asked more often, cells the student already knows
+are asked less. The weights live in a Fenwick tree, so updating a weight
+after an answer and drawing the next cell are both O(log n).
+"""
+import numpy as np
+from operators import get_operator
+from questions import Question
+
+# Weight of a cell which has not been asked yet
+UNSEEN_WEIGHT = 1.0
+# Weight of a cell which is always answered correctly and quickly
+MIN_WEIGHT = 0.05
+# Smoothing of the error rate and response time (exponential moving average)
+SMOOTHING = 0.3
+# Response time (seconds) considered slow
+SLOW_RESPONSE = 5.0
+MAX_BUCKETS = 10
+
+
+class FenwickTree:
+    """
+    Fenwick (binary indexed) tree of non negative weights
+    """
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = [float(weight) for weight in weights]
+        self.tree = [0.0] * (self.size + 1)
+        # O(n) build
+        for index, weight in enumerate(self.weights, start=1):
+            self.tree[index] += weight
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[index]
+        self._top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def __len__(self):
+        return self.size
+
+    def set(self, index, weight):
+        """
+        Sets the weight of an item in O(log n)
+        """
+        delta = float(weight) - self.weights[index]
+        self.weights[index] = float(weight)
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        """
+        Sum of the weights of the items before index
+        """
+        total = 0.0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def total(self):
+        return self.prefix_sum(self.size)
+
+    def find(self, value):
+        """
+        Returns the item whose cumulative weight range contains value, in O(log n)
+        """
+        position = 0
+        step = self._top_bit
+        while step:
+            next_position = position + step
+            if next_position <= self.size and self.tree[next_position] <= value:
+                position = next_position
+                value -= self.tree[next_position]
+            step >>= 1
+        # Rounding errors can push the value past the last item
+        return min(position, self.size - 1)
+
+    def sample(self, rng):
+        """
+        Draws an item with probability proportional to its weight
+        """
+        return self.find(rng.random() * self.total())
+
+
+def operand_buckets(start, end, buckets=MAX_BUCKETS):
+    """
+    Splits [start, end] in at most buckets ranges. Large ranges are split geometrically so small
+    numbers keep their own buckets.
+    :return: list of (low, high), both inclusive
+    """
+    if end - start + 1 <= buckets:
+        return [(value, value) for value in range(start, end + 1)]
+    if end > 100 * max(start, 1):
+        edges = np.unique(np.geomspace(max(start, 1), end + 1, buckets + 1).astype(np.int64))
+        edges[0] = start
+    else:
+        edges = np.unique(np.linspace(start, end + 1, buckets + 1).astype(np.int64))
+    return [(int(low), int(high) - 1) for low, high in zip(edges[:-1], edges[1:]) if high > low]
+
+
+class CellStats:
+    __slots__ = ("answers", "error_rate", "response_time")
+
+    def __init__(self):
+        self.answers = 0
+        self.error_rate = 0.0
+        self.response_time = 0.0
+
+    def record(self, correct, response_time):
+        error = 0.0 if correct else 1.0
+        if self.answers == 0:
+            self.error_rate = error
+            self.response_time = response_time
+        else:
+            self.error_rate += SMOOTHING * (error - self.error_rate)
+            self.response_time += SMOOTHING * (response_time - self.response_time)
+        self.answers += 1
+
+    def weight(self):
+        if self.answers == 0:
+            return UNSEEN_WEIGHT
+        slow = min(self.response_time / SLOW_RESPONSE, 1.0)
+        return MIN_WEIGHT + self.error_rate + 0.5 * slow
+
+
+class AdaptiveSampler:
+    """
+    Picks questions one at a time from the (operator, operand bucket) cells
+    :param operators: list of operator names
+    :param start: lowest operand
+    :param end: highest operand
+    :param rng: numpy random generator
+    """
+    def __init__(self, operators, start, end, rng=None, buckets=MAX_BUCKETS):
+        if len(operators) == 0:
+            raise ValueError("Chose at least one operator")
+        self.operators = [get_operator(name) for name in operators]
+        self.buckets = operand_buckets(start, end, buckets)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        cell_count = len(self.operators) * len(self.buckets)
+        self.stats = [CellStats() for _ in range(cell_count)]
+        self.weights = FenwickTree([UNSEEN_WEIGHT] * cell_count)
+        # Questions asked and not answered yet -> cell
+        self._pending = {}
+
+    def next_question(self):
+        """
+        Returns the next question
+        """
+        cell = self.weights.sample(self.rng)
+        operator = self.operators[cell // len(self.buckets)]
+        low, high = self.buckets[cell % len(self.buckets)]
+        x, y, z = operator.generate(self.rng, low, high, 1)
+        question = Question(int(x[0]), int(y[0]), operator, operator.solve(x, y, z)[0], int(z[0]))
+        self._pending[id(question)] = (question, cell)
+        return question
+
+    def record(self, question, correct, latency_ns):
+        """
+        Updates the statistics of the question's cell with the answer
+        :param question: question returned by next_question
+        :param correct: True if the answer is correct
+        :param latency_ns: response time in nanoseconds
+        """
+        pending = self._pending.pop(id(question), None)
+        if pending is None:
+            return
+        cell = pending[1]
+        stats = self.stats[cell]
+        stats.record(correct, latency_ns / 1e9)
+        self.weights.set(cell, stats.weight())
+
+    def discard(self, question):
+        """
+        Forgets a question which will not be answered, its test was closed before
+        """
+        self._pending.pop(id(question), None)
+
+    def probabilities(self):
+        """
+        Returns the probability of every (operator name, (low, high)) cell
+        """
+        total = self.weights.total()
+        return {(self.operators[cell // len(self.buckets)].name, self.buckets[cell % len(self.buckets)]):
+                self.weights.weights[cell] / total for cell in range(len(self.weights))}
@@ -0,0 +1,133 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Analytics over every stored session.
+
+The dashboard only reads the rollups of the session store (answers per
+student, day, operator and operand size), which are updated as the answers
+are saved, so opening it does not depend on the number of answers. The day
+curves are downsampled and clipped to the visible range by pyqtgraph, so
+years of days stay interactive when zooming.
+"""
+from datetime import date
+import time
+from PyQt6.QtWidgets import QDialog
+from PyQt6.QtGui import QIcon
+import numpy as np
+import pyqtgraph as pg
+from operators import OPERATORS
+from ui_loader import setup_ui
+
+
+def day_timestamps(days):
+    """
+    Returns the epoch time of the local midnight of date ordinals
+    """
+    return np.array([time.mktime(date.fromordinal(day).timetuple()) for day in days], dtype=float)
+
+
+def rates(rows):
+    """
+    Returns the pass percentages and mean response times (seconds, nan without times) of rollup rows
+    """
+    answers = np.array([row["answers"] for row in rows], dtype=float)
+    correct = np.array([row["correct"] for row in rows], dtype=float)
+    latency_count = np.array([row["latency_count"] for row in rows], dtype=float)
+    latency_total = np.array([row["latency_total_ns"] for row in rows], dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return correct / answers * 100, np.where(latency_count > 0, latency_total / latency_count / 1e9, np.nan)
+
+
+class AnalyticsDialog(QDialog):
+    """
+    Trends of the pass percentage and response time per day, and the pass percentage per operand size
+    :param store: SessionStore
+    """
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        setup_ui(self, "Analytics.ui")
+        self.setWindowIcon(QIcon('adalan_icon.png'))
+
+        for graph, title, unit in ((self.accuracy_graph, "Pass percentage per day", "%"),
+                                   (self.latency_graph, "Mean response time per day", "Seconds")):
+            graph.setAxisItems({"bottom": pg.DateAxisItem()})
+            graph.setTitle(title=title)
+            graph.setLabel("left", unit)
+            graph.showGrid(x=True, y=True, alpha=0.3)
+        self.latency_graph.setXLink(self.accuracy_graph)
+        self.accuracy_graph.setYRange(0, 100)
+        # The symbol pens and brushes are made once: pyqtgraph caches a symbol image per pen and brush object,
+        # new ones on every refresh would grow the cache for as long as the dialog lives
+        self.accuracy_curve = self.accuracy_graph.plot([], [], pen="g", symbol="o", symbolSize=4,
+                                                       symbolPen=pg.mkPen("g"), symbolBrush=pg.mkBrush("g"),
+                                                       autoDownsample=True, downsampleMethod="peak",
+                                                       clipToView=True)
+        self.latency_curve = self.latency_graph.plot([], [], pen="y", symbol="o", symbolSize=4, connect="finite",
+                                                     symbolPen=pg.mkPen("y"), symbolBrush=pg.mkBrush("y"),
+                                                     autoDownsample=True, downsampleMethod="peak", clipToView=True)
+        self.operand_graph.setTitle(title="Pass percentage per operand size")
+        self.operand_graph.setLabel("bottom", "Digits of the largest operand")
+        self.operand_graph.setYRange(0, 100)
+        self.operand_bars = pg.BarGraphItem(x=[], height=[], width=0.6, brush="g")
+        self.operand_graph.addItem(self.operand_bars)
+
+        self.cmb_student.addItem("All students", None)
+        self.cmb_operator.addItem("All operators", None)
+        for name in OPERATORS:
+            self.cmb_operator.addItem(name, name)
+        self.cmb_student.currentIndexChanged.connect(self.refresh)
+        self.cmb_operator.currentIndexChanged.connect(self.refresh)
+
+    def update_students(self):
+        """
+        Adds the students saved since the list was filled
+        """
+        known = {self.cmb_student.itemData(index) for index in range(1, self.cmb_student.count())}
+        for name in self.store.users():
+            if name not in known:
+                self.cmb_student.addItem(name, name)
+
+    def refresh(self):
+        """
+        Reads the rollups of the chosen student and operator and updates the plots
+        """
+        student = self.cmb_student.currentData()
+        operator = self.cmb_operator.currentData()
+        days = self.store.rollups(("day",), student, operator)
+        if days:
+            x = day_timestamps([row["day"] for row in days])
+            accuracy, latency = rates(days)
+            self.accuracy_curve.setData(x, accuracy)
+            self.latency_curve.setData(x, latency)
+        else:
+            self.accuracy_curve.setData([], [])
+            self.latency_curve.setData([], [])
+        sizes = self.store.rollups(("digits",), student, operator)
+        digits = [row["digits"] for row in sizes]
+        self.operand_bars.setOpts(x=digits, height=rates(sizes)[0] if sizes else [])
+        self.operand_graph.getAxis("bottom").setTicks([[(size, str(size)) for size in digits]])
+        self.update_totals(days)
+
+    def update_totals(self, days):
+        answers = sum(row["answers"] for row in days)
+        if answers == 0:
+            self.lbl_totals.setText("No answers saved yet")
+            return
+        correct = sum(row["correct"] for row in days)
+        latency_count = sum(row["latency_count"] for row in days)
+        text = f"{answers} answers on {len(days)} day{'s' if len(days) > 1 else ''}, pass percentage {round(correct / answers * 100)} %"
+        if latency_count:
+            text += f", mean response time {sum(row['latency_total_ns'] for row in days) / latency_count / 1e9:.2f} s"
+        if self.store.backfilling():
+            text += " (older answers are still being added)"
+        self.lbl_totals.setText(text)
+
+    def showEvent(self, event):
+        self.update_students()
+        self.refresh()
+        super().showEvent(event)
@@ -0,0 +1,59 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Locations used by Adalan.
+
+APP_DIR holds the files shipped with the application (ui files, icons, gifs).
+The data folder holds the files written by the application. It can be
+changed with the ADALAN_HOME environment variable, and the folder of the
+user's gifs with ADALAN_GIF_ROOT. Both are read when they are used, so a
+benchmark which sets them for a run does not leave them behind.
+"""
+import os
+import sys
+
+# PyInstaller unpacks the bundled data files to sys._MEIPASS
+APP_DIR = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+
+if os.name == "nt":
+    DEFAULT_DATA_DIR = os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "Adalan")
+    DEFAULT_GIF_ROOT = "C:\\adalan\\gifs"
+else:
+    DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~"), ".adalan")
+    DEFAULT_GIF_ROOT = os.path.join(os.path.expanduser("~"), "adalan", "gifs")
+
+BUNDLED_GIF_ROOT = os.path.join(APP_DIR, "gifs")
+
+
+def resource_path(*parts):
+    """
+    Returns the path of a file shipped with the application
+    """
+    return os.path.join(APP_DIR, *parts)
+
+
+def data_dir():
+    """
+    Returns the folder of the files written by the application
+    """
+    return os.environ.get("ADALAN_HOME", DEFAULT_DATA_DIR)
+
+
+def user_gif_root():
+    """
+    Returns the folder of the gifs added by the user
+    """
+    return os.environ.get("ADALAN_GIF_ROOT", DEFAULT_GIF_ROOT)
+
+
+def data_path(*parts):
+    """
+    Returns the path of a file written by the application. The data folder is created if needed.
+    """
+    folder = data_dir()
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, *parts)
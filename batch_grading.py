@@ -0,0 +1,320 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Batch grading of answer sheets.
+
+    python batch_grading.py SHEET [SHEET ...] [--reports DIR] [--output graded.csv]
+                            [--workers N] [--chunk-size 20000] [--json]
+
+An answer sheet is a CSV file with a header or a JSONL file (one object per
+line) with the fields student, operator, x, y, z (optional, 0 if missing)
+and given. operator is the name of a registered operator; given is the
+answer written by the student, an empty answer counts as 0 as in the main
+window. Answers are checked with the same operators as the application, so
+the division is round(x / y) and square roots are rounded to 2 decimals.
+Operands must be whole numbers of any size: small ones are solved with
+int64 arrays, the others with Python integers. Rows which can not be read
+or graded are written with their error instead of stopping the grading.
+
+The sheets are read in chunks which are graded by a process pool; only a
+bounded number of chunks is in flight so the memory does not depend on the
+size of the sheets. Graded rows are written in the input order, and one
+report per student is written at the end.
+"""
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import itertools
+import json
+import os
+import re
+import sys
+import time
+import numpy as np
+from error_log import ErrorLog
+from operators import OPERATORS, get_operator
+from questions import Question
+from session import pass_percentage
+
+SHEET_FIELDS = ("student", "operator", "x", "y", "z", "given")
+GRADED_FIELDS = ("source", "line", "student", "operator", "x", "y", "z", "given", "expected", "correct", "error")
+CHUNK_SIZE = 20000
+# Operands below this (in absolute value) are solved with int64 arrays: the results of every operator fit in
+# int64 (powers are computed on Python integers). Larger ones are solved with Python integers.
+INT64_OPERAND_LIMIT = 2 ** 31
+# Wrong answers listed in a student report, the latest ones are kept
+REPORT_ERRORS = 200
+
+
+def read_sheet(path):
+    """
+    Yields (line, row dictionary, error) of an answer sheet, CSV or JSONL by the file extension. Lines which
+    can not be read have an empty row and the error.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.lower().endswith((".jsonl", ".json")):
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError:
+                    yield line, {}, "Invalid JSON"
+                    continue
+                if isinstance(row, dict):
+                    yield line, row, None
+                else:
+                    yield line, {}, "Not a JSON object"
+        else:
+            # Line 1 is the header
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                yield line, row, None
+
+
+def read_chunks(paths, chunk_size=CHUNK_SIZE):
+    """
+    Yields the rows of the sheets in lists of chunk_size (source, line, student, operator, x, y, z, given, error)
+    """
+    rows = ((os.path.basename(path), line, row.get("student") or "", row.get("operator") or "", row.get("x"),
+             row.get("y"), row.get("z") or 0, row.get("given"), error)
+            for path in paths for line, row, error in read_sheet(path))
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_integer(value):
+    """
+    Returns a whole number of a sheet field (text, int or a float without decimals) as an int
+    :raise ValueError: if the value is not a whole number
+    """
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise ValueError(value)
+
+
+def answer_text(given):
+    """
+    Returns the text of a given answer as it would be typed, JSON numbers like 12.0 are typed 12
+    """
+    if given is None:
+        return ""
+    if isinstance(given, float) and given.is_integer():
+        return str(int(given))
+    return str(given).strip()
+
+
+def _solve_rows(operator, x, y, z):
+    """
+    Solves the questions of one operator, rows which can not be solved get None
+    """
+    try:
+        with np.errstate(all="raise"):
+            return operator.solve(x, y, z)
+    except (ArithmeticError, ValueError):
+        pass
+    # Find the bad rows one at a time
+    answers = []
+    for index in range(len(x)):
+        try:
+            with np.errstate(all="raise"):
+                answers.append(operator.solve(x[index:index + 1], y[index:index + 1], z[index:index + 1])[0])
+        except (ArithmeticError, ValueError):
+            answers.append(None)
+    return answers
+
+
+def grade_chunk(chunk):
+    """
+    Grades a chunk of rows, runs in the worker processes
+    :return: list of graded rows (source, line, student, operator, x, y, z, given, expected, correct, error)
+    """
+    graded = [None] * len(chunk)
+    by_operator = defaultdict(list)
+    for index, (source, line, student, operator, x, y, z, given, error) in enumerate(chunk):
+        if error is not None:
+            graded[index] = (source, line, student, operator, x, y, z, given, None, None, error)
+            continue
+        if operator not in OPERATORS:
+            graded[index] = (source, line, student, operator, x, y, z, given, None, None, "Unknown operator")
+            continue
+        try:
+            operands = (parse_integer(x), parse_integer(y), parse_integer(z))
+        except ValueError:
+            graded[index] = (source, line, student, operator, x, y, z, given, None, None, "Invalid operands")
+            continue
+        small = all(-INT64_OPERAND_LIMIT < operand < INT64_OPERAND_LIMIT for operand in operands)
+        by_operator[operator, small].append((index, operands))
+
+    # Each operator solves all of its questions at once, with int64 arrays for the small operands
+    for (name, small), rows in by_operator.items():
+        operator = get_operator(name)
+        operands = np.array([row[1] for row in rows], dtype=np.int64 if small else object).reshape(-1, 3)
+        answers = _solve_rows(operator, operands[:, 0], operands[:, 1], operands[:, 2])
+        for (index, (x, y, z)), answer in zip(rows, answers):
+            source, line, student, _, _, _, _, given, _ = chunk[index]
+            if answer is None:
+                graded[index] = (source, line, student, name, x, y, z, given, None, None, "Question can not be solved")
+                continue
+            try:
+                result = operator.parse_answer(answer_text(given))
+            except ValueError:
+                graded[index] = (source, line, student, name, x, y, z, given, answer, None, "Invalid answer")
+                continue
+            graded[index] = (source, line, student, name, x, y, z, result, answer, result == answer, None)
+    return graded
+
+
+class StudentReport:
+    """
+    Score of one student over every sheet
+    """
+    def __init__(self, student):
+        self.student = student
+        self.correct = Counter()
+        self.wrong = Counter()
+        self.invalid = 0
+        self.errors = ErrorLog(REPORT_ERRORS)
+
+    def add(self, row):
+        source, line, student, operator, x, y, z, given, expected, correct, error = row
+        if error is not None:
+            self.invalid += 1
+        elif correct:
+            self.correct[operator] += 1
+        else:
+            self.wrong[operator] += 1
+            question = Question(x, y, get_operator(operator), expected, z)
+            self.errors.add(f"{source}:{line}", question, given)
+
+    def write(self, file):
+        total_correct = sum(self.correct.values())
+        total_wrong = sum(self.wrong.values())
+        total = total_correct + total_wrong
+        file.write(f"Student: {self.student}\n")
+        file.write(f"Out of {total} questions {self.student} answered {total_correct} correctly and "
+                   f"{total_wrong} incorrectly. The pass percentage is {pass_percentage(total, total_correct)} %.\n")
+        if self.invalid:
+            file.write(f"{self.invalid} answers could not be graded.\n")
+        file.write("\nOperator            Correct    Wrong  Pass %\n")
+        for operator in sorted(set(self.correct) | set(self.wrong)):
+            correct, wrong = self.correct[operator], self.wrong[operator]
+            file.write(f"{operator:<16} {correct:>10} {wrong:>8} {pass_percentage(correct + wrong, correct):>6}\n")
+        if len(self.errors):
+            file.write("\nWrong answers\n")
+            if self.errors.dropped:
+                file.write(f"(the last {len(self.errors)}, {self.errors.dropped} older ones are not listed)\n")
+            for entry in self.errors:
+                operator = entry.question.operator
+                file.write(operator.format_error(entry.question, entry.given, entry.number) + "\n")
+
+    def summary(self):
+        total_correct = sum(self.correct.values())
+        total_wrong = sum(self.wrong.values())
+        return {"student": self.student, "correct": total_correct, "wrong": total_wrong, "invalid": self.invalid,
+                "pass_percentage": pass_percentage(total_correct + total_wrong, total_correct)}
+
+
+def report_file_name(student):
+    name = re.sub(r"[^\w.-]+", "_", student).strip("._") or "unknown"
+    return f"{name}.txt"
+
+
+def grade(paths, reports_dir=None, output=None, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Grades answer sheets
+    :param paths: list of answer sheet paths
+    :param reports_dir: folder of the student reports, None to not write them
+    :param output: path of the graded rows CSV, None to not write it
+    :param workers: number of processes, the number of CPUs if None
+    :return: dictionary with the totals, the student summaries and the throughput
+    """
+    workers = workers or os.cpu_count() or 1
+    reports = {}
+    rows = 0
+    started = time.perf_counter()
+    graded_file = open(output, "w", newline="", encoding="utf-8") if output else None
+    try:
+        writer = None
+        if graded_file is not None:
+            writer = csv.writer(graded_file)
+            writer.writerow(GRADED_FIELDS)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # At most two chunks per worker are in flight, results are taken in the input order
+            pending = []
+            chunks = read_chunks(paths, chunk_size)
+            while True:
+                for chunk in itertools.islice(chunks, 2 * workers - len(pending)):
+                    pending.append(pool.submit(grade_chunk, chunk))
+                if not pending:
+                    break
+                for row in pending.pop(0).result():
+                    rows += 1
+                    report = reports.get(row[2])
+                    if report is None:
+                        report = reports[row[2]] = StudentReport(row[2])
+                    report.add(row)
+                    if writer is not None:
+                        writer.writerow(row)
+    finally:
+        if graded_file is not None:
+            graded_file.close()
+
+    if reports_dir is not None:
+        os.makedirs(reports_dir, exist_ok=True)
+        used = Counter()
+        for student, report in sorted(reports.items()):
+            name = report_file_name(student)
+            used[name] += 1
+            if used[name] > 1:
+                # Names which differ only by punctuation
+                name = f"{name[:-4]}_{used[name]}.txt"
+            with open(os.path.join(reports_dir, name), "w", encoding="utf-8") as file:
+                report.write(file)
+    elapsed = time.perf_counter() - started
+    students = [report.summary() for _, report in sorted(reports.items())]
+    return {"rows": rows, "students": students, "workers": workers, "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed else None,
+            "correct": sum(student["correct"] for student in students),
+            "wrong": sum(student["wrong"] for student in students),
+            "invalid": sum(student["invalid"] for student in students)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade answer sheets")
+    parser.add_argument("sheets", nargs="+", help="answer sheets, CSV or JSONL")
+    parser.add_argument("--reports", help="folder of the student reports")
+    parser.add_argument("--output", help="CSV file of the graded answers")
+    parser.add_argument("--workers", type=int, help="number of processes, the number of CPUs by default")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="answers graded together")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args(argv)
+
+    results = grade(args.sheets, args.reports, args.output, args.workers, max(args.chunk_size, 1))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['rows']} answers of {len(results['students'])} students graded in "
+              f"{results['seconds']:.2f} s with {results['workers']} processes "
+              f"({results['rows_per_second']:.0f} answers/s)")
+        print(f"Correct: {results['correct']}  Wrong: {results['wrong']}  Not graded: {results['invalid']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
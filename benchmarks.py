@@ -0,0 +1,349 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Benchmark suite.
+
+    python benchmarks.py [--only generation validation ...] [--output results.json]
+                         [--baseline benchmark_baseline.json] [--save-baseline] [--threshold 0.25]
+                         [--cold-startup]
+
+Runs without a display (offscreen Qt platform) and with a temporary data
+folder. Every benchmark reports the median time of one operation in
+seconds:
+
+    generation  question batches and tests (the start_testing logic)
+    validation  checking answers, with and without the main window (validate_result)
+    gifs        gif decoding and display (display_image)
+    startup     MainWindow construction to the first processed events
+    results     ShowResults construction and plotting
+    transition  switching the question controls
+
+The results are printed as JSON. With a baseline file every metric is
+compared to the stored one and the exit status is 1 if one of them is
+slower than the baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+# A metric regresses when it is slower than the baseline by more than this fraction
+DEFAULT_THRESHOLD = 0.25
+ALL_OPERATORS = ["Addition", "Subtraction", "Multiplication", "Division", "Square", "Cube", "SquareRoot",
+                 "Percentage", "Fraction", "Exponent", "Two Step"]
+
+BENCHMARKS = {}
+
+
+@contextlib.contextmanager
+def environment(**variables):
+    """
+    Sets environment variables for the duration of a with block, the previous values are restored after it
+    (variables which were not set are removed)
+    """
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def benchmark(name):
+    """
+    Registers a benchmark, the function returns a dictionary of metric name -> seconds
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def measure(function, number=1, repeat=5, setup=None):
+    """
+    Returns the median time of one call of function in seconds
+    :param number: calls timed together
+    :param repeat: number of timings
+    :param setup: called before each timing, not timed
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - started) / number)
+    return statistics.median(timings)
+
+
+class Context:
+    """
+    Qt application and main window shared by the benchmarks
+    """
+    def __init__(self, data_dir, cold_startup=False):
+        from PyQt6.QtWidgets import QApplication
+        self.data_dir = data_dir
+        self.cold_startup = cold_startup
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self._window = None
+
+    def new_window(self, **options):
+        from Adalan import MainWindow
+        from session_store import SessionStore
+        window = MainWindow(store=SessionStore(os.path.join(self.data_dir, "benchmark.db")), **options)
+        window.show()
+        self.app.processEvents()
+        return window
+
+    def window(self):
+        """
+        Main window with the results dialog made non modal, so tests can end without a user
+        """
+        if self._window is None:
+            self._window = self.new_window(seed=1)
+            self._window.results_view().exec = lambda: 0
+            # Every operator is asked
+            for checkbox in (self._window.chk_add, self._window.chk_sub, self._window.chk_mul,
+                             self._window.chk_div, self._window.chk_square, self._window.chk_cbrt,
+                             self._window.chk_sqrt, self._window.chk_percentage, self._window.chk_fraction,
+                             self._window.chk_exponent, self._window.chk_two_step):
+                checkbox.setChecked(True)
+        return self._window
+
+    def close(self):
+        if self._window is not None:
+            self._window.close()
+            self._window = None
+        self.app.processEvents()
+
+
+@benchmark("generation")
+def bench_generation(context):
+    from questions import QuestionGenerator
+    from session import SessionEngine, make_settings
+    generator = QuestionGenerator(1)
+    engine = SessionEngine(1)
+    settings = make_settings(0, 100, 100, ALL_OPERATORS)
+    return {
+        "batch_100": measure(lambda: generator.generate(100, 0, 100, ALL_OPERATORS), number=100),
+        "batch_100_no_repeat": measure(lambda: generator.generate(100, 0, 100, ALL_OPERATORS, unique=True),
+                                       number=100),
+        "batch_10000": measure(lambda: generator.generate(10000, 0, 1000, ALL_OPERATORS), number=5),
+        "test_session_100": measure(lambda: engine.new_session("benchmark", settings), number=100),
+    }
+
+
+@benchmark("validation")
+def bench_validation(context):
+    from session import SessionEngine, make_settings
+    engine = SessionEngine(1)
+    settings = make_settings(0, 100, 100, ALL_OPERATORS)
+    sessions = []
+
+    def answer_test():
+        session = engine.new_session("benchmark", settings)
+        while not session.finished:
+            question = session.next_question()
+            session.answer_text(str(question.answer))
+        sessions.append(session)
+
+    window = context.window()
+    # Gifs are measured on their own
+    window.gif_library = None
+    window.next_gif = {True: None, False: None}
+
+    def question_cycle():
+        window.start_testing()
+        window.inp_result.setText(str(window.question.answer))
+        window.validate_result()
+        context.app.processEvents()
+
+    return {
+        "engine_answer": measure(answer_test, number=10) / settings["total_questions"],
+        "window_question_cycle": measure(question_cycle, number=50),
+    }
+
+
+@benchmark("gifs")
+def bench_gifs(context):
+    from gif_cache import decode_gif
+    from gif_library import GifLibrary
+    from app_paths import BUNDLED_GIF_ROOT
+    window = context.window()
+    library = GifLibrary(BUNDLED_GIF_ROOT, manifest_path=os.path.join(context.data_dir, "gif_manifest.json"))
+    paths = (library.files(True) + library.files(False))[:6]
+    if not paths:
+        return {}
+    size = window.lbl_disp.contentsRect().size()
+    decode_times = [measure(lambda: decode_gif(path, size.width(), size.height()), repeat=1) for path in paths]
+    # Only cached gifs are shown (two of them fit the cache budget), nothing is decoded in the background
+    # while measuring
+    window.gif_library = None
+    for path in paths[:2]:
+        window.gif_cache.get(path)
+    next_paths = iter(paths[:2] * 1000)
+
+    def display():
+        window.next_gif = {True: next(next_paths), False: None}
+        window.display_image(True)
+        context.app.processEvents()
+
+    result = {"decode": statistics.median(decode_times), "display_cached": measure(display, number=20)}
+    window.stop_image()
+    return result
+
+
+@benchmark("startup")
+def bench_startup(context):
+    windows = []
+
+    def start():
+        windows.append(context.new_window())
+
+    def close():
+        while windows:
+            windows.pop().close()
+        context.app.processEvents()
+
+    result = {"main_window": measure(start, repeat=5, setup=close)}
+    close()
+    if context.cold_startup:
+        from startup_benchmark import run
+        startup = run(3)
+        result["cold_first_paint"] = startup["cold_first_paint"]
+        result["warm_first_paint"] = startup["warm_first_paint_median"]
+    return result
+
+
+@benchmark("results")
+def bench_results(context):
+    from results import ShowResults
+    window = context.window()
+    dialogs = []
+
+    def construct():
+        dialogs.append(ShowResults(patent=window))
+
+    def delete():
+        while dialogs:
+            dialogs.pop().deleteLater()
+        context.app.processEvents()
+
+    construct_time = measure(construct, repeat=5, setup=delete)
+    delete()
+    dialog = window.results_view()
+
+    def plot_test():
+        dialog.start_test(100)
+        for number in range(1, 101):
+            dialog.add_answer(number, 1 + number % 7, number % 3 != 0)
+        context.app.processEvents()
+
+    return {"construct": construct_time, "plot_100_answers": measure(plot_test, number=5)}
+
+
+@benchmark("transition")
+def bench_transition(context):
+    window = context.window()
+    layouts = [(layout, vertical) for vertical in (False, True) for layout in ("binary", "power", "sqrt")]
+    position = iter(layouts * 10000)
+
+    def switch():
+        window.show_controls(*next(position))
+        context.app.processEvents()
+        window.hide_controls()
+        context.app.processEvents()
+
+    return {"show_hide": measure(switch, number=200)}
+
+
+def run(names=None, cold_startup=False):
+    """
+    Runs the benchmarks
+    :param names: names of the benchmarks to run, all of them if None
+    :return: dictionary with the environment and the metrics ("benchmark.metric" -> seconds)
+    """
+    # The application reads its data folder and gif folder from the environment
+    with tempfile.TemporaryDirectory() as data_dir, \
+            environment(QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"), ADALAN_HOME=data_dir,
+                        ADALAN_GIF_ROOT=os.path.join(data_dir, "gifs")):
+        context = Context(data_dir, cold_startup)
+        metrics = {}
+        try:
+            for name in names or BENCHMARKS:
+                for metric, seconds in BENCHMARKS[name](context).items():
+                    metrics[f"{name}.{metric}"] = seconds
+        finally:
+            context.close()
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "time": time.time(), "metrics": metrics}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares the metrics to the baseline
+    :return: list of (metric, baseline seconds, seconds, ratio) slower than the baseline by more than threshold
+    """
+    regressions = []
+    for metric, seconds in results["metrics"].items():
+        reference = baseline["metrics"].get(metric)
+        if reference:
+            ratio = seconds / reference
+            if ratio > 1 + threshold:
+                regressions.append((metric, reference, seconds, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adalan benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), metavar="BENCHMARK",
+                        help=f"benchmarks to run, from: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slow down compared to the baseline (0.25 = 25%%)")
+    parser.add_argument("--cold-startup", action="store_true", help="also measure the start up in new processes")
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.cold_startup)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline {args.baseline}, run with --save-baseline to store one", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold)
+    for metric, reference, seconds, ratio in regressions:
+        print(f"REGRESSION {metric}: {seconds * 1000:.3f} ms, baseline {reference * 1000:.3f} ms "
+              f"({(ratio - 1) * 100:.0f}% slower)", file=sys.stderr)
+    if not regressions:
+        print(f"No regression above {args.threshold * 100:.0f}% compared to {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
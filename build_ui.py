@@ -0,0 +1,44 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Compiles the ui files to Python modules (ui_adalan.py, ui_results.py and ui_analytics.py).
+
+    python build_ui.py [--force]
+
+Adalan.spec runs this before building the application.
+"""
+import argparse
+import os
+from app_paths import APP_DIR
+from ui_loader import UI_MODULES
+
+
+def build(force=False, directory=APP_DIR):
+    """
+    Compiles the ui files which changed since the last build
+    :return: list of the modules written
+    """
+    from PyQt6.uic import compileUi
+
+    written = []
+    for ui_file, (module_name, _) in UI_MODULES.items():
+        ui_path = os.path.join(directory, ui_file)
+        module_path = os.path.join(directory, module_name + ".py")
+        if not force and os.path.exists(module_path) and os.path.getmtime(module_path) >= os.path.getmtime(ui_path):
+            continue
+        with open(module_path, "w", encoding="utf-8") as file:
+            compileUi(ui_path, file)
+        written.append(module_path)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the Adalan ui files")
+    parser.add_argument("--force", action="store_true", help="compile even if the modules are up to date")
+    args = parser.parse_args()
+    for path in build(force=args.force):
+        print(f"Wrote {path}")
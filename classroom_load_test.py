@@ -0,0 +1,142 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Load test of the classroom server.
+
+    python classroom_load_test.py [--clients 300] [--tests 3] [--questions 20]
+                                  [--connect HOST:PORT] [--db PATH] [--json]
+
+Every simulated client connects, takes its tests and answers as fast as the
+server replies. The latency of every request (from sending the line to
+reading the response) is kept per op in log bucketed histograms and printed
+as percentiles together with the request throughput. Without --connect a
+server without store (or with --db) is started in this process on a free
+port; the clients then share its event loop.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from classroom_server import ClassroomServer
+from latency import LatencyHistogram, now_ns
+from session import SessionEngine
+from session_store import SessionStore
+
+
+class LoadClient:
+    """
+    Simulated student
+    """
+    def __init__(self, name, histograms):
+        self.name = name
+        self.histograms = histograms
+        self.reader = None
+        self.writer = None
+        self.errors = 0
+
+    async def request(self, message):
+        started = now_ns()
+        self.writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        while True:
+            response = json.loads(await self.reader.readline())
+            # Timeouts are pushed by the server between the responses
+            if "event" not in response:
+                break
+        histogram = self.histograms.setdefault(message["op"], LatencyHistogram())
+        histogram.record(now_ns() - started)
+        if not response.get("ok"):
+            self.errors += 1
+        return response
+
+    async def run(self, host, port, tests, settings):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(tests):
+                response = await self.request({"op": "start", "student": self.name, "settings": settings})
+                if not response.get("ok"):
+                    continue
+                session = response["session"]
+                question = response["question"]
+                while question is not None:
+                    # Any number will do, the server does the same work for right and wrong answers
+                    response = await self.request({"op": "answer", "session": session, "answer": "0"})
+                    if not response.get("ok"):
+                        break
+                    question = response["question"]
+                await self.request({"op": "close", "session": session})
+        finally:
+            self.writer.close()
+
+
+async def run_load(host, port, clients, tests, settings):
+    """
+    Runs the simulated clients at the same time
+    :return: dictionary with the results
+    """
+    histograms = {}
+    load_clients = [LoadClient(f"load-{index}", histograms) for index in range(clients)]
+    started = time.perf_counter()
+    await asyncio.gather(*(client.run(host, port, tests, settings) for client in load_clients))
+    elapsed = time.perf_counter() - started
+    requests = sum(histogram.count for histogram in histograms.values())
+    return {"clients": clients, "tests": tests, "questions": settings["total_questions"], "seconds": elapsed,
+            "requests": requests, "requests_per_second": requests / elapsed if elapsed else None,
+            "errors": sum(client.errors for client in load_clients),
+            "latency": {op: histogram.summary() for op, histogram in sorted(histograms.items())}}
+
+
+async def run_local(clients, tests, settings, db=None, seed=None):
+    """
+    Starts a server in this process and runs the load against it
+    """
+    engine = SessionEngine(seed, SessionStore(db) if db else None)
+    server = await ClassroomServer(engine, port=0).start()
+    try:
+        return await run_load(server.host, server.port, clients, tests, settings)
+    finally:
+        await server.close()
+        if engine.store is not None:
+            engine.store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test of the Adalan classroom server")
+    parser.add_argument("--clients", type=int, default=300, help="number of simulated students")
+    parser.add_argument("--tests", type=int, default=3, help="tests taken by every student")
+    parser.add_argument("--questions", type=int, default=20, help="questions of a test")
+    parser.add_argument("--operators", nargs="+", default=["Addition", "Multiplication", "Division"])
+    parser.add_argument("--connect", metavar="HOST:PORT", help="server to load, a local one is started if missing")
+    parser.add_argument("--db", help="session database of the local server, no store if missing")
+    parser.add_argument("--seed", type=int, help="seed of the questions of the local server")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args(argv)
+
+    # The delay is long enough for no question to time out during the load
+    settings = {"range": [0, 50], "total_questions": args.questions, "operators": args.operators, "delay": 600}
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        results = asyncio.run(run_load(host, int(port), args.clients, args.tests, settings))
+    else:
+        results = asyncio.run(run_local(args.clients, args.tests, settings, args.db, args.seed))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['clients']} clients x {results['tests']} tests x {results['questions']} questions: "
+              f"{results['requests']} requests in {results['seconds']:.2f} s "
+              f"({results['requests_per_second']:.0f} requests/s, {results['errors']} errors)")
+        for op, summary in results["latency"].items():
+            print(f"  {op:<8} {summary['count']:>8}  p50 {summary['p50'] * 1000:7.2f} ms  "
+                  f"p90 {summary['p90'] * 1000:7.2f} ms  p99 {summary['p99'] * 1000:7.2f} ms  "
+                  f"max {summary['max'] * 1000:7.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
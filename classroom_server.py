@@ -0,0 +1,316 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Classroom server: many students taking tests at the same time.
+
+    python classroom_server.py [--host 127.0.0.1] [--port 8765] [--db PATH | --no-store] [--seed SEED]
+
+The server runs on asyncio and hosts any number of independent tests, each
+with its own questions, score and timer, on the same SessionEngine as the
+main window. Clients talk JSON lines over TCP: every request is one JSON
+object on one line and gets exactly one response line. A request may carry
+an "id", it is copied to the response.
+
+    {"op": "start", "student": "Asha", "settings": {"range": [0, 20], "total_questions": 10, ...}}
+    -> {"ok": true, "session": 1, "total_questions": 10, "delay": 5, "question": {...}}
+    {"op": "answer", "session": 1, "answer": "12"}
+    -> {"ok": true, "number": 1, "correct": true, "expected": 12, "question": {...} or null,
+        "summary": {...} once the test is finished}
+    {"op": "summary", "session": 1}, {"op": "close", "session": 1}, {"op": "ping"}
+
+When the delay of a question runs out the question is answered with no
+answer, as in the main window, and the result is pushed to the client as
+{"event": "timeout", ...} with the same fields as an answer response.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import math
+import sys
+from session import SessionEngine, make_settings
+from session_store import SessionStore
+
+DEFAULT_PORT = 8765
+# Largest test a client can start
+MAX_QUESTIONS = 1000
+# Longest request line accepted
+MAX_LINE = 64 * 1024
+# Longest delay of a question, in seconds
+MAX_DELAY = 3600
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def question_payload(number, question):
+    left, symbol, right, power = question.operator.render(question)
+    return {"number": number, "operator": question.operator.name, "layout": question.operator.layout,
+            "left": left, "symbol": symbol, "right": right, "power": power}
+
+
+def answer_payload(session, answer):
+    payload = {"session": session.id, "number": answer.number, "correct": answer.correct,
+               "expected": answer.question.answer, "given": answer.given, "question": None}
+    if session.test.finished:
+        payload["summary"] = session.test.summary()
+    else:
+        payload["question"] = session.ask()
+    return payload
+
+
+class ClassroomSession:
+    """
+    One test on the server, owned by the connection which started it
+    """
+    def __init__(self, session_id, test, delay, connection):
+        self.id = session_id
+        self.test = test
+        self.delay = delay
+        self.connection = connection
+        self.timer = None
+
+    def ask(self):
+        """
+        Asks the next question and starts its timer
+        :return: question payload
+        """
+        question = self.test.next_question()
+        self.cancel_timer()
+        if self.delay:
+            self.timer = asyncio.get_running_loop().call_later(self.delay, self.time_out)
+        return question_payload(self.test.answered + 1, question)
+
+    def answer(self, given):
+        """
+        Checks the answer, given is the entered text or a number
+        """
+        if isinstance(given, (int, float)) and not isinstance(given, bool):
+            result = given
+        else:
+            try:
+                result = self.test.question.operator.parse_answer(str(given))
+            except ValueError:
+                raise ProtocolError(f"Not a number: {given!r}")
+        self.cancel_timer()
+        return answer_payload(self, self.test.answer(result))
+
+    def time_out(self):
+        self.timer = None
+        payload = answer_payload(self, self.test.answer_text(""))
+        payload["event"] = "timeout"
+        self.connection.send(payload)
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def close(self):
+        self.cancel_timer()
+        self.test.close()
+
+
+class Connection:
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.sessions = {}
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode("utf-8") + b"\n")
+
+    async def serve(self):
+        try:
+            while True:
+                try:
+                    line = await self.reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    self.send({"ok": False, "error": "Request too long"})
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                self.send(await self.handle(line))
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session in self.sessions.values():
+                session.close()
+                self.server.sessions.pop(session.id, None)
+            self.sessions.clear()
+            self.writer.close()
+
+    async def handle(self, line):
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise ProtocolError("Request is not valid json")
+            if not isinstance(request, dict):
+                raise ProtocolError("Request must be a json object")
+            request_id = request.get("id")
+            handler = getattr(self, f"op_{request.get('op')}", None)
+            if handler is None:
+                raise ProtocolError(f"Unknown op {request.get('op')!r}")
+            response = await handler(request)
+            response["ok"] = True
+        except ProtocolError as error:
+            response = {"ok": False, "error": str(error)}
+        except Exception as error:
+            # A failed request does not end the connection and the other tests on it
+            response = {"ok": False, "error": f"Request failed: {type(error).__name__}: {error}"}
+        if request_id is not None:
+            response["id"] = request_id
+        return response
+
+    def session(self, request):
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise ProtocolError(f"Unknown session {request.get('session')!r}")
+        return session
+
+    async def op_ping(self, request):
+        return {"sessions": len(self.server.sessions)}
+
+    async def op_start(self, request):
+        settings = make_settings()
+        if not isinstance(request.get("settings") or {}, dict):
+            raise ProtocolError("settings must be a json object")
+        settings.update(request.get("settings") or {})
+        student = str(request.get("student") or "student")
+        total = settings["total_questions"]
+        if not isinstance(total, int) or not 1 <= total <= MAX_QUESTIONS:
+            raise ProtocolError(f"total_questions must be between 1 and {MAX_QUESTIONS}")
+        delay = settings["delay"]
+        # The range is checked first, integers too large for a float overflow in isfinite
+        if not isinstance(delay, (int, float)) or isinstance(delay, bool) or not 0 <= delay <= MAX_DELAY \
+                or not math.isfinite(delay):
+            raise ProtocolError(f"delay must be a number of seconds between 0 and {MAX_DELAY}")
+        try:
+            test = await self.server.new_test(student, settings)
+        except (KeyError, TypeError, ValueError) as error:
+            raise ProtocolError(f"Invalid settings: {error}")
+        session = ClassroomSession(next(self.server.session_ids), test, settings["delay"], self)
+        self.sessions[session.id] = self.server.sessions[session.id] = session
+        return {"session": session.id, "total_questions": test.total_questions, "delay": session.delay,
+                "question": session.ask()}
+
+    async def op_answer(self, request):
+        session = self.session(request)
+        if session.test.finished:
+            raise ProtocolError("The test is finished")
+        return session.answer(request.get("answer", ""))
+
+    async def op_summary(self, request):
+        session = self.session(request)
+        return {"session": session.id, "summary": session.test.summary()}
+
+    async def op_close(self, request):
+        session = self.session(request)
+        session.close()
+        del self.sessions[session.id]
+        self.server.sessions.pop(session.id, None)
+        return {"session": session.id}
+
+
+class ClassroomServer:
+    """
+    asyncio server of the classroom tests
+    :param engine: SessionEngine shared by every test
+    """
+    def __init__(self, engine, host="127.0.0.1", port=DEFAULT_PORT):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.server = None
+        # Reading and saving in the session store waits, it runs outside the event loop. The engine is only
+        # used on the event loop, it is not thread safe.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classroom")
+
+    async def new_test(self, student, settings):
+        if self.engine.store is None:
+            return self.engine.new_session(student, settings)
+        loop = asyncio.get_running_loop()
+        if student not in self.engine.review_queues:
+            queue = await loop.run_in_executor(self._executor, self.engine.load_review_queue, student)
+            # Another test of the student may have loaded it meanwhile
+            self.engine.review_queues.setdefault(student, queue)
+        test = self.engine.new_session(student, settings, save=False)
+        await loop.run_in_executor(self._executor, test.save_start)
+        return test
+
+    async def _client_connected(self, reader, writer):
+        try:
+            await Connection(self, reader, writer).serve()
+        except asyncio.CancelledError:
+            # The server is closed while the client is connected
+            pass
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client_connected, self.host, self.port, limit=MAX_LINE)
+        # The port is chosen by the system when it is 0
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        for session in self.sessions.values():
+            session.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self._executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host Adalan tests for a classroom")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--seed", type=int, help="seed of the questions")
+    store = parser.add_mutually_exclusive_group()
+    store.add_argument("--db", help="session database, defaults to the one of the application")
+    store.add_argument("--no-store", action="store_true", help="do not save the answers")
+    args = parser.parse_args(argv)
+
+    engine = SessionEngine(args.seed, None if args.no_store else SessionStore(args.db))
+    server = ClassroomServer(engine, args.host, args.port)
+
+    async def serve():
+        await server.start()
+        print(f"Adalan classroom server listening on {server.host}:{server.port}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if engine.store is not None:
+            engine.store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
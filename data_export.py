@@ -0,0 +1,260 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Export of the stored answers and sessions for analysis in other tools.
+
+    python data_export.py OUTPUT.csv|OUTPUT.parquet|OUTPUT.arrow [--sessions] [--student NAME]
+                          [--operator OPERATOR] [--since 2024-09-01] [--until 2025-07-01]
+                          [--db PATH] [--chunk-size 50000]
+
+The rows are read from the session store in chunks and every chunk is
+written before the next one is read, so the memory used does not depend on
+the number of answers. CSV files have a header line, times in ISO 8601
+(UTC) and true/false for the correct column. Parquet files (one row group
+per chunk) and Arrow IPC files (.arrow, .feather) keep the column types:
+64 bit integers, floats for the answers, booleans and UTC timestamps in
+microseconds. They need pyarrow, which is not required by the application.
+The application exports with ExportJob, on a background thread which can be
+cancelled.
+"""
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from operators import OPERATORS
+from session_store import EXPORT_CHUNK_SIZE, SessionStore
+
+# Exported columns and their types, in the order of EXPORT_ANSWER_COLUMNS and EXPORT_SESSION_COLUMNS of the store
+ANSWER_FIELDS = (("answer_id", "int"), ("session_id", "int"), ("student", "string"), ("question_number", "int"),
+                 ("operator", "string"), ("x", "int"), ("y", "int"), ("z", "int"), ("answer", "float"),
+                 ("given", "float"), ("correct", "bool"), ("latency_ns", "int"), ("answered_at", "timestamp"))
+SESSION_FIELDS = (("session_id", "int"), ("student", "string"), ("started_at", "timestamp"),
+                  ("finished_at", "timestamp"), ("total_questions", "int"), ("total_correct", "int"),
+                  ("total_wrong", "int"), ("settings", "string"))
+
+
+def csv_value(kind, value):
+    if value is None:
+        return None
+    if kind == "timestamp":
+        return datetime.fromtimestamp(value, timezone.utc).isoformat(timespec="microseconds")
+    if kind == "bool":
+        return "true" if value else "false"
+    return value
+
+
+def import_pyarrow():
+    """
+    Returns the pyarrow module, raises ValueError if it is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet and Arrow files need pyarrow (pip install pyarrow), "
+                         "or export to a .csv file") from None
+    return pyarrow
+
+
+class CsvExport:
+    def __init__(self, path, fields):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.kinds = [kind for _, kind in fields]
+        self.converted = [index for index, kind in enumerate(self.kinds) if kind in ("timestamp", "bool")]
+        self.writer.writerow([name for name, _ in fields])
+
+    def write(self, rows):
+        if self.converted:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for index in self.converted:
+                    row[index] = csv_value(self.kinds[index], row[index])
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowExport:
+    """
+    Writes record batches to a Parquet file (one row group per batch) or to an Arrow IPC file
+    """
+    def __init__(self, path, fields, parquet):
+        self.pa = import_pyarrow()
+        types = {"int": self.pa.int64(), "float": self.pa.float64(), "bool": self.pa.bool_(),
+                 "string": self.pa.string(), "timestamp": self.pa.timestamp("us", tz="UTC")}
+        self.kinds = [kind for _, kind in fields]
+        self.schema = self.pa.schema([(name, types[kind]) for name, kind in fields])
+        if parquet:
+            self.writer = self.pa.parquet.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = self.pa.ipc.new_file(path, self.schema,
+                                               options=self.pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    def write(self, rows):
+        columns = []
+        for kind, field, values in zip(self.kinds, self.schema, zip(*rows)):
+            if kind == "timestamp":
+                values = [None if value is None else round(value * 1e6) for value in values]
+            elif kind == "bool":
+                values = [None if value is None else bool(value) for value in values]
+            columns.append(self.pa.array(values, field.type))
+        self.writer.write_batch(self.pa.record_batch(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {".csv": lambda path, fields: CsvExport(path, fields),
+           ".parquet": lambda path, fields: ArrowExport(path, fields, True),
+           ".arrow": lambda path, fields: ArrowExport(path, fields, False),
+           ".feather": lambda path, fields: ArrowExport(path, fields, False)}
+
+
+def export(store, path, sessions=False, user=None, operator=None, since=None, until=None,
+           chunk_size=EXPORT_CHUNK_SIZE, progress=None, cancel=None):
+    """
+    Writes the stored answers, or the sessions, to a file. The format is taken from the file extension.
+    The file is written next to path and renamed when it is complete.
+    :param store: SessionStore
+    :param sessions: True to export the sessions instead of the answers
+    :param user: only the answers of this student
+    :param operator: only the answers of this operator, ignored for the sessions
+    :param since: only the answers (or sessions started) from this time, epoch seconds
+    :param until: only the answers (or sessions started) before this time, epoch seconds
+    :param progress: called with the number of rows written after every chunk
+    :param cancel: threading.Event, when it is set the partial file is removed and None is returned
+    :return: number of rows written
+    """
+    writer = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer is None:
+        raise ValueError(f"Unknown export format, use one of {', '.join(WRITERS)}")
+    if sessions:
+        fields = SESSION_FIELDS
+        chunks = store.session_chunks(user, since, until, chunk_size)
+    else:
+        fields = ANSWER_FIELDS
+        chunks = store.answer_chunks(user, operator, since, until, chunk_size)
+    partial = path + ".part"
+    output = writer(partial, fields)
+    rows = 0
+    cancelled = False
+    try:
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            output.write(chunk)
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows)
+    except BaseException:
+        output.close()
+        os.remove(partial)
+        raise
+    finally:
+        chunks.close()
+    output.close()
+    if cancelled:
+        os.remove(partial)
+        return None
+    os.replace(partial, path)
+    return rows
+
+
+class ExportJob:
+    """
+    Exports on a background thread, the arguments are the ones of export. The application polls
+    rows_written and done() instead of waiting for the file.
+    """
+    def __init__(self, store, path, *args, **kwargs):
+        self.path = path
+        self.rows_written = 0
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        kwargs.update(progress=self._progress, cancel=self._cancel)
+        self._thread = threading.Thread(target=self._run, args=(store, path) + args, kwargs=kwargs,
+                                        name="data-export", daemon=True)
+        self._thread.start()
+
+    def _run(self, *args, **kwargs):
+        try:
+            self.result = export(*args, **kwargs)
+        except Exception as error:
+            self.error = error
+
+    def _progress(self, rows):
+        self.rows_written = rows
+
+    def cancel(self):
+        """
+        Stops the job after the chunk being written, the partial file is removed
+        """
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done()
+
+
+def local_date(text):
+    """
+    Returns the epoch time of the local midnight of a YYYY-MM-DD date
+    """
+    try:
+        return time.mktime(datetime.strptime(text, "%Y-%m-%d").timetuple())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text}") from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the stored answers or sessions")
+    parser.add_argument("output", help=f"output file, {', '.join(WRITERS)}")
+    parser.add_argument("--sessions", action="store_true", help="export the sessions instead of the answers")
+    parser.add_argument("--student", help="only the answers of this student")
+    parser.add_argument("--operator", choices=list(OPERATORS), metavar="OPERATOR",
+                        help=f"only the answers of this operator, from: {', '.join(OPERATORS)}")
+    parser.add_argument("--since", type=local_date, help="only from this day, YYYY-MM-DD")
+    parser.add_argument("--until", type=local_date, help="only before this day, YYYY-MM-DD")
+    parser.add_argument("--db", help="session database, defaults to the one of the application")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="rows read and written at a time")
+    parser.add_argument("--trace-memory", action="store_true", help="print the peak memory used")
+    args = parser.parse_args(argv)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    store = SessionStore(args.db)
+    try:
+        rows = export(store, args.output, args.sessions, args.student, args.operator, args.since, args.until,
+                      max(args.chunk_size, 1))
+    except ValueError as error:
+        parser.error(str(error))
+    finally:
+        store.close()
+    print(f"{rows} {'sessions' if args.sessions else 'answers'} written to {args.output} "
+          f"in {time.perf_counter() - started:.2f} s")
+    if args.trace_memory:
+        print(f"Peak memory: {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Log of the wrong answers.
+
+The log keeps structured entries (not text) in a ring buffer of fixed
+capacity, so a long kiosk session never makes it grow past the capacity;
+the oldest entries are dropped first. Entries can be filtered, counted per
+operator and exported to CSV.
+"""
+from collections import Counter
+import csv
+import time
+
+# Number of wrong answers kept in the log
+ERROR_LOG_CAPACITY = 500
+EXPORT_FIELDS = ("number", "operator", "question", "answer", "given", "answered_at")
+
+
+class RingBuffer:
+    """
+    List of fixed capacity, appending to a full buffer drops the oldest item
+    """
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        Returns an item, 0 is the oldest
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("RingBuffer index out of range")
+        return self._items[(self._start + index) % self.capacity]
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._items[(self._start + index) % self.capacity]
+
+    def is_full(self):
+        return self._count == self.capacity
+
+    def append(self, item):
+        """
+        Adds an item at the end
+        :return: the item dropped to make room, None if the buffer was not full
+        """
+        dropped = None
+        if self._count == self.capacity:
+            dropped = self.popleft()
+        self._items[(self._start + self._count) % self.capacity] = item
+        self._count += 1
+        return dropped
+
+    def popleft(self):
+        if self._count == 0:
+            raise IndexError("pop from an empty RingBuffer")
+        item = self._items[self._start]
+        self._items[self._start] = None
+        self._start = (self._start + 1) % self.capacity
+        self._count -= 1
+        return item
+
+    def clear(self):
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+
+
+class ErrorEntry:
+    __slots__ = ("number", "question", "given", "answered_at")
+
+    def __init__(self, number, question, given, answered_at):
+        self.number = number
+        self.question = question
+        self.given = given
+        self.answered_at = answered_at
+
+    def as_dict(self):
+        return {"number": self.number, "operator": self.question.operator.name,
+                "question": self.question.operator.expression(self.question), "answer": self.question.answer,
+                "given": self.given, "answered_at": self.answered_at}
+
+
+class ErrorLog:
+    """
+    Wrong answers in a ring buffer
+    """
+    def __init__(self, capacity=ERROR_LOG_CAPACITY):
+        self.entries = RingBuffer(capacity)
+        # Number of entries dropped because the log was full
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def is_full(self):
+        return self.entries.is_full()
+
+    def add(self, number, question, given, answered_at=None):
+        """
+        Adds a wrong answer
+        :param number: question number in the test
+        :param question: Question answered wrongly
+        :param given: answer entered
+        """
+        entry = ErrorEntry(number, question, given, time.time() if answered_at is None else answered_at)
+        if self.entries.append(entry) is not None:
+            self.dropped += 1
+        return entry
+
+    def drop_oldest(self):
+        self.dropped += 1
+        return self.entries.popleft()
+
+    def clear(self):
+        self.entries.clear()
+        self.dropped = 0
+
+    def filtered(self, operator=None):
+        """
+        Returns the entries of an operator (name), all the entries if operator is None
+        """
+        return [entry for entry in self.entries if operator is None or entry.question.operator.name == operator]
+
+    def counts_by_operator(self):
+        return Counter(entry.question.operator.name for entry in self.entries)
+
+    def export_csv(self, file, operator=None):
+        """
+        Writes the entries to a CSV file
+        :param file: path or open text file
+        :param operator: name of the operator to export, all the entries if None
+        """
+        if isinstance(file, str):
+            with open(file, "w", newline="", encoding="utf-8") as output:
+                return self.export_csv(output, operator)
+        writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for entry in self.filtered(operator):
+            writer.writerow(entry.as_dict())
@@ -0,0 +1,92 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Qt model of the wrong answers log. The text of a row is only built when the
+view asks for it, i.e. for the visible rows.
+"""
+import re
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from error_log import ErrorLog
+
+OPERATOR_ROLE = Qt.ItemDataRole.UserRole
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+COLUMNS = ("Q", "Question", "Answer", "You entered")
+
+
+class ErrorLogModel(QAbstractTableModel):
+    def __init__(self, error_log=None, parent=None):
+        super().__init__(parent)
+        self.error_log = error_log if error_log is not None else ErrorLog()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.error_log)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.error_log[index.row()]
+        question = entry.question
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return str(entry.number)
+            if column == 1:
+                return question.operator.expression(question)
+            if column == 2:
+                return str(question.answer)
+            return str(entry.given)
+        if role == SORT_ROLE:
+            return (entry.number, question.operator.expression(question), question.answer, entry.given)[column]
+        if role == OPERATOR_ROLE:
+            return question.operator.name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return question.operator.format_error(question, entry.given, entry.number)
+        return None
+
+    def add(self, number, question, given):
+        """
+        Adds a wrong answer, the oldest one is dropped if the log is full
+        """
+        if self.error_log.is_full():
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self.error_log.drop_oldest()
+            self.endRemoveRows()
+        row = len(self.error_log)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.error_log.add(number, question, given)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.error_log.clear()
+        self.endResetModel()
+
+
+class ErrorLogFilter(QSortFilterProxyModel):
+    """
+    Sorts the log and filters it by operator
+    """
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(model)
+        self.setSortRole(SORT_ROLE)
+        self.setFilterRole(OPERATOR_ROLE)
+        self.setFilterKeyColumn(0)
+
+    def set_operator(self, operator):
+        """
+        Shows only the answers of an operator (name), every answer if operator is None
+        """
+        self.setFilterRegularExpression("" if operator is None else f"^{re.escape(operator)}$")
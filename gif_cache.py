@@ -0,0 +1,243 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Cache of decoded result gifs.
+
+Gifs are decoded once in a background thread, every frame is scaled to the
+size of the display label and the frames are kept in a LRU cache limited by
+a memory budget. GifPlayer then only swaps ready frames into the label; a
+gif which is still being decoded is played once it is ready, the GUI never
+waits for the decoding.
+"""
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+# Default memory budget of the cache in bytes
+GIF_CACHE_BUDGET = 64 * 1024 * 1024
+# Delay used for frames which do not define one (milliseconds)
+DEFAULT_FRAME_DELAY = 100
+# Interval at which the player checks if the gif it waits for is decoded (milliseconds)
+READY_POLL_INTERVAL = 15
+
+
+class DecodedGif:
+    """
+    All frames of a gif scaled to the display size
+    """
+    def __init__(self, path, frames, delays, decode_time):
+        self.path = path
+        self.frames = frames
+        self.delays = delays
+        self.decode_time = decode_time
+        self.size_bytes = sum(frame.sizeInBytes() for frame in frames)
+
+
+def decode_gif(path, width, height):
+    """
+    Decodes all the frames of a gif and scales them to width x height. Only QImage is used so this
+    can run outside the GUI thread.
+    :return: DecodedGif
+    """
+    start = time.perf_counter()
+    reader = QImageReader(path)
+    frames = []
+    delays = []
+    while True:
+        image = reader.read()
+        if image.isNull():
+            break
+        image = image.scaled(width, height, Qt.AspectRatioMode.IgnoreAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+        frames.append(image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied))
+        delay = reader.nextImageDelay()
+        delays.append(delay if delay > 0 else DEFAULT_FRAME_DELAY)
+    return DecodedGif(path, frames, delays, time.perf_counter() - start)
+
+
+class GifCache:
+    """
+    LRU cache of decoded gifs with a memory budget
+    """
+    def __init__(self, width, height, budget=GIF_CACHE_BUDGET, workers=1):
+        self.width = width
+        self.height = height
+        self.budget = budget
+        self._gifs = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gif-decode")
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.bytes_held = 0
+        self.decode_count = 0
+        self.decode_time = 0.0
+
+    def _decode(self, path):
+        gif = decode_gif(path, self.width, self.height)
+        with self._lock:
+            self.decode_count += 1
+            self.decode_time += gif.decode_time
+            self._pending.pop(path, None)
+            self._store(gif)
+        return gif
+
+    def _store(self, gif):
+        """
+        Adds a gif and evicts the least recently used gifs until the cache fits the budget.
+        Must be called with the lock held.
+        """
+        if gif.path in self._gifs:
+            self.bytes_held -= self._gifs.pop(gif.path).size_bytes
+        self._gifs[gif.path] = gif
+        self.bytes_held += gif.size_bytes
+        while self.bytes_held > self.budget and len(self._gifs) > 1:
+            _, evicted = self._gifs.popitem(last=False)
+            self.bytes_held -= evicted.size_bytes
+
+    def prefetch(self, *paths):
+        """
+        Starts decoding the gifs in the background if they are not cached yet
+        """
+        with self._lock:
+            for path in paths:
+                if path is None or path in self._gifs or path in self._pending:
+                    continue
+                self._pending[path] = self._executor.submit(self._decode, path)
+
+    def get(self, path):
+        """
+        Returns the decoded gif. Waits for a running prefetch or decodes the gif if it is not cached.
+        """
+        with self._lock:
+            gif = self._gifs.get(path)
+            if gif is not None:
+                self._gifs.move_to_end(path)
+                self.hits += 1
+                return gif
+            self.misses += 1
+            future = self._pending.get(path)
+        if future is not None:
+            return future.result()
+        return self._decode(path)
+
+    def request(self, path):
+        """
+        Returns a future of the decoded gif without waiting, it is already done if the gif is cached.
+        The decoding is started in the background if needed.
+        """
+        with self._lock:
+            gif = self._gifs.get(path)
+            if gif is not None:
+                self._gifs.move_to_end(path)
+                self.hits += 1
+                future = Future()
+                future.set_result(gif)
+                return future
+            self.misses += 1
+            future = self._pending.get(path)
+            if future is None:
+                future = self._pending[path] = self._executor.submit(self._decode, path)
+            return future
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        Returns the cache statistics
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate(),
+                    "bytes_held": self.bytes_held, "budget": self.budget, "cached": len(self._gifs),
+                    "decode_count": self.decode_count, "decode_time": self.decode_time,
+                    "average_decode_time": self.decode_time / self.decode_count if self.decode_count else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._gifs.clear()
+            self.bytes_held = 0
+
+    def shutdown(self):
+        """
+        Drops the gifs waiting to be decoded and waits for the one being decoded, a decode still running
+        when the QApplication is deleted crashes the process
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class GifPlayer:
+    """
+    Plays a DecodedGif on a label. Only one gif is played at a time, playing a new gif stops the previous one.
+    """
+    def __init__(self, label):
+        self.label = label
+        self.gif = None
+        self.frame = 0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._next_frame)
+        # Gif being decoded, played when it is ready
+        self.pending = None
+        self.ready_timer = QTimer()
+        self.ready_timer.setInterval(READY_POLL_INTERVAL)
+        self.ready_timer.timeout.connect(self._check_pending)
+
+    def play_when_ready(self, future):
+        """
+        Plays the gif of a GifCache.request future, now if it is decoded, otherwise as soon as it is
+        """
+        if future.done():
+            self._play_future(future)
+            return
+        self.stop()
+        self.pending = future
+        self.ready_timer.start()
+
+    def _check_pending(self):
+        if self.pending is None or self.pending.done():
+            future = self.pending
+            self.ready_timer.stop()
+            self.pending = None
+            if future is not None:
+                self._play_future(future)
+
+    def _play_future(self, future):
+        # The decoding is cancelled when the cache is shut down
+        if not future.cancelled() and future.exception() is None:
+            self.play(future.result())
+
+    def play(self, gif):
+        self.stop()
+        if not gif.frames:
+            return
+        self.gif = gif
+        self.frame = 0
+        self._show_frame()
+
+    def _show_frame(self):
+        self.label.setPixmap(QPixmap.fromImage(self.gif.frames[self.frame]))
+        if len(self.gif.frames) > 1:
+            self.timer.start(self.gif.delays[self.frame])
+
+    def _next_frame(self):
+        if self.gif is None:
+            return
+        self.frame = (self.frame + 1) % len(self.gif.frames)
+        self._show_frame()
+
+    def stop(self):
+        self.ready_timer.stop()
+        self.pending = None
+        self.timer.stop()
+        self.gif = None
+        self.label.clear()
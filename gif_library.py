@@ -0,0 +1,215 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Index of the result gifs.
+
+A gif root has two folders, correct_gif and wrong_gif. The library keeps a
+manifest of every gif (size, modification time, frame count and dimensions)
+in the data folder. On refresh the folders are listed again and only new files
+and files whose size or modification time changed are read. Broken or too
+large gifs are found while scanning and are never shown.
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+from app_paths import BUNDLED_GIF_ROOT, data_path
+
+CORRECT_DIR = "correct_gif"
+WRONG_DIR = "wrong_gif"
+# Gifs bigger than this are not shown
+MAX_GIF_SIZE = 20 * 1024 * 1024
+# Gifs whose decoded frames (width x height x frames) exceed this are not shown
+MAX_GIF_PIXELS = 200 * 1000 * 1000
+MANIFEST_VERSION = 2
+
+
+class GifError(Exception):
+    pass
+
+
+def _skip_sub_blocks(file):
+    while True:
+        size = file.read(1)
+        if not size:
+            raise GifError("Unexpected end of file")
+        if size[0] == 0:
+            return
+        file.seek(size[0], os.SEEK_CUR)
+
+
+def read_gif_info(path):
+    """
+    Reads the dimensions and the number of frames of a gif without decoding the image data
+    :return: (width, height, frames)
+    """
+    with open(path, "rb") as file:
+        header = file.read(13)
+        if len(header) < 13 or header[:6] not in (b"GIF87a", b"GIF89a"):
+            raise GifError("Not a gif file")
+        width, height, packed = struct.unpack("<HHB", header[6:11])
+        if packed & 0x80:
+            file.seek(3 * (2 << (packed & 7)), os.SEEK_CUR)
+        frames = 0
+        while True:
+            block = file.read(1)
+            if not block or block == b"\x3b":
+                # Some gifs do not have the trailer, the frames read so far are fine
+                break
+            if block == b"\x2c":
+                descriptor = file.read(9)
+                if len(descriptor) < 9:
+                    break
+                packed = descriptor[8]
+                if packed & 0x80:
+                    file.seek(3 * (2 << (packed & 7)), os.SEEK_CUR)
+                # LZW minimum code size followed by the image data
+                file.read(1)
+                _skip_sub_blocks(file)
+                frames += 1
+            elif block == b"\x21":
+                file.read(1)
+                _skip_sub_blocks(file)
+            else:
+                raise GifError(f"Unknown block {block[0]:#x}")
+        if frames == 0:
+            raise GifError("Gif has no frames")
+    return width, height, frames
+
+
+class GifLibrary:
+    """
+    Gifs of one root folder. The root defaults to the gifs shipped with the application.
+    """
+    def __init__(self, root=BUNDLED_GIF_ROOT, manifest_path=None, max_size=MAX_GIF_SIZE, max_pixels=MAX_GIF_PIXELS):
+        self.root = os.path.abspath(root)
+        if manifest_path is None:
+            name = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:12]
+            manifest_path = data_path(f"gif_manifest_{name}.json")
+        self.manifest_path = manifest_path
+        self.max_size = max_size
+        self.max_pixels = max_pixels
+        self.directories = {}
+        self.scanned = False
+        self._choices = {}
+        self.load()
+
+    def load(self):
+        """
+        Loads the manifest saved by the last scan
+        """
+        try:
+            with open(self.manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return
+        # The entries are checked against the limits, other limits need a new scan
+        if (manifest.get("version") == MANIFEST_VERSION and manifest.get("root") == self.root
+                and manifest.get("max_size") == self.max_size and manifest.get("max_pixels") == self.max_pixels):
+            self.directories = manifest.get("directories", {})
+
+    def save(self):
+        manifest = {"version": MANIFEST_VERSION, "root": self.root, "max_size": self.max_size,
+                    "max_pixels": self.max_pixels, "directories": self.directories}
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _scan_file(self, path, stat, old):
+        if old is not None and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            return old
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "width": 0, "height": 0, "frames": 0,
+                 "error": None}
+        if stat.st_size > self.max_size:
+            entry["error"] = "File too large"
+            return entry
+        try:
+            entry["width"], entry["height"], entry["frames"] = read_gif_info(path)
+        except (OSError, GifError) as error:
+            entry["error"] = str(error)
+            return entry
+        if entry["width"] * entry["height"] * entry["frames"] > self.max_pixels:
+            entry["error"] = "Gif too large"
+        return entry
+
+    def _scan_directory(self, name):
+        """
+        Scans one folder. The folder is always listed, as a gif rewritten in place does not change the
+        modification time of its folder.
+        :return: True if the folder changed
+        """
+        old = self.directories.get(name)
+        old_files = old["files"] if old is not None else {}
+        files = {}
+        try:
+            with os.scandir(os.path.join(self.root, name)) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(".gif") and entry.is_file():
+                        files[entry.name] = self._scan_file(entry.path, entry.stat(), old_files.get(entry.name))
+        except OSError:
+            return self.directories.pop(name, None) is not None
+        self.directories[name] = {"files": files}
+        return old is None or files != old_files
+
+    def refresh(self):
+        """
+        Rescans the folders which changed and saves the manifest
+        :return: True if anything changed
+        """
+        changed = False
+        for name in (CORRECT_DIR, WRONG_DIR):
+            changed = self._scan_directory(name) or changed
+        self.scanned = True
+        if changed:
+            self._choices = {}
+            try:
+                self.save()
+            except OSError:
+                pass
+        return changed
+
+    def files(self, status):
+        """
+        Returns the paths of the usable gifs for correct (True) or wrong (False) answers
+        """
+        if not self.scanned:
+            self.refresh()
+        if status not in self._choices:
+            name = CORRECT_DIR if status else WRONG_DIR
+            files = self.directories.get(name, {}).get("files", {})
+            self._choices[status] = [os.path.join(self.root, name, file_name)
+                                     for file_name, entry in sorted(files.items()) if entry["error"] is None]
+        return self._choices[status]
+
+    def has_gifs(self):
+        return len(self.files(True)) != 0 or len(self.files(False)) != 0
+
+    def choose(self, status):
+        """
+        Returns a random gif for correct (True) or wrong (False) answers, None if there is no gif
+        """
+        files = self.files(status)
+        return random.choice(files) if files else None
+
+    def broken(self):
+        """
+        Returns (path, error) of the gifs which can not be shown
+        """
+        if not self.scanned:
+            self.refresh()
+        return [(os.path.join(self.root, name, file_name), entry["error"])
+                for name, directory in self.directories.items()
+                for file_name, entry in sorted(directory["files"].items()) if entry["error"] is not None]
+
+    def info(self, path):
+        """
+        Returns the manifest entry of a gif
+        """
+        name, file_name = os.path.split(os.path.relpath(path, self.root))
+        return self.directories.get(name, {}).get("files", {}).get(file_name)
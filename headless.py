@@ -0,0 +1,168 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Adalan in the terminal.
+
+    python headless.py [--operators Addition Division] [--range 0 50] [--questions 10] [--tests 1]
+                       [--answers FILE | --simulate ACCURACY] [--vertical] [--adaptive] [--no-repeat]
+                       [--student NAME] [--seed SEED] [--db PATH | --no-store] [--json]
+
+The tests run on the same SessionEngine as the main window, without Qt and
+without a display. Questions are answered at the prompt, read from an answer
+file (one answer per line, "-" for stdin) or answered by a simulated student
+who is right with the given probability. The summary of every test and the
+throughput (questions generated and checked per second) are printed at the
+end.
+"""
+import argparse
+import getpass
+import json
+import sys
+import time
+import numpy as np
+from latency import now_ns
+from operators import OPERATORS
+from session import SessionEngine, make_settings
+from session_store import SessionStore
+
+
+def prompt_answers(delay, vertical, output):
+    """
+    Asks the questions at the prompt. An answer given after the delay counts as no answer, as it
+    does when the timer of the main window runs out.
+    """
+    def answer(session, question):
+        print(f"\nQ-{session.answered + 1}/{session.total_questions}  ({delay} seconds)", file=output)
+        print("\n".join(question.lines(vertical)) + " = ", end="", file=output, flush=True)
+        while True:
+            line = sys.stdin.readline()
+            if line == "":
+                return ""
+            text = line.strip()
+            if (now_ns() - session.question_shown_ns) / 1e9 > delay:
+                print("Time is up", file=output)
+                return ""
+            try:
+                question.operator.parse_answer(text)
+                return text
+            except ValueError:
+                print("Enter a number = ", end="", file=output, flush=True)
+    return answer
+
+
+def file_answers(lines):
+    """
+    Answers from an answer file, missing answers count as no answer
+    """
+    def answer(session, question):
+        return next(lines, "").strip()
+    return answer
+
+
+def simulated_answers(accuracy, rng):
+    """
+    Simulated student who answers correctly with the probability accuracy
+    """
+    def answer(session, question):
+        value = question.answer if rng.random() < accuracy else question.answer + 1
+        return str(value)
+    return answer
+
+
+def run_tests(engine, student, settings, tests, answer, output=None, feedback=False):
+    """
+    Runs tests, answer(session, question) returns the text entered for a question
+    :param output: file the summaries are printed to, None to print nothing
+    :param feedback: True to print if each answer is correct
+    :return: list of test summaries and the throughput dictionary
+    """
+    summaries = []
+    questions = 0
+    started = time.perf_counter()
+    for _ in range(tests):
+        session = engine.new_session(student, settings)
+        while not session.finished:
+            question = session.next_question()
+            text = answer(session, question)
+            try:
+                result = session.answer_text(text)
+            except ValueError:
+                result = session.answer_text("")
+            questions += 1
+            if output is not None and feedback:
+                if result.correct:
+                    print("Correct Answer !!!", file=output)
+                else:
+                    print(f"Wrong Answer !!! {question.operator.expression(question)} = {question.answer}",
+                          file=output)
+        summaries.append(session.summary())
+        if output is not None:
+            print("\n" + session.summary_text(), file=output)
+    elapsed = time.perf_counter() - started
+    throughput = {"tests": tests, "questions": questions, "seconds": elapsed,
+                  "questions_per_second": questions / elapsed if elapsed else None}
+    return summaries, throughput
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Take Adalan tests in the terminal")
+    parser.add_argument("--operators", nargs="+", default=["Addition"], choices=list(OPERATORS),
+                        metavar="OPERATOR", help=f"operators to ask, from: {', '.join(OPERATORS)}")
+    parser.add_argument("--range", nargs=2, type=int, default=[0, 50], metavar=("START", "END"),
+                        help="lowest and highest operand")
+    parser.add_argument("--questions", type=int, default=10, help="number of questions of a test")
+    parser.add_argument("--tests", type=int, default=1, help="number of tests")
+    parser.add_argument("--delay", type=int, default=5, help="seconds to answer a question at the prompt")
+    parser.add_argument("--vertical", action="store_true", help="display the questions vertically")
+    parser.add_argument("--adaptive", action="store_true", help="ask more of the questions answered wrongly or slowly")
+    parser.add_argument("--no-repeat", action="store_true", help="do not repeat a question")
+    answers = parser.add_mutually_exclusive_group()
+    answers.add_argument("--answers", help="answer file, one answer per line, - for stdin")
+    answers.add_argument("--simulate", type=float, metavar="ACCURACY",
+                         help="answer with a simulated student who is right with this probability")
+    parser.add_argument("--student", default=getpass.getuser(), help="name of the student")
+    parser.add_argument("--seed", type=int, help="seed of the questions")
+    store = parser.add_mutually_exclusive_group()
+    store.add_argument("--db", help="session database, defaults to the one of the application")
+    store.add_argument("--no-store", action="store_true", help="do not save the answers")
+    parser.add_argument("--json", action="store_true", help="print the summaries and throughput as json")
+    args = parser.parse_args(argv)
+
+    if args.range[0] > args.range[1] or args.questions < 1 or args.tests < 1:
+        parser.error("the range, number of questions and number of tests must be valid")
+    settings = make_settings(args.range[0], args.range[1], args.questions, args.operators, args.delay,
+                             args.vertical, args.adaptive, args.no_repeat)
+    engine = SessionEngine(args.seed, None if args.no_store else SessionStore(args.db))
+    output = None if args.json else sys.stdout
+    answer_file = None
+    try:
+        if args.simulate is not None:
+            answer = simulated_answers(args.simulate, np.random.default_rng(args.seed))
+        elif args.answers is not None:
+            answer_file = sys.stdin if args.answers == "-" else open(args.answers, encoding="utf-8")
+            answer = file_answers(iter(answer_file))
+        else:
+            answer = prompt_answers(args.delay, args.vertical, sys.stdout)
+        summaries, throughput = run_tests(engine, args.student, settings, args.tests, answer, output,
+                                          feedback=args.simulate is None)
+    finally:
+        if answer_file is not None and answer_file is not sys.stdin:
+            answer_file.close()
+        if engine.store is not None:
+            engine.store.close()
+
+    if args.json:
+        print(json.dumps({"settings": settings, "tests": summaries, "throughput": throughput}, indent=2))
+    else:
+        rate = throughput["questions_per_second"]
+        rate = "too fast to measure" if rate is None else f"{rate:.0f} questions/s"
+        print(f"\n{throughput['questions']} questions in {throughput['seconds']:.3f} s ({rate})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Response time (latency) statistics.
+
+Latencies are measured in nanoseconds with time.monotonic_ns and kept in
+log spaced histograms: every bucket is 5% wider than the previous one, so a
+percentile is exact to within 5% and a histogram takes a few kilobytes
+whatever the number of answers. One histogram is kept per operator and
+operand size (number of digits of the largest operand).
+"""
+from array import array
+import math
+import time
+
+# Smallest and largest latency kept apart, smaller and larger values go to the first and last bucket
+MIN_LATENCY_NS = 1000000          # 1 ms
+MAX_LATENCY_NS = 3600 * 10 ** 9   # 1 hour
+BUCKET_GROWTH = 1.05
+BUCKET_COUNT = int(math.ceil(math.log(MAX_LATENCY_NS / MIN_LATENCY_NS, BUCKET_GROWTH))) + 1
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def now_ns():
+    """
+    Monotonic clock in nanoseconds
+    """
+    return time.monotonic_ns()
+
+
+def bucket_count(min_ns=MIN_LATENCY_NS):
+    return int(math.ceil(math.log(MAX_LATENCY_NS / min_ns, BUCKET_GROWTH))) + 1
+
+
+def bucket_index(latency_ns, min_ns=MIN_LATENCY_NS, count=BUCKET_COUNT):
+    if latency_ns <= min_ns:
+        return 0
+    return min(int(math.log(latency_ns / min_ns) / _LOG_GROWTH) + 1, count - 1)
+
+
+def bucket_value(index, min_ns=MIN_LATENCY_NS):
+    """
+    Returns the upper bound of a bucket in nanoseconds
+    """
+    return int(min_ns * BUCKET_GROWTH ** index)
+
+
+def operand_digits(x, y):
+    """
+    Number of digits of the largest operand
+    """
+    return len(str(max(abs(int(x)), abs(int(y)))))
+
+
+def operand_size(question):
+    """
+    Number of digits of the largest operand of a question
+    """
+    return operand_digits(question.x, question.y)
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in nanoseconds
+    :param min_ns: smallest latency kept apart, 1 ms suits answers, shorter operations need a lower one
+    """
+    def __init__(self, min_ns=MIN_LATENCY_NS):
+        self.floor_ns = min_ns
+        self.bucket_count = BUCKET_COUNT if min_ns == MIN_LATENCY_NS else bucket_count(min_ns)
+        self.counts = array("Q", bytes(8 * self.bucket_count))
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = None
+
+    def record(self, latency_ns):
+        self.counts[bucket_index(latency_ns, self.floor_ns, self.bucket_count)] += 1
+        self.count += 1
+        self.total_ns += latency_ns
+        if self.min_ns is None or latency_ns < self.min_ns:
+            self.min_ns = latency_ns
+        if self.max_ns is None or latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+
+    def merge(self, other):
+        if other.floor_ns != self.floor_ns:
+            raise ValueError("Histograms with different bounds can not be merged")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+            self.max_ns = other.max_ns if self.max_ns is None else max(self.max_ns, other.max_ns)
+
+    def percentile(self, percent):
+        """
+        Returns the latency in nanoseconds below which percent % of the answers fall, None if there is no answer
+        """
+        if self.count == 0:
+            return None
+        rank = max(int(math.ceil(self.count * percent / 100)), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == self.bucket_count - 1:
+                    # The last bucket holds every longer latency, it has no bound
+                    return self.max_ns
+                # The bucket bound is clamped to the values actually seen
+                return min(max(bucket_value(index, self.floor_ns), self.min_ns), self.max_ns)
+        return self.max_ns
+
+    def mean(self):
+        return self.total_ns / self.count if self.count else None
+
+    def summary(self):
+        """
+        Returns count, mean, min, max, p50, p90 and p99 in seconds
+        """
+        def seconds(value):
+            return None if value is None else value / 1e9
+
+        return {"count": self.count, "mean": seconds(self.mean()), "min": seconds(self.min_ns),
+                "max": seconds(self.max_ns), "p50": seconds(self.percentile(50)),
+                "p90": seconds(self.percentile(90)), "p99": seconds(self.percentile(99))}
+
+
+class LatencyStats:
+    """
+    Latency histograms per operator and operand size
+    """
+    def __init__(self):
+        self.histograms = {}
+
+    def record(self, question, latency_ns):
+        key = (question.operator.name, operand_size(question))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(latency_ns)
+
+    def histogram(self, operator=None, size=None):
+        """
+        Returns the histogram of an operator and/or operand size, all the answers if both are None
+        """
+        merged = LatencyHistogram()
+        for (name, digits), histogram in self.histograms.items():
+            if (operator is None or name == operator) and (size is None or digits == size):
+                merged.merge(histogram)
+        return merged
+
+    def summary(self):
+        """
+        Returns a list of (operator, operand size, summary) sorted by operator and operand size
+        """
+        return [(name, digits, self.histograms[(name, digits)].summary())
+                for name, digits in sorted(self.histograms)]
+
+    def clear(self):
+        self.histograms.clear()
@@ -0,0 +1,449 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Operator registry for Adalan.
+
+Every operator is one object which knows how to generate operands for a batch
+of questions, solve them, render them on the screen and format the error
+message for a wrong answer. Operators are registered under the check box
+text, so adding a new operator only needs a new class and a check box.
+"""
+import math
+import numpy as np
+
+# Question spaces are indexed with int64, larger spaces are cut to this size
+MAX_SPACE_SIZE = 2 ** 62
+# Largest exponent solved, larger ones (only found on answer sheets) can not be solved
+MAX_EXPONENT = 100
+
+OPERATORS = {}
+
+
+def register_operator(operator):
+    """
+    Adds an operator to the registry
+    :param operator: Operator instance
+    :return: the operator
+    """
+    OPERATORS[operator.name] = operator
+    return operator
+
+
+def get_operator(name):
+    """
+    Returns the registered operator for the check box text
+    """
+    return OPERATORS[name]
+
+
+class Operator:
+    """
+    Base operator. Operands x and y are picked between start and end, z is not used.
+
+    layout is used by the main window to show the controls:
+    "binary" (x operator y), "power" (y to the power z) or "sqrt" (square root of x)
+    """
+    name = None
+    symbol = None
+    layout = "binary"
+
+    def generate(self, rng, start, end, count):
+        """
+        Generates operands for count questions
+        :param rng: numpy random generator
+        :param start: lowest operand
+        :param end: highest operand
+        :param count: number of questions
+        :return: x, y and z operand arrays
+        """
+        x = rng.integers(start, end, size=count, endpoint=True)
+        y = rng.integers(start, end, size=count, endpoint=True)
+        z = np.zeros(count, dtype=np.int64)
+        return x, y, z
+
+    def solve(self, x, y, z):
+        """
+        Returns the list of correct answers for the operand arrays
+        """
+        raise NotImplementedError
+
+    def space_size(self, start, end):
+        """
+        Returns the number of different questions with operands between start and end. Used to ask
+        questions without repeats.
+        """
+        size = end - start + 1
+        return min(size * size, MAX_SPACE_SIZE)
+
+    def operands_at(self, index, start, end):
+        """
+        Returns the operands of the questions at the positions index (int64 array) of the question space
+        :return: x, y and z operand arrays
+        """
+        size = end - start + 1
+        x = start + index // size
+        y = start + index % size
+        return x, y, np.zeros(len(index), dtype=np.int64)
+
+    def parse_answer(self, text):
+        """
+        Converts the entered text to a number
+        """
+        if text == "":
+            return 0
+        return int(text)
+
+    def render(self, question):
+        """
+        Returns the texts for the first operand, operator, second operand and power controls
+        """
+        return str(question.x), self.symbol, str(question.y), ""
+
+    def expression(self, question):
+        """
+        Returns the question as a single line of text
+        """
+        return f"{question.x} {self.symbol} {question.y}"
+
+    def format_error(self, question, result, number):
+        """
+        Returns the text written to the wrong answers log
+        :param question: Question answered wrongly
+        :param result: answer entered by the user
+        :param number: question number
+        """
+        return f"(Q-{number}) {self.expression(question)} = {question.answer}  You entered: {result}\n" \
+               f"-------------------------------------"
+
+
+class Addition(Operator):
+    name = "Addition"
+    symbol = "+"
+
+    def solve(self, x, y, z):
+        return (x + y).tolist()
+
+
+class Subtraction(Operator):
+    name = "Subtraction"
+    symbol = "-"
+
+    def solve(self, x, y, z):
+        return (x - y).tolist()
+
+
+class Multiplication(Operator):
+    name = "Multiplication"
+    symbol = "X"
+
+    def solve(self, x, y, z):
+        return (x * y).tolist()
+
+
+class Division(Operator):
+    name = "Division"
+    symbol = "/"
+
+    def generate(self, rng, start, end, count):
+        x, y, z = super().generate(rng, start, end, count)
+        # Handle divide by zero: make x a multiple of y so the answer is a whole number
+        both_zero = (x == 0) & (y == 0)
+        x[both_zero] = 1
+        y[both_zero] = 1
+        y_zero = y == 0
+        y[y_zero] = x[y_zero]
+        x[y_zero] = 0
+        return x * y, y, z
+
+    def solve(self, x, y, z):
+        # round(x / y), computed on integers so large operands stay exact. Generated questions are always
+        # multiples, answer sheets may have any operands.
+        # // and % rather than divmod, which has no loop for the Python integers of answer sheets
+        quotient = x // y
+        remainder = x % y
+        twice = np.abs(2 * remainder)
+        divisor = np.abs(y)
+        # Halves are rounded to even like round()
+        round_up = (twice > divisor) | ((twice == divisor) & (quotient % 2 == 1))
+        return (quotient + round_up).tolist()
+
+    @staticmethod
+    def _divisors(start, end):
+        """
+        Returns the number of negative divisors, the lowest positive divisor and the number of divisors,
+        every operand of the range but 0
+        """
+        negatives = max(min(end, -1) - start + 1, 0)
+        low = max(start, 1)
+        return negatives, low, negatives + max(end - low + 1, 0)
+
+    def space_size(self, start, end):
+        # quotient x divisor. 0 / 0 is asked as 1 / 1 by generate, it is one more question when the
+        # range ends at 0.
+        divisors = self._divisors(start, end)[2]
+        size = (end - start + 1) * divisors + (end == 0)
+        return min(size, MAX_SPACE_SIZE)
+
+    def operands_at(self, index, start, end):
+        negatives, low, divisors = self._divisors(start, end)
+        pairs = (end - start + 1) * divisors
+        # Positions past the pairs are 1 / 1
+        extra = index >= pairs
+        quotient = np.where(extra, 1, start + index // max(divisors, 1))
+        divisor = index % max(divisors, 1)
+        y = np.where(extra, 1, np.where(divisor < negatives, start + divisor, low + divisor - negatives))
+        return quotient * y, y, np.zeros(len(index), dtype=np.int64)
+
+
+class Power(Operator):
+    """
+    y to the power of a fixed exponent
+    """
+    layout = "power"
+
+    def __init__(self, name, symbol, exponent):
+        self.name = name
+        self.symbol = symbol
+        self.exponent = exponent
+
+    def generate(self, rng, start, end, count):
+        x, y, z = super().generate(rng, start, end, count)
+        z[:] = self.exponent
+        return x, y, z
+
+    def solve(self, x, y, z):
+        # Powers are computed on Python integers, a cube is above int64 from 2097152 on
+        exponents = z.tolist()
+        if any(exponent < 0 or exponent > MAX_EXPONENT for exponent in exponents):
+            raise ValueError(f"Exponents must be between 0 and {MAX_EXPONENT}")
+        return [int(base) ** exponent for base, exponent in zip(y.tolist(), exponents)]
+
+    def space_size(self, start, end):
+        return end - start + 1
+
+    def operands_at(self, index, start, end):
+        y = start + index
+        return y.copy(), y, np.full(len(index), self.exponent, dtype=np.int64)
+
+    def render(self, question):
+        return str(question.x), self.symbol, str(question.y), str(question.z)
+
+    def expression(self, question):
+        return " x ".join([str(question.y)] * question.z)
+
+
+class Exponent(Power):
+    """
+    Small base to the power of 0 to 5
+    """
+    max_base = 12
+    max_exponent = 5
+
+    def __init__(self):
+        super().__init__("Exponent", "^", None)
+
+    def _bases(self, start, end):
+        high = max(min(end, self.max_base), 0)
+        low = min(max(start, 0), high)
+        return low, high
+
+    def generate(self, rng, start, end, count):
+        low, high = self._bases(start, end)
+        x = np.zeros(count, dtype=np.int64)
+        y = rng.integers(low, high, size=count, endpoint=True)
+        z = rng.integers(0, self.max_exponent, size=count, endpoint=True)
+        return x, y, z
+
+    def space_size(self, start, end):
+        low, high = self._bases(start, end)
+        return (high - low + 1) * (self.max_exponent + 1)
+
+    def operands_at(self, index, start, end):
+        low, _ = self._bases(start, end)
+        y = low + index // (self.max_exponent + 1)
+        z = index % (self.max_exponent + 1)
+        return np.zeros(len(index), dtype=np.int64), y, z
+
+    def expression(self, question):
+        return f"{question.y}^{question.z}"
+
+
+class SquareRoot(Operator):
+    name = "SquareRoot"
+    symbol = "sqrt"
+    layout = "sqrt"
+
+    def solve(self, x, y, z):
+        # Rounded the same way the answer is entered (2 decimals)
+        return [round(math.sqrt(value), 2) for value in x.tolist()]
+
+    def space_size(self, start, end):
+        return end - start + 1
+
+    def operands_at(self, index, start, end):
+        x = start + index
+        return x, x.copy(), np.zeros(len(index), dtype=np.int64)
+
+    def parse_answer(self, text):
+        if text == "":
+            return 0
+        return float(text)
+
+    def render(self, question):
+        return str(question.x), self.symbol, f"√{question.x}", ""
+
+    def expression(self, question):
+        return f"√{question.x}"
+
+
+def _multiples(steps, start, end):
+    """
+    Returns the lowest multiplier and the number of multipliers so that step * multiplier covers
+    the values generated between start and end, for every step
+    """
+    low = np.maximum(max(start, 1) // steps, 1)
+    high = np.maximum(max(end, 1) // steps, 1)
+    return low, high - low + 1
+
+
+def _mixed_index(index, counts):
+    """
+    Splits positions of a space made of consecutive parts of counts items
+    :return: part of each position and the position inside the part
+    """
+    ends = np.cumsum(counts)
+    part = np.searchsorted(ends, index, side="right")
+    return part, index - (ends - counts)[part]
+
+
+class Percentage(Operator):
+    """
+    x % of y, y is picked so the answer is a whole number
+    """
+    name = "Percentage"
+    symbol = "of"
+    percentages = np.array([5, 10, 20, 25, 50, 75, 100])
+
+    def generate(self, rng, start, end, count):
+        x = rng.choice(self.percentages, size=count)
+        # y has to be a multiple of step for x % of y to be a whole number
+        step = 100 // np.gcd(x, 100)
+        multiple = rng.integers(max(start, 1), max(end, 1), size=count, endpoint=True)
+        y = step * np.maximum(multiple // step, 1)
+        z = np.zeros(count, dtype=np.int64)
+        return x, y, z
+
+    def solve(self, x, y, z):
+        return (x * y // 100).tolist()
+
+    def space_size(self, start, end):
+        steps = 100 // np.gcd(self.percentages, 100)
+        return int(_multiples(steps, start, end)[1].sum())
+
+    def operands_at(self, index, start, end):
+        steps = 100 // np.gcd(self.percentages, 100)
+        low, counts = _multiples(steps, start, end)
+        part, position = _mixed_index(index, counts)
+        y = steps[part] * (low[part] + position)
+        return self.percentages[part], y, np.zeros(len(index), dtype=np.int64)
+
+    def render(self, question):
+        return f"{question.x}%", self.symbol, str(question.y), ""
+
+    def expression(self, question):
+        return f"{question.x}% of {question.y}"
+
+
+class Fraction(Operator):
+    """
+    x/z of y, y is picked as a multiple of z so the answer is a whole number
+    """
+    name = "Fraction"
+    symbol = "of"
+    max_denominator = 10
+
+    def generate(self, rng, start, end, count):
+        z = rng.integers(2, self.max_denominator, size=count, endpoint=True)
+        x = rng.integers(1, z, size=count)
+        multiple = rng.integers(max(start, 1), max(end, 1), size=count, endpoint=True)
+        y = z * np.maximum(multiple // z, 1)
+        return x, y, z
+
+    def solve(self, x, y, z):
+        return (y // z * x).tolist()
+
+    def _fractions(self):
+        denominators = np.repeat(np.arange(2, self.max_denominator + 1), np.arange(1, self.max_denominator))
+        numerators = np.concatenate([np.arange(1, denominator) for denominator in range(2, self.max_denominator + 1)])
+        return numerators, denominators
+
+    def space_size(self, start, end):
+        _, denominators = self._fractions()
+        return int(_multiples(denominators, start, end)[1].sum())
+
+    def operands_at(self, index, start, end):
+        numerators, denominators = self._fractions()
+        low, counts = _multiples(denominators, start, end)
+        part, position = _mixed_index(index, counts)
+        z = denominators[part]
+        return numerators[part], z * (low[part] + position), z
+
+    def render(self, question):
+        return f"{question.x}/{question.z}", self.symbol, str(question.y), ""
+
+    def expression(self, question):
+        return f"{question.x}/{question.z} of {question.y}"
+
+
+class TwoStep(Operator):
+    """
+    (x + y) X z, z is kept small
+    """
+    name = "Two Step"
+    symbol = "X"
+    max_multiplier = 12
+
+    def _multipliers(self, start, end):
+        high = max(min(end, self.max_multiplier), 0)
+        return min(max(start, 0), high), high
+
+    def generate(self, rng, start, end, count):
+        x, y, z = super().generate(rng, start, end, count)
+        z = rng.integers(*self._multipliers(start, end), size=count, endpoint=True)
+        return x, y, z
+
+    def space_size(self, start, end):
+        low, high = self._multipliers(start, end)
+        return min(super().space_size(start, end) * (high - low + 1), MAX_SPACE_SIZE)
+
+    def operands_at(self, index, start, end):
+        low, high = self._multipliers(start, end)
+        multipliers = high - low + 1
+        x, y, _ = super().operands_at(index // multipliers, start, end)
+        return x, y, low + index % multipliers
+
+    def solve(self, x, y, z):
+        return ((x + y) * z).tolist()
+
+    def render(self, question):
+        return f"({question.x} + {question.y})", self.symbol, str(question.z), ""
+
+    def expression(self, question):
+        return f"({question.x} + {question.y}) X {question.z}"
+
+
+register_operator(Addition())
+register_operator(Subtraction())
+register_operator(Multiplication())
+register_operator(Division())
+register_operator(Power("Square", "x2", 2))
+register_operator(Power("Cube", "x3", 3))
+register_operator(SquareRoot())
+register_operator(Percentage())
+register_operator(Fraction())
+register_operator(Exponent())
+register_operator(TwoStep())
@@ -0,0 +1,209 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Profiling of the Qt slots.
+
+    python Adalan.py --profile slots.json [--profile-memory]
+
+or set ADALAN_PROFILE=slots.json (or slots.prom). Off by default: without
+it nothing is wrapped and the slots run as before.
+
+Every profiled slot (validate_result, start_testing, show_time,
+display_image and the construction of the results dialog) counts its calls
+and keeps the wall time and the CPU time of the main thread in latency
+histograms. With memory tracing, tracemalloc also records the memory
+allocated by each call and keeps the largest allocation sites. The numbers
+are shown by Debug > Slot timings and written when the application quits,
+as JSON or, for a .prom or .txt file, in the Prometheus text format.
+"""
+import functools
+import json
+import os
+import time
+import tracemalloc
+from latency import LatencyHistogram
+
+# Slots are much faster than answers, times are kept apart down to 1 microsecond
+SLOT_MIN_NS = 1000
+# Allocation sites listed in the memory snapshot
+SNAPSHOT_LINES = 20
+PROMETHEUS_EXTENSIONS = (".prom", ".txt")
+
+
+class SlotStats:
+    """
+    Calls and times of one slot
+    """
+    def __init__(self, name):
+        self.name = name
+        self.wall = LatencyHistogram(SLOT_MIN_NS)
+        self.cpu = LatencyHistogram(SLOT_MIN_NS)
+        self.errors = 0
+        # Only with memory tracing: bytes allocated by the calls (peak above the memory used at the call)
+        self.allocated_total = 0
+        self.allocated_max = 0
+
+    def summary(self):
+        result = {"calls": self.wall.count, "errors": self.errors, "wall": self.wall.summary(),
+                  "cpu": self.cpu.summary()}
+        if self.allocated_total:
+            result["allocated_total_bytes"] = self.allocated_total
+            result["allocated_max_bytes"] = self.allocated_max
+        return result
+
+
+class SlotProfiler:
+    """
+    Wraps slots to measure them
+    :param trace_memory: True to also trace the memory allocated by the slots with tracemalloc
+    """
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.slots = {}
+        self.started = time.time()
+        # Peak traced memory of every slot call in progress, outer calls first. tracemalloc has a single peak,
+        # a call resets it and folds the peak it saw into the call around it when it returns.
+        self._peaks = []
+        # Highest traced memory seen, the peak of tracemalloc is reset by the calls
+        self.peak_memory = 0
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stats(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = SlotStats(name)
+        return slot
+
+    def wrap(self, name, function):
+        """
+        Returns function measured as the slot name
+        """
+        slot = self.stats(name)
+        trace_memory = self.trace_memory
+        peaks = self._peaks
+
+        @functools.wraps(function)
+        def profiled(*args, **kwargs):
+            if trace_memory:
+                memory, peak = tracemalloc.get_traced_memory()
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+                peaks.append(memory)
+                tracemalloc.reset_peak()
+            started = time.perf_counter_ns()
+            started_cpu = time.thread_time_ns()
+            try:
+                return function(*args, **kwargs)
+            except BaseException:
+                slot.errors += 1
+                raise
+            finally:
+                slot.cpu.record(time.thread_time_ns() - started_cpu)
+                slot.wall.record(time.perf_counter_ns() - started)
+                if trace_memory:
+                    peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+                    if peaks:
+                        peaks[-1] = max(peaks[-1], peak)
+                    self.peak_memory = max(self.peak_memory, peak)
+                    tracemalloc.reset_peak()
+                    allocated = max(peak - memory, 0)
+                    slot.allocated_total += allocated
+                    slot.allocated_max = max(slot.allocated_max, allocated)
+        return profiled
+
+    def instrument(self, instance, names, prefix=None):
+        """
+        Replaces methods of an instance by measured ones. Call it before the methods are connected to signals.
+        """
+        prefix = prefix or type(instance).__name__
+        for name in names:
+            setattr(instance, name, self.wrap(f"{prefix}.{name}", getattr(instance, name)))
+
+    def snapshot(self, limit=SNAPSHOT_LINES):
+        """
+        Returns the largest allocation sites as a list of {"file", "line", "size", "count"}, empty without tracing
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        statistics = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)).statistics("lineno")
+        return [{"file": stat.traceback[0].filename, "line": stat.traceback[0].lineno, "size": stat.size,
+                 "count": stat.count} for stat in statistics[:limit]]
+
+    def results(self):
+        result = {"started": self.started, "seconds": time.time() - self.started,
+                  "slots": {name: slot.summary() for name, slot in sorted(self.slots.items())}}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.peak_memory)
+            result["memory"] = {"current_bytes": current, "peak_bytes": peak, "top": self.snapshot()}
+        return result
+
+    def to_prometheus(self):
+        """
+        Returns the measures in the Prometheus text format
+        """
+        lines = ["# HELP adalan_slot_calls_total Calls of the slot",
+                 "# TYPE adalan_slot_calls_total counter"]
+        lines.extend(f'adalan_slot_calls_total{{slot="{name}"}} {slot.wall.count}'
+                     for name, slot in sorted(self.slots.items()))
+        lines.extend(["# HELP adalan_slot_errors_total Calls of the slot which raised an exception",
+                      "# TYPE adalan_slot_errors_total counter"])
+        lines.extend(f'adalan_slot_errors_total{{slot="{name}"}} {slot.errors}'
+                     for name, slot in sorted(self.slots.items()))
+        for clock, help_text in (("wall", "Wall clock time of the slot"), ("cpu", "CPU time of the slot")):
+            metric = f"adalan_slot_{clock}_seconds"
+            lines.extend([f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"])
+            for name, slot in sorted(self.slots.items()):
+                histogram = getattr(slot, clock)
+                if histogram.count:
+                    for quantile in (50, 90, 99):
+                        lines.append(f'{metric}{{slot="{name}",quantile="{quantile / 100}"}} '
+                                     f'{histogram.percentile(quantile) / 1e9:.9f}')
+                lines.append(f'{metric}_sum{{slot="{name}"}} {histogram.total_ns / 1e9:.9f}')
+                lines.append(f'{metric}_count{{slot="{name}"}} {histogram.count}')
+        if self.trace_memory:
+            lines.extend(["# HELP adalan_slot_allocated_bytes_total Memory allocated by the calls of the slot",
+                          "# TYPE adalan_slot_allocated_bytes_total counter"])
+            lines.extend(f'adalan_slot_allocated_bytes_total{{slot="{name}"}} {slot.allocated_total}'
+                         for name, slot in sorted(self.slots.items()))
+            lines.extend(["# HELP adalan_traced_memory_bytes Memory traced by tracemalloc",
+                          "# TYPE adalan_traced_memory_bytes gauge",
+                          f"adalan_traced_memory_bytes {tracemalloc.get_traced_memory()[0]}"])
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """
+        Returns a text table of the slots, slowest total time first
+        """
+        lines = [f"{'Slot':<30} {'Calls':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'CPU p99':>8} {'Total s':>8}"]
+        for slot in sorted(self.slots.values(), key=lambda slot: slot.wall.total_ns, reverse=True):
+            if not slot.wall.count:
+                lines.append(f"{slot.name:<30} {0:>7}")
+                continue
+            lines.append(f"{slot.name:<30} {slot.wall.count:>7} {slot.wall.percentile(50) / 1e6:>8.2f} "
+                         f"{slot.wall.percentile(99) / 1e6:>8.2f} {slot.wall.max_ns / 1e6:>8.2f} "
+                         f"{slot.cpu.percentile(99) / 1e6:>8.2f} {slot.wall.total_ns / 1e9:>8.2f}")
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.peak_memory)
+            lines.append(f"\nTraced memory {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Writes the measures, Prometheus text for .prom and .txt files, JSON otherwise
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            if path.lower().endswith(PROMETHEUS_EXTENSIONS):
+                file.write(self.to_prometheus())
+            else:
+                json.dump(self.results(), file, indent=2)
@@ -0,0 +1,248 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Question generation for Adalan.
+
+This module has no Qt dependency so the same generator can be used by the
+GUI, for worksheets and for kiosk sessions. Questions are generated in
+batches with NumPy; the GUI simply takes the next item from the batch.
+"""
+import numpy as np
+from operators import get_operator
+
+
+class Question:
+    """
+    A single question with its answer key. operator is the registered Operator object.
+    """
+    __slots__ = ("x", "y", "z", "operator", "answer")
+
+    def __init__(self, x, y, operator, answer, z=0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.operator = operator
+        self.answer = answer
+
+    def __repr__(self):
+        return f"Question({self.x!r}, {self.y!r}, {self.operator.name!r}, answer={self.answer!r}, z={self.z!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return (self.x, self.y, self.z, self.operator, self.answer) == \
+            (other.x, other.y, other.z, other.operator, other.answer)
+
+    def lines(self, vertical=False):
+        """
+        Returns the question as lines of text, laid out as on the screen
+        :param vertical: True to put the operands one above the other
+        """
+        operator = self.operator
+        left, symbol, right, power = operator.render(self)
+        if operator.layout == "power":
+            return [f"{right}^{power}"]
+        if operator.layout == "sqrt":
+            return [right]
+        if vertical:
+            width = max(len(left), len(right)) + 2
+            return [left.rjust(width), f"{symbol} {right.rjust(width - 2)}", "-" * width]
+        return [f"{left} {symbol} {right}"]
+
+    def check(self, result):
+        """
+        Returns True if result is the correct answer
+        """
+        return result == self.answer
+
+
+def _mix(value):
+    """
+    splitmix64 finalizer, used as the round function of the permutation
+    """
+    value = (value ^ (value >> 30)) * 0xbf58476d1ce4e5b9 & 0xffffffffffffffff
+    value = (value ^ (value >> 27)) * 0x94d049bb133111eb & 0xffffffffffffffff
+    return value ^ (value >> 31)
+
+
+class LazyPermutation:
+    """
+    Pseudo random permutation of range(size) computed one position at a time, so no list of the
+    size is ever built. It is a Feistel network over the smallest even number of bits which can hold
+    size; values outside range(size) are encrypted again until they fall inside (cycle walking).
+    """
+    rounds = 4
+
+    def __init__(self, size, rng):
+        self.size = size
+        bits = max((size - 1).bit_length(), 2)
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.keys = [int(key) for key in rng.integers(0, 2 ** 63, size=self.rounds)]
+        self.position = 0
+
+    def _encrypt(self, value):
+        left = value >> self.half_bits
+        right = value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.mask)
+        return (left << self.half_bits) | right
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, position):
+        value = self._encrypt(position)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def remaining(self):
+        return self.size - self.position
+
+    def take(self, count):
+        """
+        Returns the next count values of the permutation
+        """
+        count = min(count, self.remaining())
+        values = [self[position] for position in range(self.position, self.position + count)]
+        self.position += count
+        return values
+
+
+class QuestionBatch:
+    """
+    A batch of generated questions stored as NumPy columns
+    """
+    def __init__(self, x, y, z, operator_index, operators, answers):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.operator_index = operator_index
+        self.operators = tuple(operators)
+        self.answers = answers
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        """
+        Returns the question at index
+        """
+        return Question(int(self.x[index]), int(self.y[index]), self.operators[self.operator_index[index]],
+                        self.answers[index], int(self.z[index]))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def mix(self, questions, rng):
+        """
+        Returns a new batch with the questions added and the order shuffled
+        :param questions: list of Question
+        :param rng: numpy random generator
+        """
+        if len(questions) == 0:
+            return self
+        operators = list(self.operators)
+        for question in questions:
+            if question.operator not in operators:
+                operators.append(question.operator)
+        order = rng.permutation(len(self) + len(questions))
+        x = np.concatenate([self.x, np.array([question.x for question in questions], dtype=np.int64)])
+        y = np.concatenate([self.y, np.array([question.y for question in questions], dtype=np.int64)])
+        z = np.concatenate([self.z, np.array([question.z for question in questions], dtype=np.int64)])
+        operator_index = np.concatenate([self.operator_index,
+                                         np.array([operators.index(question.operator) for question in questions])])
+        answers = np.empty(len(questions), dtype=object)
+        answers[:] = [question.answer for question in questions]
+        answers = np.concatenate([self.answers, answers])
+        return QuestionBatch(x[order], y[order], z[order], operator_index[order], operators, answers[order])
+
+    def split(self, size):
+        """
+        Splits the batch into consecutive batches of the given size. The new batches are views on
+        the same arrays so no question is copied.
+        :param size: number of questions in each batch
+        :return: list of QuestionBatch
+        """
+        return [QuestionBatch(self.x[start:start + size], self.y[start:start + size], self.z[start:start + size],
+                              self.operator_index[start:start + size], self.operators,
+                              self.answers[start:start + size])
+                for start in range(0, len(self), size)]
+
+
+class QuestionGenerator:
+    """
+    Generates questions in batches. Passing a seed makes the generated questions reproducible.
+    """
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        # (operator, start, end) -> LazyPermutation used to ask questions without repeats
+        self.permutations = {}
+
+    def unique_operands(self, operator, start, end, count):
+        """
+        Returns operands of count questions which were not asked since the last time every question
+        of the operator and range was asked
+        :return: x, y and z operand arrays
+        """
+        key = (operator.name, start, end)
+        indices = []
+        while len(indices) < count:
+            permutation = self.permutations.get(key)
+            if permutation is None or permutation.remaining() == 0:
+                # Every question was asked, start a new round
+                permutation = self.permutations[key] = LazyPermutation(operator.space_size(start, end), self.rng)
+            indices.extend(permutation.take(count - len(indices)))
+        return operator.operands_at(np.array(indices, dtype=np.int64), start, end)
+
+    def generate(self, count, start, end, operators, unique=False):
+        """
+        Generates count questions with operands between start and end (both inclusive)
+        :param count: number of questions
+        :param start: lowest operand
+        :param end: highest operand
+        :param operators: list of operator names (check box text) to pick from
+        :param unique: True to not repeat a question until every question of the operator was asked
+        :return: QuestionBatch
+        """
+        if len(operators) == 0:
+            raise ValueError("Chose at least one operator")
+        operators = [get_operator(name) for name in operators]
+        operator_index = self.rng.integers(0, len(operators), size=count)
+        x = np.zeros(count, dtype=np.int64)
+        y = np.zeros(count, dtype=np.int64)
+        z = np.zeros(count, dtype=np.int64)
+        answers = np.empty(count, dtype=object)
+
+        # Each operator generates and solves all of its questions at once
+        for index, operator in enumerate(operators):
+            selected = np.flatnonzero(operator_index == index)
+            if len(selected) == 0:
+                continue
+            if unique:
+                x_op, y_op, z_op = self.unique_operands(operator, start, end, len(selected))
+            else:
+                x_op, y_op, z_op = operator.generate(self.rng, start, end, len(selected))
+            x[selected] = x_op
+            y[selected] = y_op
+            z[selected] = z_op
+            answers[selected] = operator.solve(x_op, y_op, z_op)
+
+        return QuestionBatch(x, y, z, operator_index, operators, answers)
+
+    def generate_tests(self, tests, count, start, end, operators, unique=False):
+        """
+        Generates several tests in one call
+        :param tests: number of tests
+        :param count: number of questions in each test
+        :return: list of QuestionBatch, one per test
+        """
+        return self.generate(tests * count, start, end, operators, unique).split(count)
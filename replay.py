@@ -0,0 +1,415 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Recording and replay of test sessions.
+
+    python Adalan.py --record session.jsonl.gz [--seed SEED]
+    python replay.py session.jsonl.gz [--headless] [--realtime] [--show] [--json] [--output FILE]
+                     [--baseline FILE] [--threshold 0.25]
+
+The recorder writes everything needed to run the same tests again to a
+JSON lines log (gzip compressed for a .gz file): the seed of the questions,
+the settings of every test, the review queue of the student when the first
+test starts, and every input with its time in microseconds since the start.
+
+    {"adalan_replay": 1, "seed": 1234, "version": "2.0", "started": 1760000000.0}
+    [1520311, "settings", {"range": [0, 50], ...}, "asha", [review items]]
+    [1520311, "start"]
+    [4210551, "answer", "12", ["Addition", 5, 7, 0]]
+    [6520400, "tick"]
+    [10520380, "tick", "", ["Division", 9, 3, 0]]   timer ran out, with the text in the answer box
+
+The replay drives a main window (offscreen unless --show) or, with
+--headless, a SessionEngine through the log, as fast as possible or with the
+recorded timing. The window clock is set to the recorded times, so the
+questions, scores and response times are the same as in the recorded
+session; every answer is checked against the recorded question and the
+differences are reported. The processing time of every input (wall and CPU,
+event processing of the window included) is kept per input kind and can be
+compared to a baseline as the benchmarks are.
+"""
+import argparse
+import gzip
+import json
+import os
+import secrets
+import sys
+import tempfile
+import time
+from latency import LatencyHistogram, now_ns
+from profiling import SLOT_MIN_NS
+from review_queue import ReviewQueue
+from session import SessionEngine
+
+LOG_VERSION = 1
+# Differences listed in the results
+MAX_DIFFERENCES = 20
+
+
+def random_seed():
+    return secrets.randbits(63)
+
+
+def open_log(path, mode):
+    """
+    Opens a log for reading ("r") or writing ("w"), gzip compressed if the name ends with .gz
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def question_key(question):
+    return [question.operator.name, int(question.x), int(question.y), int(question.z)]
+
+
+class SessionRecorder:
+    """
+    Records the inputs of a main window
+    :param path: log file
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.window = None
+        self.started_ns = None
+        # Time of the input being handled, the window clock returns it so the replay can use the same times
+        self.pinned_ns = None
+        # Ticks of the test timer in progress, the answer of a timer which runs out is part of the tick
+        self.depth = 0
+        self.timeout = None
+        # Students whose review queue is recorded
+        self.students = set()
+
+    def attach(self, window):
+        """
+        Wraps the slots of the window, called by the window before the slots are connected
+        """
+        seed = window.engine.generator.seed
+        if seed is None:
+            raise ValueError("A session can only be recorded with a seed")
+        self.window = window
+        self.file = open_log(self.path, "w")
+        self.started_ns = now_ns()
+        self._write({"adalan_replay": LOG_VERSION, "seed": seed, "version": window.adalan_version,
+                     "started": time.time()})
+        window.clock = self.clock
+        window.start_testing = self._pinned(self._start_testing(window.start_testing))
+        window.validate_result = self._pinned(self._validate_result(window.validate_result))
+        window.show_time = self._pinned(self._show_time(window.show_time))
+
+    def clock(self):
+        return now_ns() if self.pinned_ns is None else self.pinned_ns
+
+    def _time(self):
+        """
+        Time of the input in microseconds since the start
+        """
+        return (self.clock() - self.started_ns) // 1000
+
+    def _pinned(self, function):
+        def pinned():
+            if self.pinned_ns is not None:
+                return function()
+            # Rounded to the microseconds of the log
+            self.pinned_ns = self.started_ns + (now_ns() - self.started_ns) // 1000 * 1000
+            try:
+                return function()
+            finally:
+                self.pinned_ns = None
+        return pinned
+
+    def _write(self, event):
+        self.file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def _start_testing(self, function):
+        def start_testing():
+            window = self.window
+            if not window.operator_list:
+                # Only a message is shown
+                return function()
+            timestamp = self._time()
+            if window.test is None:
+                event = [timestamp, "settings", window.test_settings(), window.student]
+                if window.student not in self.students:
+                    self.students.add(window.student)
+                    event.append(window.engine.review_queue(window.student).snapshot())
+                self._write(event)
+            self._write([timestamp, "start"])
+            return function()
+        return start_testing
+
+    def _validate_result(self, function):
+        def validate_result():
+            window = self.window
+            if self.depth:
+                self.timeout = [window.inp_result.text(), question_key(window.question)]
+            else:
+                self._write([self._time(), "answer", window.inp_result.text(), question_key(window.question)])
+            return function()
+        return validate_result
+
+    def _show_time(self, function):
+        def show_time():
+            if not self.window.start:
+                return function()
+            timestamp = self._time()
+            self.depth += 1
+            try:
+                return function()
+            finally:
+                self.depth -= 1
+                event = [timestamp, "tick"]
+                if self.timeout is not None:
+                    event.extend(self.timeout)
+                    self.timeout = None
+                self._write(event)
+        return show_time
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_log(path):
+    """
+    Returns the header and the list of events of a log
+    """
+    with open_log(path, "r") as file:
+        header = json.loads(file.readline() or "{}")
+        if header.get("adalan_replay") != LOG_VERSION:
+            raise ValueError(f"{path} is not a session log")
+        return header, [json.loads(line) for line in file if line.strip()]
+
+
+class ReplayResults:
+    """
+    Processing times and differences found during a replay
+    """
+    def __init__(self, mode, realtime):
+        self.mode = mode
+        self.realtime = realtime
+        self.wall = {}
+        self.cpu = {}
+        self.answers = 0
+        self.differences = []
+        self.diverged = 0
+        self.tests = []
+
+    def check(self, index, recorded, question):
+        self.answers += 1
+        actual = question_key(question)
+        if actual != recorded:
+            self.diverged += 1
+            if len(self.differences) < MAX_DIFFERENCES:
+                self.differences.append({"event": index, "recorded": recorded, "replayed": actual})
+
+    def record(self, kind, wall_ns, cpu_ns):
+        if kind not in self.wall:
+            self.wall[kind] = LatencyHistogram(SLOT_MIN_NS)
+            self.cpu[kind] = LatencyHistogram(SLOT_MIN_NS)
+        self.wall[kind].record(wall_ns)
+        self.cpu[kind].record(cpu_ns)
+
+    def summary(self, wall, cpu):
+        metrics = {"replay.wall": wall, "replay.cpu": cpu}
+        for kind, histogram in self.wall.items():
+            metrics[f"replay.{kind}.p50"] = histogram.percentile(50) / 1e9
+            metrics[f"replay.{kind}.p99"] = histogram.percentile(99) / 1e9
+        return {"mode": self.mode, "realtime": self.realtime, "events": sum(h.count for h in self.wall.values()),
+                "answers": self.answers, "diverged": self.diverged, "differences": self.differences,
+                "tests": self.tests, "seconds": wall, "cpu_seconds": cpu,
+                "latency": {kind: {"wall": histogram.summary(), "cpu": self.cpu[kind].summary()}
+                            for kind, histogram in sorted(self.wall.items())},
+                "metrics": metrics}
+
+
+def _replay(events, handle, realtime, results, wait):
+    """
+    Calls handle(index, event) for every event and measures it
+    :param wait: function waiting until a monotonic time in nanoseconds
+    """
+    started = now_ns()
+    started_cpu = time.process_time()
+    for index, event in enumerate(events):
+        if realtime:
+            wait(started + event[0] * 1000)
+        event_started = time.perf_counter_ns()
+        event_cpu = time.thread_time_ns()
+        handle(index, event)
+        results.record(event[1], time.perf_counter_ns() - event_started, time.thread_time_ns() - event_cpu)
+    return results.summary((now_ns() - started) / 1e9, time.process_time() - started_cpu)
+
+
+def replay_headless(header, events, realtime=False):
+    """
+    Replays a log on a SessionEngine, without Qt. The timer of the window is replayed from the ticks.
+    :return: dictionary with the results
+    """
+    engine = SessionEngine(header["seed"])
+    results = ReplayResults("headless", realtime)
+    state = {"test": None, "settings": None, "student": None, "count": 0, "running": False}
+    clock_start = now_ns()
+
+    def answer(index, text, recorded, clock):
+        test = state["test"]
+        state["running"] = False
+        results.check(index, recorded, test.question)
+        test.answer_text(text, clock)
+        if test.finished:
+            results.tests.append(test.summary())
+            state["test"] = None
+
+    def handle(index, event):
+        timestamp, kind, *data = event
+        clock = clock_start + timestamp * 1000
+        if kind == "settings":
+            state["settings"], state["student"] = data[0], data[1]
+            if len(data) > 2:
+                engine.review_queues[data[1]] = ReviewQueue.from_snapshot(data[2])
+        elif kind == "start":
+            if state["test"] is None:
+                if state["settings"] is None:
+                    return
+                state["test"] = engine.new_session(state["student"], state["settings"])
+                state["settings"] = None
+            state["test"].next_question()
+            state["test"].shown(clock)
+            state["count"] = state["test"].settings["delay"]
+            state["running"] = True
+        elif kind == "answer" and state["test"] is not None:
+            answer(index, data[0], data[1], clock)
+        elif kind == "tick" and state["running"]:
+            # Same count down as MainWindow.show_time
+            state["count"] -= 1
+            if state["count"] == 0:
+                answer(index, data[0] if data else "", data[1] if data else None, clock)
+
+    def wait(deadline_ns):
+        remaining = deadline_ns - now_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
+
+    return _replay(events, handle, realtime, results, wait)
+
+
+def replay_window(header, events, realtime=False, show=False):
+    """
+    Replays a log on a new main window with an empty session store. The inputs are given to the same
+    slots as the keyboard and timers; the test timer only runs from the recorded ticks.
+    :param show: True to show the window, it is offscreen otherwise
+    :return: dictionary with the results
+    """
+    if not show:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from Adalan import MainWindow
+    from session_store import SessionStore
+    results = ReplayResults("window", realtime)
+    with tempfile.TemporaryDirectory() as data_dir:
+        window = MainWindow(seed=header["seed"], store=SessionStore(os.path.join(data_dir, "replay.db")))
+        # The results dialog is shown without waiting for it to be closed
+        dialog = window.results_view()
+        dialog.exec = dialog.show if show else lambda: 0
+        window.menu_auto_advance.setChecked(False)
+        window.show()
+        app.processEvents()
+        clock_start = now_ns()
+        current = {"clock": clock_start}
+        window.clock = lambda: current["clock"]
+
+        def handle(index, event):
+            timestamp, kind, *data = event
+            current["clock"] = clock_start + timestamp * 1000
+            test = window.test
+            if kind == "settings":
+                window.apply_test_settings(data[0])
+                window.student = data[1]
+                if len(data) > 2:
+                    window.engine.review_queues[data[1]] = ReviewQueue.from_snapshot(data[2])
+            elif kind == "start":
+                window.start_testing()
+                # The timer runs from the recorded ticks
+                window.timer.stop()
+            elif kind == "answer" and test is not None and window.inp_result.isEnabled():
+                results.check(index, data[1], window.question)
+                window.inp_result.setText(data[0])
+                window.validate_result()
+            elif kind == "tick":
+                if data:
+                    results.check(index, data[1], window.question)
+                    window.inp_result.setText(data[0])
+                window.show_time()
+            app.processEvents()
+            if test is not None and test.finished:
+                results.tests.append(test.summary())
+
+        def wait(deadline_ns):
+            while now_ns() < deadline_ns:
+                app.processEvents()
+                time.sleep(min(0.005, max(deadline_ns - now_ns(), 0) / 1e9))
+
+        try:
+            return _replay(events, handle, realtime, results, wait)
+        finally:
+            window.close()
+            app.processEvents()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded Adalan session")
+    parser.add_argument("log", help="session log recorded with Adalan.py --record")
+    parser.add_argument("--headless", action="store_true", help="replay on the session engine, without a window")
+    parser.add_argument("--realtime", action="store_true", help="replay with the recorded timing")
+    parser.add_argument("--show", action="store_true", help="show the window during the replay")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="results of an earlier replay to compare to")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slow down compared to the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    try:
+        header, events = read_log(args.log)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.headless:
+        results = replay_headless(header, events, args.realtime)
+    else:
+        results = replay_window(header, events, args.realtime, args.show)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['events']} inputs, {len(results['tests'])} tests replayed ({results['mode']}) in "
+              f"{results['seconds']:.2f} s, CPU {results['cpu_seconds']:.2f} s")
+        for test in results["tests"]:
+            print(f"  {test['total_correct']}/{test['total_questions']} correct")
+        for kind, latency in results["latency"].items():
+            print(f"  {kind:<8} {latency['wall']['count']:>6}  p50 {latency['wall']['p50'] * 1000:8.3f} ms  "
+                  f"p99 {latency['wall']['p99'] * 1000:8.3f} ms  CPU p99 {latency['cpu']['p99'] * 1000:8.3f} ms")
+        if results["diverged"]:
+            print(f"{results['diverged']} of {results['answers']} questions differ from the recording")
+    status = 1 if results["diverged"] else 0
+    if args.baseline:
+        from benchmarks import compare
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        for metric, reference, seconds, ratio in compare(results, baseline, args.threshold):
+            print(f"REGRESSION {metric}: {seconds * 1000:.3f} ms, baseline {reference * 1000:.3f} ms "
+                  f"({(ratio - 1) * 100:.0f}% slower)", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+
+from PyQt6.QtWidgets import QDialog
+from PyQt6.QtGui import QIcon, QPixmap
+from ui_loader import setup_ui
+from session import pass_percentage, summary_text
+import numpy as np
+import pyqtgraph as pg
+
+
+class ShowResults(QDialog):
+    """
+    This class is for the plots. The dialog is created once and reused for every test; the plots are
+    updated as each answer arrives so the dialog can also be shown during the test.
+    """
+    def __init__(self, patent=None):
+        super().__init__(patent)
+        self.parent = patent
+        setup_ui(self, "Results.ui")
+        self.setMaximumWidth(self.width())
+        self.setMaximumHeight(self.height())
+        self.setWindowIcon(QIcon('adalan_icon.png'))
+        pixmap = QPixmap('adalan_icon.png')
+        self.ada_icon.setPixmap(pixmap)
+        self.ada_icon.setScaledContents(True)
+
+        self.total_questions = 0
+        self.total_correct = 0
+        self.total_wrong = 0
+        self.answered = 0
+        # Response times, the arrays grow by doubling
+        self.question_index = np.zeros(128)
+        self.response_time = np.zeros(128)
+
+        # Bar chart - Pass Vs Failed chart
+        self.pass_fail_graph.setTitle(title="Pass Vs Failed")
+        status_list = ['Failed', 'Passed']
+        ticks = []
+        xval = list(range(1, len(status_list) + 1))
+
+        self.failed_bar = pg.BarGraphItem(x=[1], height=[0], width=0.8, brush='red')
+        self.pass_fail_graph.addItem(self.failed_bar)
+        self.passed_bar = pg.BarGraphItem(x=[2], height=[0], width=0.8, brush='green')
+        self.pass_fail_graph.addItem(self.passed_bar)
+
+        for i, item in enumerate(status_list):
+            ticks.append((xval[i], item))
+        ticks = [ticks]
+        ax = self.pass_fail_graph.getAxis('bottom')
+        ax.setTicks(ticks)
+
+        # Response graph, long histories are downsampled and only the visible part is drawn
+        self.response_time_graph.setTitle(title="Response Time")
+        self.response_time_graph.setLabel("left", "Seconds")
+        self.response_curve = self.response_time_graph.plot([], [], autoDownsample=True, downsampleMethod="peak",
+                                                            clipToView=True)
+
+    def start_test(self, total_questions):
+        """
+        Clears the results of the previous test
+        :param total_questions: number of questions of the new test
+        """
+        self.total_questions = total_questions
+        self.total_correct = 0
+        self.total_wrong = 0
+        self.answered = 0
+        self.response_curve.setData([], [])
+        self.update_summary()
+
+    def add_answer(self, question_number, response_time, status):
+        """
+        Adds one answer to the results
+        :param question_number: number of the question in the test
+        :param response_time: time taken to answer in seconds (float)
+        :param status: True if the answer is correct
+        """
+        if self.answered == len(self.response_time):
+            self.question_index = np.resize(self.question_index, 2 * self.answered)
+            self.response_time = np.resize(self.response_time, 2 * self.answered)
+        self.question_index[self.answered] = question_number
+        self.response_time[self.answered] = response_time
+        self.answered += 1
+        if status:
+            self.total_correct += 1
+        else:
+            self.total_wrong += 1
+        self.response_curve.setData(self.question_index[:self.answered], self.response_time[:self.answered])
+        self.update_summary()
+
+    def update_summary(self):
+        """
+        Updates the bar chart and the labels
+        """
+        total_questions = self.total_questions
+        total_corrects = self.total_correct
+        total_wrongs = self.total_wrong
+        self.failed_bar.setOpts(height=[total_wrongs])
+        self.passed_bar.setOpts(height=[total_corrects])
+
+        self.lbl_total.setText(str(total_questions))
+        self.lbl_correct.setText(str(total_corrects))
+        self.lbl_wrong.setText(str(total_wrongs))
+        self.lbl_pass_percentage.setText(str(pass_percentage(total_questions, total_corrects))+"%")
+        median = np.median(self.response_time[:self.answered]) if self.answered else None
+        self.lbl_summary.setText(summary_text(total_questions, total_corrects, total_wrongs, median))
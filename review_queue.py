@@ -0,0 +1,146 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Spaced repetition of wrong answers (Leitner boxes).
+
+A wrong answer puts the question in box 0, due for the next test. Every
+time a review question is answered correctly it moves to the next box and
+comes back later (1, 3, 7, 14 then 30 days); a wrong answer sends it back
+to box 0. Questions answered correctly from the last box are retired.
+
+The due questions are kept in a heap ordered by due time, so taking the
+due questions for a test is O(log n) per question. Items are saved in the
+session store and loaded again for the student.
+"""
+import heapq
+import time
+import numpy as np
+from operators import get_operator
+from questions import Question
+
+DAY = 24 * 60 * 60
+# Delay before a question comes back, per box (seconds)
+BOX_DELAYS = (0, DAY, 3 * DAY, 7 * DAY, 14 * DAY, 30 * DAY)
+# Largest share of a test taken by review questions
+REVIEW_SHARE = 0.5
+
+
+class ReviewItem:
+    __slots__ = ("operator", "x", "y", "z", "box", "due")
+
+    def __init__(self, operator, x, y, z, box, due):
+        self.operator = operator
+        self.x = x
+        self.y = y
+        self.z = z
+        self.box = box
+        self.due = due
+
+    def key(self):
+        return self.operator, self.x, self.y, self.z
+
+    def question(self):
+        operator = get_operator(self.operator)
+        answer = operator.solve(np.array([self.x]), np.array([self.y]), np.array([self.z]))[0]
+        return Question(self.x, self.y, operator, answer, self.z)
+
+
+class ReviewQueue:
+    """
+    Review queue of one student
+    :param store: SessionStore the items are saved to, None to keep them in memory only
+    :param user_id: id of the student in the store
+    """
+    def __init__(self, store=None, user_id=None):
+        self.store = store
+        self.user_id = user_id
+        self.items = {}
+        self.heap = []
+        if store is not None:
+            for operator, x, y, z, box, due in store.review_items(user_id):
+                item = ReviewItem(operator, x, y, z, box, due)
+                self.items[item.key()] = item
+            self._rebuild_heap()
+
+    def __len__(self):
+        return len(self.items)
+
+    def _save(self, item):
+        if self.store is not None:
+            self.store.save_review_item(self.user_id, *item.key(), item.box, item.due)
+
+    def _rebuild_heap(self):
+        self.heap = [(item.due, item.key()) for item in self.items.values()]
+        heapq.heapify(self.heap)
+
+    def _schedule(self, item):
+        heapq.heappush(self.heap, (item.due, item.key()))
+        self._save(item)
+        # Rescheduled and retired items leave old entries behind until they are due
+        if len(self.heap) > 2 * len(self.items) + 64:
+            self._rebuild_heap()
+
+    def record(self, question, correct, now=None):
+        """
+        Updates the queue with an answer
+        :param question: Question answered
+        :param correct: True if the answer is correct
+        """
+        now = time.time() if now is None else now
+        key = (question.operator.name, question.x, question.y, question.z)
+        item = self.items.get(key)
+        if not correct:
+            if item is None:
+                item = self.items[key] = ReviewItem(*key, 0, now)
+            item.box = 0
+            item.due = now + BOX_DELAYS[0]
+            self._schedule(item)
+        elif item is not None:
+            item.box += 1
+            if item.box >= len(BOX_DELAYS):
+                del self.items[key]
+                if self.store is not None:
+                    self.store.delete_review_item(self.user_id, *key)
+            else:
+                item.due = now + BOX_DELAYS[item.box]
+                self._schedule(item)
+
+    def snapshot(self, now=None):
+        """
+        Returns the items as a list of [operator, x, y, z, box, seconds until due]
+        """
+        now = time.time() if now is None else now
+        return [[item.operator, int(item.x), int(item.y), int(item.z), item.box, item.due - now] for item in self.items.values()]
+
+    @classmethod
+    def from_snapshot(cls, snapshot, now=None):
+        """
+        Returns an in memory queue with the items of a snapshot, due at the same time from now
+        """
+        now = time.time() if now is None else now
+        queue = cls()
+        for operator, x, y, z, box, due_in in snapshot:
+            item = ReviewItem(operator, x, y, z, box, now + due_in)
+            queue.items[item.key()] = item
+        queue._rebuild_heap()
+        return queue
+
+    def due(self, limit, now=None):
+        """
+        Takes at most limit due questions out of the heap. They come back when they are answered.
+        :return: list of Question
+        """
+        now = time.time() if now is None else now
+        questions = []
+        while self.heap and len(questions) < limit and self.heap[0][0] <= now:
+            due, key = heapq.heappop(self.heap)
+            item = self.items.get(key)
+            # Items rescheduled or retired leave old heap entries behind
+            if item is None or item.due != due:
+                continue
+            questions.append(item.question())
+        return questions
@@ -0,0 +1,238 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Test sessions without a user interface.
+
+A TestSession runs one test: it generates the questions, checks the answers,
+keeps the score and saves every answer in the session store. The main window
+and the terminal mode (headless.py) drive the same sessions, so generation,
+validation and scoring are the same everywhere. This module does not import
+Qt.
+"""
+import numpy as np
+from adaptive import AdaptiveSampler
+from latency import LatencyStats, now_ns
+from questions import QuestionGenerator
+from review_queue import ReviewQueue, REVIEW_SHARE
+
+
+def make_settings(start=0, end=50, total_questions=10, operators=("Addition",), delay=5, vertical=False,
+                  adaptive=False, no_repeat=False):
+    """
+    Returns the settings of a test, in the format saved with every session
+    """
+    return {"range": [start, end], "total_questions": total_questions, "delay": delay, "operators": list(operators),
+            "vertical": vertical, "adaptive": adaptive, "no_repeat": no_repeat}
+
+
+def pass_percentage(total_questions, total_correct):
+    return round((total_correct / total_questions) * 100) if total_questions else 0
+
+
+def summary_text(total_questions, total_correct, total_wrong, median_response_time=None):
+    """
+    Returns the summary shown at the end of a test
+    :param median_response_time: median response time in seconds, None if there is no answer
+    """
+    summary = f"Out of {total_questions} questions you have answered {total_correct} correctly and {total_wrong} incorrectly.\n" \
+              f"Your pass percentage is {pass_percentage(total_questions, total_correct)} %.\n"
+    if median_response_time is not None:
+        summary += f"Your median response time is {median_response_time:.2f} seconds."
+    return summary
+
+
+class Answer:
+    __slots__ = ("number", "question", "given", "correct", "latency_ns")
+
+    def __init__(self, number, question, given, correct, latency_ns):
+        self.number = number
+        self.question = question
+        self.given = given
+        self.correct = correct
+        self.latency_ns = latency_ns
+
+
+class SessionEngine:
+    """
+    Creates the tests and keeps what is learned across tests: the adaptive samplers and review
+    queues of every student and the latency histograms
+    :param seed: seed of the question generator, None for a random seed
+    :param store: SessionStore the answers are saved to, None to keep nothing
+    """
+    def __init__(self, seed=None, store=None):
+        self.generator = QuestionGenerator(seed)
+        self.store = store
+        self.latency_stats = LatencyStats()
+        # Adaptive samplers per student and settings, they learn from every answer
+        self.adaptive_samplers = {}
+        # Review queues of wrong answers per student
+        self.review_queues = {}
+
+    def adaptive_sampler(self, student, settings):
+        """
+        Returns the adaptive sampler of the student for the operators and range of the settings
+        """
+        start, end = settings["range"]
+        key = (student, tuple(sorted(settings["operators"])), start, end)
+        sampler = self.adaptive_samplers.get(key)
+        if sampler is None:
+            sampler = AdaptiveSampler(settings["operators"], start, end, rng=self.generator.rng)
+            self.adaptive_samplers[key] = sampler
+        return sampler
+
+    def review_queue(self, student):
+        """
+        Returns the review queue of the student, it is loaded from the store the first time
+        """
+        queue = self.review_queues.get(student)
+        if queue is None:
+            queue = self.review_queues[student] = self.load_review_queue(student)
+        return queue
+
+    def load_review_queue(self, student):
+        """
+        Returns the review queue of the student read from the store, without keeping it. It only uses the
+        store, so it can run on another thread than the one using the engine.
+        """
+        if self.store is None:
+            return ReviewQueue()
+        return ReviewQueue(self.store, self.store.user_id(student))
+
+    def new_session(self, student, settings, save=True):
+        """
+        Starts a new test
+        :param student: name of the student
+        :param settings: test settings, see make_settings
+        :param save: False to call save_start of the session later, the store is not waited for
+        :return: TestSession
+        """
+        return TestSession(self, student, settings, save)
+
+
+class TestSession:
+    """
+    One test of a student. Questions are asked with next_question and answered with answer, the
+    session is finished once every question is answered.
+    """
+    def __init__(self, engine, student, settings, save=True):
+        if len(settings["operators"]) == 0:
+            raise ValueError("Chose at least one operator")
+        self.engine = engine
+        self.student = student
+        self.settings = settings
+        self.total_questions = settings["total_questions"]
+        start, end = settings["range"]
+        generator = engine.generator
+        self.adaptive_sampler = engine.adaptive_sampler(student, settings) if settings.get("adaptive") else None
+        self.review_queue = engine.review_queue(student)
+        # Questions answered wrongly in the previous tests which are due are mixed in the test
+        review = [] if self.adaptive_sampler is not None else \
+            self.review_queue.due(int(self.total_questions * REVIEW_SHARE))
+        self.batch = generator.generate(self.total_questions - len(review), start, end, settings["operators"],
+                                        unique=settings.get("no_repeat", False)).mix(review, generator.rng)
+        self.position = 0
+        self.question = None
+        self.question_shown_ns = None
+        self.total_correct = 0
+        self.total_wrong = 0
+        self.response_times = np.zeros(self.total_questions)
+        self.session_id = None
+        self.user_id = None
+        if save:
+            self.save_start()
+
+    def save_start(self):
+        """
+        Saves the start of the session in the store, before the first answer. It waits for the store and only
+        changes the session, so it can run on another thread.
+        """
+        if self.engine.store is not None:
+            self.session_id, self.user_id = self.engine.store.start_session(self.student, self.total_questions,
+                                                                            self.settings)
+
+    @property
+    def answered(self):
+        return self.total_correct + self.total_wrong
+
+    @property
+    def finished(self):
+        return self.answered >= self.total_questions
+
+    def next_question(self):
+        """
+        Returns the next question, its clock starts now
+        """
+        if self.adaptive_sampler is not None:
+            self.question = self.adaptive_sampler.next_question()
+        else:
+            self.question = self.batch[self.position]
+        self.position += 1
+        self.shown()
+        return self.question
+
+    def shown(self, shown_ns=None):
+        """
+        Restarts the clock of the current question, called once the question is actually displayed
+        """
+        self.question_shown_ns = now_ns() if shown_ns is None else shown_ns
+
+    def answer_text(self, text, answered_ns=None):
+        """
+        Parses the entered text with the operator of the question and checks it
+        :return: Answer
+        """
+        return self.answer(self.question.operator.parse_answer(text), answered_ns)
+
+    def answer(self, result, answered_ns=None):
+        """
+        Checks the answer of the current question and updates the score
+        :param result: answer given by the student (number)
+        :param answered_ns: monotonic clock (ns) of the answer, now if None
+        :return: Answer
+        """
+        answered_ns = now_ns() if answered_ns is None else answered_ns
+        question = self.question
+        latency_ns = answered_ns - self.question_shown_ns
+        correct = question.check(result)
+        number = self.answered + 1
+        self.engine.latency_stats.record(question, latency_ns)
+        if self.adaptive_sampler is not None:
+            self.adaptive_sampler.record(question, correct, latency_ns)
+        if self.engine.store is not None:
+            self.engine.store.record_answer(self.session_id, self.user_id, number, question, result, correct,
+                                            latency_ns)
+        self.review_queue.record(question, correct)
+        self.response_times[number - 1] = latency_ns / 1e9
+        if correct:
+            self.total_correct += 1
+        else:
+            self.total_wrong += 1
+        if self.finished and self.engine.store is not None:
+            self.engine.store.finish_session(self.session_id, self.total_correct, self.total_wrong)
+        return Answer(number, question, result, correct, latency_ns)
+
+    def close(self):
+        """
+        Ends the test before every question is answered, the question asked is dropped from the adaptive sampler
+        """
+        if self.adaptive_sampler is not None and self.position > self.answered:
+            self.adaptive_sampler.discard(self.question)
+
+    def median_response_time(self):
+        """
+        Median response time in seconds, None if there is no answer
+        """
+        return float(np.median(self.response_times[:self.answered])) if self.answered else None
+
+    def summary(self):
+        return {"total_questions": self.total_questions, "total_correct": self.total_correct,
+                "total_wrong": self.total_wrong,
+                "pass_percentage": pass_percentage(self.total_questions, self.total_correct),
+                "median_response_time": self.median_response_time()}
+
+    def summary_text(self):
+        return summary_text(self.total_questions, self.total_correct, self.total_wrong, self.median_response_time())
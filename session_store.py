@@ -0,0 +1,547 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Persistent store of test sessions and answers.
+
+Everything is kept in a SQLite database in WAL mode. Writes are queued and
+committed in batches by a background thread so the GUI never waits for the
+disk; reads use their own connection and are served from the indexes on
+user, session, operator and time.
+
+The rollups table keeps the number of answers, correct answers and response
+times per student, day, operator and operand size (digits of the largest
+operand), and the same totals for every student together under user id 0.
+It is updated in the transaction which inserts the answers, so trends over
+months are read from a few thousand rollup rows instead of every answer.
+Databases written before the rollups existed are rolled up once, by a
+background thread with its own connection which adds a batch of old answers
+per transaction, so new tests are saved while it runs. Its progress is kept
+in the rollup_backfill table and an interrupted backfill goes on at the next
+start.
+"""
+from concurrent.futures import Future
+from datetime import date
+import json
+import queue
+import sqlite3
+import threading
+import time
+from app_paths import data_path
+from latency import operand_digits
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    total_questions INTEGER NOT NULL,
+    total_correct INTEGER,
+    total_wrong INTEGER,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    question_number INTEGER NOT NULL,
+    operator TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    z INTEGER NOT NULL,
+    answer NUMERIC NOT NULL,
+    given NUMERIC,
+    correct INTEGER NOT NULL,
+    latency_ns INTEGER,
+    answered_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS review_items (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    operator TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    z INTEGER NOT NULL,
+    box INTEGER NOT NULL,
+    due REAL NOT NULL,
+    PRIMARY KEY (user_id, operator, x, y, z)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    user_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    operator TEXT NOT NULL,
+    digits INTEGER NOT NULL,
+    answers INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    latency_count INTEGER NOT NULL,
+    latency_total_ns INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day, operator, digits)
+);
+CREATE TABLE IF NOT EXISTS rollup_backfill (
+    next_id INTEGER NOT NULL,
+    end_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_review_due ON review_items(user_id, due);
+CREATE INDEX IF NOT EXISTS idx_rollups_day ON rollups(day);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_answers_user ON answers(user_id, answered_at);
+CREATE INDEX IF NOT EXISTS idx_answers_session ON answers(session_id, question_number);
+CREATE INDEX IF NOT EXISTS idx_answers_operator ON answers(user_id, operator, answered_at);
+"""
+
+ANSWER_COLUMNS = ("session_id", "user_id", "question_number", "operator", "x", "y", "z", "answer", "given",
+                  "correct", "latency_ns", "answered_at")
+INSERT_ANSWER = f"INSERT INTO answers ({', '.join(ANSWER_COLUMNS)}) VALUES ({', '.join('?' * len(ANSWER_COLUMNS))})"
+UPSERT_ROLLUP = "INSERT INTO rollups (user_id, day, operator, digits, answers, correct, latency_count, " \
+                "latency_total_ns) VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (user_id, day, operator, digits) " \
+                "DO UPDATE SET answers = answers + excluded.answers, correct = correct + excluded.correct, " \
+                "latency_count = latency_count + excluded.latency_count, " \
+                "latency_total_ns = latency_total_ns + excluded.latency_total_ns"
+# Rollups of every student together
+ALL_USERS = 0
+# Rolls up the answers with ids in (?, ?] of a database written before the rollups existed, per student then for
+# every student together. day is the local date ordinal.
+BACKFILL_ROLLUPS = tuple(f"""
+INSERT INTO rollups (user_id, day, operator, digits, answers, correct, latency_count, latency_total_ns)
+SELECT {user}, CAST(julianday(date(answered_at, 'unixepoch', 'localtime')) - 1721424.5 AS INTEGER) AS day,
+       operator, length(CAST(max(abs(x), abs(y)) AS TEXT)) AS digits, COUNT(*), SUM(correct),
+       COUNT(latency_ns), COALESCE(SUM(latency_ns), 0)
+FROM answers WHERE id > ? AND id <= ? GROUP BY {group}day, operator, digits
+ON CONFLICT (user_id, day, operator, digits) DO UPDATE SET answers = answers + excluded.answers,
+    correct = correct + excluded.correct, latency_count = latency_count + excluded.latency_count,
+    latency_total_ns = latency_total_ns + excluded.latency_total_ns
+""" for user, group in (("user_id", "user_id, "), (ALL_USERS, "")))
+# Old answers rolled up by the first backfill transaction, the next ones are sized to last about BACKFILL_SECONDS
+BACKFILL_BATCH = 5000
+BACKFILL_SECONDS = 0.05
+# Pause between backfill transactions, the writer thread takes the database in between
+BACKFILL_PAUSE = 0.02
+# Version of the database layout (PRAGMA user_version), 1 has the rollups
+SCHEMA_VERSION = 1
+# Rows read at a time when the answers or sessions are streamed out
+EXPORT_CHUNK_SIZE = 50000
+EXPORT_ANSWER_COLUMNS = ("a.id", "a.session_id", "u.name", "a.question_number", "a.operator", "a.x", "a.y", "a.z",
+                         "a.answer", "a.given", "a.correct", "a.latency_ns", "a.answered_at")
+EXPORT_SESSION_COLUMNS = ("s.id", "u.name", "s.started_at", "s.finished_at", "s.total_questions", "s.total_correct",
+                          "s.total_wrong", "s.settings")
+# Columns the rollups can be grouped by
+ROLLUP_GROUPS = {"user": "u.name", "day": "r.day", "operator": "r.operator", "digits": "r.digits"}
+
+
+def sql_number(value):
+    """
+    Returns value as SQLite can store it: integers beyond 64 bits (large cubes, long typed answers) are
+    stored as floats, or as text beyond the floats
+    """
+    if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+        try:
+            return float(value)
+        except OverflowError:
+            return str(value)
+    return value
+
+
+def answer_day(answered_at):
+    """
+    Returns the local date ordinal of an epoch time
+    """
+    return date.fromtimestamp(answered_at).toordinal()
+
+
+def rollup_rows(rows):
+    """
+    Sums answer rows (in ANSWER_COLUMNS order) into rollup rows
+    """
+    totals = {}
+    for _, user_id, _, operator, x, y, _, _, _, correct, latency_ns, answered_at in rows:
+        key = (answer_day(answered_at), operator, operand_digits(x, y))
+        for user_key in ((user_id,) + key, (ALL_USERS,) + key):
+            total = totals.get(user_key)
+            if total is None:
+                total = totals[user_key] = [0, 0, 0, 0]
+            total[0] += 1
+            total[1] += correct
+            if latency_ns is not None:
+                total[2] += 1
+                total[3] += latency_ns
+    return [key + tuple(total) for key, total in totals.items()]
+
+
+def insert_answers(connection, rows):
+    connection.executemany(INSERT_ANSWER, rows)
+    connection.executemany(UPSERT_ROLLUP, rollup_rows(rows))
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    return connection
+
+
+class SessionStore:
+    """
+    SQLite store with a background writer thread
+    :param path: database file, defaults to adalan.db in the data folder
+    :param batch_size: maximum number of writes committed together
+    :param flush_interval: seconds to wait for more writes before committing
+    """
+    def __init__(self, path=None, batch_size=256, flush_interval=0.5):
+        self.path = path or data_path("adalan.db")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        connection = connect(self.path)
+        with connection:
+            connection.executescript(SCHEMA)
+            if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # The answers saved from now on are rolled up as they are written, the older ones by the backfill
+                end_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM answers").fetchone()[0]
+                connection.execute("DELETE FROM rollups")
+                connection.execute("INSERT INTO rollup_backfill (next_id, end_id) VALUES (0, ?)", (end_id,))
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            backfill = connection.execute("SELECT 1 FROM rollup_backfill").fetchone() is not None
+        connection.close()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="session-store", daemon=True)
+        self._writer.start()
+        self._backfill = None
+        if backfill:
+            self._backfill = threading.Thread(target=self._run_backfill, name="session-store-backfill", daemon=True)
+            self._backfill.start()
+
+    # Writer thread
+
+    def _run(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather more writes unless somebody waits for the result
+            while len(batch) < self.batch_size and batch[-1][2] is None and batch[-1][0] != "stop":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            running = self._write(connection, batch)
+            for _ in batch:
+                self._queue.task_done()
+        connection.close()
+
+    def _write(self, connection, batch):
+        """
+        Writes a batch in one transaction
+        :return: False if the writer has to stop
+        """
+        results = []
+        rows = []
+        running = True
+        try:
+            with connection:
+                for kind, payload, future in batch:
+                    if kind == "answer":
+                        rows.append(payload)
+                        continue
+                    if rows:
+                        insert_answers(connection, rows)
+                        rows = []
+                    if kind == "call":
+                        results.append((future, payload(connection)))
+                    elif kind == "stop":
+                        running = False
+                if rows:
+                    insert_answers(connection, rows)
+        except sqlite3.Error as error:
+            for _, _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(error)
+            return running
+        for future, result in results:
+            if future is not None:
+                future.set_result(result)
+        return running
+
+    def _run_backfill(self):
+        """
+        Rolls up the answers saved before the rollups existed, one batch per transaction so the writer thread
+        is never held for long
+        """
+        connection = connect(self.path)
+        batch = BACKFILL_BATCH
+        try:
+            while not self._closed:
+                started = time.perf_counter()
+                with connection:
+                    row = connection.execute("SELECT next_id, end_id FROM rollup_backfill").fetchone()
+                    if row is None:
+                        break
+                    next_id, end_id = row
+                    if next_id >= end_id:
+                        connection.execute("DELETE FROM rollup_backfill")
+                        break
+                    last_id = min(next_id + batch, end_id)
+                    for statement in BACKFILL_ROLLUPS:
+                        connection.execute(statement, (next_id, last_id))
+                    connection.execute("UPDATE rollup_backfill SET next_id = ?", (last_id,))
+                elapsed = time.perf_counter() - started
+                batch = int(min(max(batch * BACKFILL_SECONDS / max(elapsed, 1e-3), 100), 10 * BACKFILL_BATCH))
+                time.sleep(BACKFILL_PAUSE)
+        finally:
+            connection.close()
+
+    def backfilling(self):
+        """
+        Returns True while old answers are still being rolled up, the rollups are not complete yet
+        """
+        return self._backfill is not None and self._backfill.is_alive()
+
+    def _call(self, function, wait=True):
+        """
+        Runs function(connection) on the writer thread
+        :return: the result of the function if wait is True
+        """
+        if self._closed:
+            raise RuntimeError("Session store is closed")
+        future = Future() if wait else None
+        self._queue.put(("call", function, future))
+        return future.result() if wait else None
+
+    # Writes
+
+    def user_id(self, name):
+        """
+        Returns the id of a user, the user is created if needed
+        """
+        def get_user(connection):
+            connection.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (name,))
+            return connection.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone()[0]
+        return self._call(get_user)
+
+    def start_session(self, user, total_questions, settings=None, started_at=None):
+        """
+        Creates a new session
+        :param user: name of the user
+        :param total_questions: number of questions of the test
+        :param settings: dictionary with the test settings
+        :return: (session id, user id)
+        """
+        started_at = time.time() if started_at is None else started_at
+
+        def insert_session(connection):
+            connection.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (user,))
+            user_id = connection.execute("SELECT id FROM users WHERE name = ?", (user,)).fetchone()[0]
+            cursor = connection.execute("INSERT INTO sessions (user_id, started_at, total_questions, settings) "
+                                        "VALUES (?, ?, ?, ?)",
+                                        (user_id, started_at, total_questions, json.dumps(settings or {})))
+            return cursor.lastrowid, user_id
+        return self._call(insert_session)
+
+    def record_answer(self, session_id, user_id, question_number, question, given, correct, latency_ns,
+                      answered_at=None):
+        """
+        Queues one answer, it is committed with the next batch
+        """
+        answered_at = time.time() if answered_at is None else answered_at
+        self._queue.put(("answer", (session_id, user_id, question_number, question.operator.name, question.x,
+                                    question.y, question.z, sql_number(question.answer), sql_number(given),
+                                    int(bool(correct)), latency_ns, answered_at), None))
+
+    def finish_session(self, session_id, total_correct, total_wrong, finished_at=None):
+        finished_at = time.time() if finished_at is None else finished_at
+
+        def update_session(connection):
+            connection.execute("UPDATE sessions SET finished_at = ?, total_correct = ?, total_wrong = ? WHERE id = ?",
+                               (finished_at, total_correct, total_wrong, session_id))
+        self._call(update_session, wait=False)
+
+    def save_review_item(self, user_id, operator, x, y, z, box, due):
+        """
+        Queues the insert or update of a review item
+        """
+        def save(connection):
+            connection.execute("INSERT OR REPLACE INTO review_items (user_id, operator, x, y, z, box, due) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", (user_id, operator, x, y, z, box, due))
+        self._call(save, wait=False)
+
+    def delete_review_item(self, user_id, operator, x, y, z):
+        def delete(connection):
+            connection.execute("DELETE FROM review_items WHERE user_id = ? AND operator = ? AND x = ? AND y = ? "
+                               "AND z = ?", (user_id, operator, x, y, z))
+        self._call(delete, wait=False)
+
+    def flush(self):
+        """
+        Waits until every queued write is committed
+        """
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._queue.put(("stop", None, None))
+        self._closed = True
+        self._writer.join()
+        if self._backfill is not None:
+            # Stops after the running batch, the next start goes on from there
+            self._backfill.join()
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+
+    # Reads, served from a connection owned by the calling thread
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect(self.path)
+            connection.row_factory = sqlite3.Row
+        return connection
+
+    def users(self):
+        return [row["name"] for row in self._reader().execute("SELECT name FROM users ORDER BY name")]
+
+    def sessions(self, user, limit=None):
+        """
+        Returns the sessions of a user, newest first
+        """
+        sql = "SELECT s.* FROM sessions s JOIN users u ON u.id = s.user_id WHERE u.name = ? ORDER BY s.started_at DESC"
+        parameters = [user]
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return [dict(row) for row in self._reader().execute(sql, parameters)]
+
+    @staticmethod
+    def _answer_query(columns, user=None, session_id=None, operator=None, since=None, until=None):
+        sql = f"SELECT {columns} FROM answers a JOIN users u ON u.id = a.user_id"
+        conditions = []
+        parameters = []
+        for condition, value in (("u.name = ?", user), ("a.session_id = ?", session_id),
+                                 ("a.operator = ?", operator), ("a.answered_at >= ?", since),
+                                 ("a.answered_at < ?", until)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, parameters
+
+    def answers(self, user=None, session_id=None, operator=None, since=None, until=None, limit=None):
+        """
+        Returns answers, oldest first, filtered by user name, session, operator and time (epoch seconds)
+        """
+        sql, parameters = self._answer_query("a.*, u.name AS user", user, session_id, operator, since, until)
+        sql += " ORDER BY a.answered_at, a.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return [dict(row) for row in self._reader().execute(sql, parameters)]
+
+    def _chunks(self, sql, parameters, chunk_size):
+        """
+        Yields the rows of a query in lists of at most chunk_size tuples. The rows are read from their own
+        connection, which sees the database as it was when the first chunk was read.
+        """
+        self.flush()
+        connection = connect(self.path)
+        try:
+            cursor = connection.execute(sql, parameters)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            connection.close()
+
+    def answer_chunks(self, user=None, operator=None, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Yields the answers in the order they were saved, in lists of tuples with the EXPORT_ANSWER_COLUMNS.
+        The memory used does not depend on the number of answers.
+        """
+        sql, parameters = self._answer_query(", ".join(EXPORT_ANSWER_COLUMNS), user, None, operator, since, until)
+        return self._chunks(sql + " ORDER BY a.id", parameters, chunk_size)
+
+    def session_chunks(self, user=None, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Yields the sessions in the order they were started, in lists of tuples with the EXPORT_SESSION_COLUMNS
+        """
+        sql = f"SELECT {', '.join(EXPORT_SESSION_COLUMNS)} FROM sessions s JOIN users u ON u.id = s.user_id"
+        conditions = []
+        parameters = []
+        for condition, value in (("u.name = ?", user), ("s.started_at >= ?", since), ("s.started_at < ?", until)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return self._chunks(sql + " ORDER BY s.id", parameters, chunk_size)
+
+    def review_items(self, user_id):
+        """
+        Returns (operator, x, y, z, box, due) of every review item of a user
+        """
+        # Read on the writer thread, after the review items queued before, instead of waiting for the queue
+        # to be empty which may never happen while other students answer
+        def select(connection):
+            return [tuple(row) for row in connection.execute(
+                "SELECT operator, x, y, z, box, due FROM review_items WHERE user_id = ?", (user_id,))]
+        return self._call(select)
+
+    def operator_summary(self, user):
+        """
+        Returns the number of answers, correct answers and mean latency per operator of a user
+        """
+        sql = "SELECT a.operator, COUNT(*) AS answers, SUM(a.correct) AS correct, AVG(a.latency_ns) AS mean_latency_ns " \
+              "FROM answers a JOIN users u ON u.id = a.user_id WHERE u.name = ? GROUP BY a.operator ORDER BY a.operator"
+        return [dict(row) for row in self._reader().execute(sql, (user,))]
+
+    def rollups(self, group_by=("day",), user=None, operator=None, since_day=None):
+        """
+        Returns the rollups summed by the group_by columns, in their order
+        :param group_by: columns from "user", "day" (date ordinal), "operator" and "digits"
+        :param user: name of a student, None for every student
+        :param operator: name of an operator, None for every operator
+        :param since_day: first day (date ordinal), None for every day
+        :return: list of dictionaries with the group_by columns, answers, correct, latency_count and
+                 latency_total_ns
+        """
+        columns = [f"{ROLLUP_GROUPS[column]} AS {column}" for column in group_by]
+        sql = f"SELECT {', '.join(columns + [''])}SUM(r.answers) AS answers, SUM(r.correct) AS correct, " \
+              f"SUM(r.latency_count) AS latency_count, SUM(r.latency_total_ns) AS latency_total_ns FROM rollups r"
+        conditions = []
+        parameters = []
+        if user is not None or "user" in group_by:
+            sql += " JOIN users u ON u.id = r.user_id"
+        else:
+            # Every student together is rolled up as well
+            conditions.append("r.user_id = ?")
+            parameters.append(ALL_USERS)
+        for condition, value in (("u.name = ?", user), ("r.operator = ?", operator), ("r.day >= ?", since_day)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+
+        # Read on the writer thread so the answers still queued are included
+        def select(connection):
+            cursor = connection.execute(sql, parameters)
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor]
+        return self._call(select)
@@ -0,0 +1,227 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Soak test of the main window, for kiosks which run for days.
+
+    python soak_test.py [--tests 2000] [--questions 20] [--students 5] [--sample-every 100]
+                        [--warmup 200] [--max-rss-growth 16] [--max-object-growth 50]
+                        [--trace-memory] [--output soak.json]
+
+Runs without a display (offscreen Qt platform) and with a temporary data
+folder. Tests are taken one after the other through the MainWindow slots,
+with wrong answers, gifs, the results dialog and the analytics dialog, as a
+kiosk would. Every few tests the resident memory, the Python objects and
+the live Qt objects are sampled, with the review items of the students
+(they grow with the wrong answers and are not a leak); with --trace-memory
+the allocation sites which grew the most since the end of the warm up are
+listed at the end.
+
+The exit status is 1 if the resident memory or the Qt objects grew by more
+than the limits between the end of the warm up and the last sample.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks import environment
+
+# Allocation sites listed in the report
+TOP_ALLOCATORS = 15
+
+
+def resident_bytes():
+    """
+    Returns the resident memory of the process, None if it cannot be read
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Soak:
+    """
+    Main window driven through many tests
+    """
+    def __init__(self, data_dir, questions, students, trace_memory=False):
+        from PyQt6.QtWidgets import QApplication
+        from Adalan import MainWindow
+        from session_store import SessionStore
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self.window = MainWindow(seed=1, store=SessionStore(os.path.join(data_dir, "soak.db")))
+        self.window.show()
+        # The results dialog is shown without waiting for a user
+        self.window.results_view().exec = lambda: 0
+        for checkbox in self.window.operator_checkboxes:
+            checkbox.setChecked(True)
+        self.window.inp_total_question.setValue(questions)
+        self.window.show_analytics()
+        self.students = [f"student {number}" for number in range(students)]
+        self.trace_memory = trace_memory
+        self.tests = 0
+        self.questions = 0
+        self.started = time.perf_counter()
+        self.samples = []
+        self.baseline = None
+
+    def run_test(self):
+        """
+        Takes one test, every fourth answer is wrong and every other test is adaptive
+        """
+        window = self.window
+        window.student = self.students[self.tests % len(self.students)]
+        window.chk_adaptive.setChecked(self.tests % 2 == 1)
+        while True:
+            window.start_testing()
+            correct = self.questions % 4 != 0
+            window.inp_result.setText(str(window.question.answer) if correct else "-1")
+            self.questions += 1
+            finished = window.test.total_questions == window.test.answered + 1
+            window.validate_result()
+            self.app.processEvents()
+            if finished:
+                break
+        self.tests += 1
+
+    def sample(self):
+        from PyQt6.QtCore import QObject
+        from PyQt6.QtWidgets import QApplication
+        gc.collect()
+        self.app.processEvents()
+        sample = {"tests": self.tests, "questions": self.questions,
+                  "seconds": time.perf_counter() - self.started, "rss_bytes": resident_bytes(),
+                  "python_objects": len(gc.get_objects()), "qt_widgets": len(QApplication.allWidgets()),
+                  "qt_objects": len(self.window.findChildren(QObject)),
+                  "gif_cache_bytes": self.window.gif_cache.stats()["bytes_held"],
+                  # Student data which grows with the answers, reported apart from the leaks
+                  "review_items": sum(len(queue) for queue in self.window.engine.review_queues.values())}
+        if self.trace_memory:
+            sample["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+        self.samples.append(sample)
+        return sample
+
+    def mark_baseline(self):
+        """
+        Ends the warm up, the growth is measured from the last sample
+        """
+        self.baseline = self.samples[-1]
+        if self.trace_memory:
+            self.baseline_snapshot = tracemalloc.take_snapshot()
+
+    def top_allocators(self, limit=TOP_ALLOCATORS):
+        """
+        Returns the allocation sites which grew the most since the end of the warm up
+        """
+        if not self.trace_memory or self.baseline is None:
+            return []
+        filters = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        differences = tracemalloc.take_snapshot().filter_traces(filters).compare_to(
+            self.baseline_snapshot.filter_traces(filters), "lineno")
+        return [{"file": stat.traceback[0].filename, "line": stat.traceback[0].lineno,
+                 "size_diff": stat.size_diff, "count_diff": stat.count_diff, "size": stat.size}
+                for stat in differences[:limit]]
+
+    def close(self):
+        self.window.close()
+        self.app.processEvents()
+
+
+def growth(baseline, last):
+    """
+    Returns the growth of every sampled value between two samples
+    """
+    return {name: last[name] - baseline[name] for name in last
+            if name not in ("tests", "questions", "seconds") and last[name] is not None
+            and baseline.get(name) is not None}
+
+
+def run(tests, questions, students=5, sample_every=100, warmup=200, trace_memory=False, progress=None):
+    """
+    Runs the soak test
+    :param tests: number of tests
+    :param questions: questions per test
+    :param warmup: tests taken before the growth is measured, the caches fill up during them
+    :param progress: called with every sample
+    :return: dictionary with the samples, the growth after the warm up and the top allocators
+    """
+    if trace_memory:
+        tracemalloc.start()
+    # The application reads its data folder and gif folder from the environment
+    with tempfile.TemporaryDirectory() as data_dir, \
+            environment(QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"), ADALAN_HOME=data_dir):
+        soak = Soak(data_dir, questions, students, trace_memory)
+        try:
+            soak.sample()
+            for test in range(1, tests + 1):
+                soak.run_test()
+                if test == warmup or test % sample_every == 0 or test == tests:
+                    sample = soak.sample()
+                    if progress is not None:
+                        progress(sample)
+                    if test == warmup:
+                        soak.mark_baseline()
+            if soak.baseline is None:
+                soak.mark_baseline()
+            result = {"tests": tests, "questions": soak.questions, "warmup": warmup, "samples": soak.samples,
+                      "growth": growth(soak.baseline, soak.samples[-1]), "top_allocators": soak.top_allocators()}
+        finally:
+            soak.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adalan soak test")
+    parser.add_argument("--tests", type=int, default=2000, help="number of tests")
+    parser.add_argument("--questions", type=int, default=20, help="questions per test")
+    parser.add_argument("--students", type=int, default=5, help="students taking the tests in turn")
+    parser.add_argument("--sample-every", type=int, default=100, help="tests between samples")
+    parser.add_argument("--warmup", type=int, default=200, help="tests taken before the growth is measured")
+    parser.add_argument("--max-rss-growth", type=float, default=16, help="allowed resident memory growth in MiB")
+    parser.add_argument("--max-object-growth", type=int, default=50, help="allowed growth of the live Qt objects")
+    parser.add_argument("--trace-memory", action="store_true", help="list the allocation sites which grew")
+    parser.add_argument("--output", help="write the samples to this JSON file")
+    args = parser.parse_args(argv)
+
+    def progress(sample):
+        rss = sample["rss_bytes"]
+        print(f"{sample['tests']:>7} tests {sample['questions']:>9} questions {sample['seconds']:>8.1f} s  "
+              f"RSS {rss / 2 ** 20 if rss else float('nan'):>7.1f} MiB  Qt objects {sample['qt_objects']:>6}  "
+              f"Python objects {sample['python_objects']:>8}", file=sys.stderr)
+
+    result = run(args.tests, args.questions, args.students, max(args.sample_every, 1),
+                 min(args.warmup, args.tests), args.trace_memory, progress)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+    for allocator in result["top_allocators"]:
+        print(f"{allocator['size_diff'] / 1024:>+10.1f} KiB {allocator['count_diff']:>+8} blocks  "
+              f"{allocator['file']}:{allocator['line']}")
+    growth_values = result["growth"]
+    failures = []
+    if growth_values.get("rss_bytes", 0) > args.max_rss_growth * 2 ** 20:
+        failures.append(f"resident memory grew by {growth_values['rss_bytes'] / 2 ** 20:.1f} MiB")
+    if growth_values["qt_objects"] > args.max_object_growth:
+        failures.append(f"{growth_values['qt_objects']} more live Qt objects")
+    for failure in failures:
+        print(f"LEAK {failure} after the warm up ({result['warmup']} tests)", file=sys.stderr)
+    if not failures:
+        print(f"Flat after the warm up: {json.dumps(growth_values)}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
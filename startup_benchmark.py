@@ -0,0 +1,93 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Cold and warm start up benchmark.
+
+    python startup_benchmark.py [--runs 5] [--ui-mode auto|compiled|runtime] [--json]
+
+Adalan is started several times with --startup-benchmark. The application
+prints the monotonic clock of the first paint of the main window and quits;
+the time to first paint is measured from the moment the process is started.
+The first run uses an empty bytecode cache (cold start), the following runs
+reuse it (warm start).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from app_paths import APP_DIR
+
+FIRST_PAINT_MARKER = "ADALAN_FIRST_PAINT"
+
+
+def report_first_paint(window):
+    """
+    Prints the monotonic clock when the window is painted the first time and quits the application
+    """
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                print(f"{FIRST_PAINT_MARKER} {time.monotonic()}", flush=True)
+                obj.removeEventFilter(self)
+                QTimer.singleShot(0, QApplication.instance().quit)
+            return False
+
+    window.first_paint_filter = FirstPaintFilter(window)
+    window.installEventFilter(window.first_paint_filter)
+
+
+def measure_start(env):
+    """
+    Starts Adalan once
+    :return: seconds from the start of the process to the first paint
+    """
+    started = time.monotonic()
+    output = subprocess.run([sys.executable, os.path.join(APP_DIR, "Adalan.py"), "--startup-benchmark"],
+                            cwd=APP_DIR, env=env, capture_output=True, text=True, timeout=120).stdout
+    for line in output.splitlines():
+        if line.startswith(FIRST_PAINT_MARKER):
+            return float(line.split()[1]) - started
+    raise RuntimeError(f"Adalan did not report the first paint:\n{output}")
+
+
+def run(runs=5, ui_mode="auto"):
+    """
+    Runs one cold and runs - 1 warm starts
+    :return: dictionary with the times in seconds
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=cache_dir, ADALAN_UI_MODE=ui_mode)
+        cold = measure_start(env)
+        warm = [measure_start(env) for _ in range(runs - 1)]
+    result = {"ui_mode": ui_mode, "cold_first_paint": cold, "warm_first_paint": warm}
+    if warm:
+        result["warm_first_paint_median"] = statistics.median(warm)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the time to first paint of Adalan")
+    parser.add_argument("--runs", type=int, default=5, help="number of starts, the first one is cold")
+    parser.add_argument("--ui-mode", default="auto", choices=["auto", "compiled", "runtime"])
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args()
+    results = run(max(args.runs, 1), args.ui_mode)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"UI mode: {results['ui_mode']}")
+        print(f"Cold start: {results['cold_first_paint'] * 1000:.1f} ms to first paint")
+        if results["warm_first_paint"]:
+            print(f"Warm start: {results['warm_first_paint_median'] * 1000:.1f} ms to first paint "
+                  f"(median of {len(results['warm_first_paint'])})")
@@ -0,0 +1,120 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import bisect
+import unittest
+import numpy as np
+from adaptive import MIN_WEIGHT, UNSEEN_WEIGHT, AdaptiveSampler, FenwickTree, operand_buckets
+
+SECOND = 10 ** 9
+
+
+class FenwickTreeTest(unittest.TestCase):
+    def check(self, tree, weights):
+        sums = np.concatenate([[0.0], np.cumsum(weights)])
+        for index in range(len(weights) + 1):
+            self.assertAlmostEqual(tree.prefix_sum(index), sums[index])
+        self.assertAlmostEqual(tree.total(), sums[-1])
+        # The item found is the first one whose cumulative weight is above the value
+        for value in np.linspace(0, sums[-1], 200, endpoint=False):
+            self.assertEqual(tree.find(value), bisect.bisect_right(sums, value) - 1)
+
+    def test_prefix_sums_and_find_after_updates(self):
+        rng = np.random.default_rng(1)
+        for size in (1, 2, 7, 8, 33):
+            weights = rng.random(size)
+            tree = FenwickTree(weights)
+            self.check(tree, weights)
+            for _ in range(50):
+                index = int(rng.integers(size))
+                weights[index] = 0.0 if rng.random() < 0.2 else rng.random() * 3
+                tree.set(index, weights[index])
+            if weights.sum():
+                self.check(tree, weights)
+
+    def test_zero_weights_are_never_drawn(self):
+        tree = FenwickTree([0.0, 1.0, 0.0, 3.0, 0.0])
+        rng = np.random.default_rng(1)
+        draws = np.bincount([tree.sample(rng) for _ in range(4000)], minlength=5)
+        self.assertEqual((draws[0], draws[2], draws[4]), (0, 0, 0))
+        self.assertAlmostEqual(draws[3] / draws[1], 3, delta=0.5)
+
+
+class OperandBucketsTest(unittest.TestCase):
+    def test_buckets_cover_the_range(self):
+        for start, end in ((0, 5), (0, 50), (1, 10 ** 6), (20, 90)):
+            buckets = operand_buckets(start, end)
+            self.assertEqual(buckets[0][0], start)
+            self.assertEqual(buckets[-1][1], end)
+            for (_, high), (low, _) in zip(buckets, buckets[1:]):
+                self.assertEqual(low, high + 1)
+
+
+class AdaptiveSamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.sampler = AdaptiveSampler(["Addition", "Multiplication"], 0, 50, rng=np.random.default_rng(1))
+
+    def answer(self, cells, correct, seconds, count=500):
+        """
+        Answers the questions drawn from the cells, the other questions are answered correctly and quickly
+        """
+        for _ in range(count):
+            question = self.sampler.next_question()
+            cell = (question.operator.name, self.bucket(question.x))
+            if cell in cells:
+                self.sampler.record(question, correct, int(seconds * SECOND))
+            else:
+                self.sampler.record(question, True, SECOND // 2)
+
+    def bucket(self, x):
+        return next(bucket for bucket in self.sampler.buckets if bucket[0] <= x <= bucket[1])
+
+    def test_unseen_cells_are_equal(self):
+        probabilities = set(self.sampler.probabilities().values())
+        self.assertEqual(len(probabilities), 1)
+        self.assertAlmostEqual(sum(self.sampler.probabilities().values()), 1)
+        self.assertEqual(set(self.sampler.weights.weights), {UNSEEN_WEIGHT})
+
+    def test_weight_moves_to_wrong_answers(self):
+        wrong = ("Multiplication", self.sampler.buckets[-1])
+        self.answer({wrong}, False, 1)
+        probabilities = self.sampler.probabilities()
+        self.assertEqual(max(probabilities, key=probabilities.get), wrong)
+        known = probabilities[("Addition", self.sampler.buckets[0])]
+        self.assertGreater(probabilities[wrong], 10 * known)
+
+    def test_weight_moves_to_slow_answers(self):
+        slow = ("Addition", self.sampler.buckets[3])
+        self.answer({slow}, True, 30)
+        probabilities = self.sampler.probabilities()
+        self.assertEqual(max(probabilities, key=probabilities.get), slow)
+        weights = self.sampler.weights.weights
+        self.assertAlmostEqual(min(weights), MIN_WEIGHT, delta=0.1)
+
+    def test_draws_follow_the_weights(self):
+        wrong = ("Addition", self.sampler.buckets[2])
+        self.answer({wrong}, False, 1)
+        draws = [self.sampler.next_question() for _ in range(2000)]
+        share = sum((question.operator.name, self.bucket(question.x)) == wrong for question in draws) / len(draws)
+        self.assertAlmostEqual(share, self.sampler.probabilities()[wrong], delta=0.05)
+
+    def test_pending_questions_are_settled(self):
+        first = self.sampler.next_question()
+        second = self.sampler.next_question()
+        self.assertEqual(len(self.sampler._pending), 2)
+        self.sampler.record(first, False, SECOND)
+        # Answering a question twice, or one which was not asked, changes nothing
+        weights = list(self.sampler.weights.weights)
+        self.sampler.record(first, False, SECOND)
+        self.assertEqual(self.sampler.weights.weights, weights)
+        self.sampler.discard(second)
+        self.sampler.record(second, False, SECOND)
+        self.assertEqual(self.sampler.weights.weights, weights)
+        self.assertEqual(self.sampler._pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
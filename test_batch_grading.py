@@ -0,0 +1,87 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from batch_grading import grade, grade_chunk
+
+
+def graded_row(student, operator, x, y, z=0, given=None, error=None):
+    return grade_chunk([("sheet.csv", 2, student, operator, x, y, z, given, error)])[0]
+
+
+class GradeChunkTest(unittest.TestCase):
+    def test_operands_beyond_int64(self):
+        row = graded_row("bob", "Addition", "99999999999999999999", "1", given="100000000000000000000")
+        self.assertEqual(row[8], 10 ** 20)
+        self.assertIs(row[9], True)
+        self.assertIsNone(row[10])
+
+    def test_large_cube_is_not_wrapped(self):
+        row = graded_row("bob", "Cube", "3000000", "3000000", "3", "27000000000000000000")
+        self.assertEqual(row[8], 27000000000000000000)
+        self.assertIs(row[9], True)
+
+    def test_large_division(self):
+        row = graded_row("bob", "Division", str(7 * 10 ** 30), str(10 ** 30), given="7")
+        self.assertIs(row[9], True)
+
+    def test_float_operand_is_rejected(self):
+        self.assertEqual(graded_row("bob", "Addition", 3.5, 1, given=4)[10], "Invalid operands")
+        self.assertIs(graded_row("bob", "Addition", 3.0, 1, given=4)[9], True)
+
+    def test_float_answer_is_rejected(self):
+        self.assertEqual(graded_row("bob", "Division", 7, 2, given=3.5)[10], "Invalid answer")
+        self.assertIs(graded_row("bob", "Division", 8, 2, given=4.0)[9], True)
+
+    def test_bad_row_does_not_stop_the_chunk(self):
+        rows = grade_chunk([("s.csv", 2, "bob", "Division", "1", "0", 0, "1", None),
+                            ("s.csv", 3, "bob", "Addition", "1", "2", 0, "3", None)])
+        self.assertEqual(rows[0][10], "Question can not be solved")
+        self.assertIs(rows[1][9], True)
+
+
+class GradeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def graded(self, *sheets):
+        output = os.path.join(self.directory, "graded.csv")
+        results = grade(list(sheets), output=output, workers=1)
+        with open(output, newline="", encoding="utf-8") as file:
+            return results, list(csv.DictReader(file))
+
+    def test_bad_rows_are_reported(self):
+        csv_sheet = self.write("sheet.csv", "student,operator,x,y,z,given\n"
+                                            "bob,Addition,99999999999999999999,1,,100000000000000000000\n"
+                                            "bob,Cube,3000000,3000000,3,27000000000000000000\n"
+                                            "bob,Addition,x,1,,2\n")
+        jsonl_sheet = self.write("sheet.jsonl", '{"student": "ann", "operator": "Addition", "x": 1, "y": 2, "given": 3}\n'
+                                                '{"student": "ann", "operator": \n'
+                                                '[1, 2]\n'
+                                                '{"student": "ann", "operator": "Addition", "x": 3.5, "y": 1, "given": 4}\n')
+        results, rows = self.graded(csv_sheet, jsonl_sheet)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual([row["correct"] for row in rows[:2]], ["True", "True"])
+        self.assertEqual([row["error"] for row in rows[2:]], ["Invalid operands", "", "Invalid JSON",
+                                                              "Not a JSON object", "Invalid operands"])
+        self.assertEqual((results["correct"], results["wrong"], results["invalid"]), (3, 0, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
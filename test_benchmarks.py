@@ -0,0 +1,62 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import os
+import shutil
+import tempfile
+import unittest
+import app_paths
+from benchmarks import environment, run
+
+
+class EnvironmentTest(unittest.TestCase):
+    def test_previous_values_are_restored(self):
+        previous = os.environ.get("ADALAN_HOME")
+        os.environ["ADALAN_HOME"] = "home"
+        os.environ.pop("ADALAN_GIF_ROOT_TEST", None)
+        try:
+            with self.assertRaises(RuntimeError):
+                with environment(ADALAN_HOME="temporary", ADALAN_GIF_ROOT_TEST="gifs"):
+                    self.assertEqual(os.environ["ADALAN_HOME"], "temporary")
+                    self.assertEqual(os.environ["ADALAN_GIF_ROOT_TEST"], "gifs")
+                    raise RuntimeError
+            self.assertEqual(os.environ["ADALAN_HOME"], "home")
+            self.assertNotIn("ADALAN_GIF_ROOT_TEST", os.environ)
+        finally:
+            if previous is None:
+                os.environ.pop("ADALAN_HOME")
+            else:
+                os.environ["ADALAN_HOME"] = previous
+
+
+class RunTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.temp = os.path.join(self.folder, "temp")
+        self.home = os.path.join(self.folder, "home")
+        self.gifs = os.path.join(self.folder, "gifs")
+        os.mkdir(self.temp)
+        os.mkdir(self.home)
+        self.tempdir = tempfile.tempdir
+        tempfile.tempdir = self.temp
+
+    def tearDown(self):
+        tempfile.tempdir = self.tempdir
+        shutil.rmtree(self.folder)
+
+    def test_nothing_is_left_behind(self):
+        # The data folder of the user is set, and app_paths is imported, before the benchmarks run
+        with environment(ADALAN_HOME=self.home, ADALAN_GIF_ROOT=self.gifs):
+            for _ in range(2):
+                run(["startup"])
+            self.assertEqual(app_paths.data_dir(), self.home)
+        self.assertEqual(os.listdir(self.temp), [])
+        self.assertEqual(os.listdir(self.home), [])
+        self.assertFalse(os.path.exists(self.gifs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from classroom_server import ClassroomServer
+from session import SessionEngine
+from session_store import SessionStore
+
+
+class LoopThreadEngine(SessionEngine):
+    """
+    Engine which records the threads its sessions are made on
+    """
+    def __init__(self, seed=None, store=None):
+        super().__init__(seed, store)
+        self.threads = set()
+
+    def new_session(self, student, settings, save=True):
+        self.threads.add(threading.get_ident())
+        return super().new_session(student, settings, save)
+
+
+class ClassroomServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SessionStore(os.path.join(self.directory, "classroom.db"))
+        self.engine = LoopThreadEngine(1, self.store)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def serve(self, client):
+        """
+        Runs client(request, server) against a server on a free port
+        """
+        async def main():
+            server = await ClassroomServer(self.engine, port=0).start()
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+
+            async def request(**message):
+                writer.write(json.dumps(message).encode("utf-8") + b"\n")
+                await writer.drain()
+                return json.loads(await reader.readline())
+
+            try:
+                return await client(request, server)
+            finally:
+                writer.close()
+                await server.close()
+
+        return asyncio.run(main())
+
+    def test_bad_delay_keeps_the_connection(self):
+        async def client(request, server):
+            responses = []
+            for delay in (10 ** 400, float("inf"), -1, 100000, True):
+                responses.append(await request(op="start", settings={"delay": delay}))
+            responses.append(await request(op="ping"))
+            return responses
+
+        *starts, ping = self.serve(client)
+        for response in starts:
+            self.assertFalse(response["ok"])
+            self.assertIn("delay", response["error"])
+        self.assertTrue(ping["ok"])
+
+    def test_failed_request_keeps_the_other_tests(self):
+        async def client(request, server):
+            started = await request(op="start", student="ann", settings={"delay": 0})
+
+            async def broken(student, settings):
+                raise RuntimeError("broken")
+
+            server.new_test = broken
+            failed = await request(op="start", student="ben", id=7)
+            answered = await request(op="answer", session=started["session"], answer="1")
+            return failed, answered
+
+        failed, answered = self.serve(client)
+        self.assertEqual(failed, {"ok": False, "error": "Request failed: RuntimeError: broken", "id": 7})
+        self.assertTrue(answered["ok"])
+        self.assertEqual(answered["number"], 1)
+
+    def test_engine_is_used_on_the_loop(self):
+        async def client(request, server):
+            for student in ("ann", "ben", "ann"):
+                response = await request(op="start", student=student, settings={"delay": 0})
+                self.assertTrue(response["ok"])
+            return threading.get_ident()
+
+        loop_thread = self.serve(client)
+        self.assertEqual(self.engine.threads, {loop_thread})
+        self.assertEqual(sorted(self.engine.review_queues), ["ann", "ben"])
+
+    def test_closed_tests_settle_the_adaptive_sampler(self):
+        settings = {"delay": 0, "adaptive": True, "total_questions": 5}
+
+        async def client(request, server):
+            closed = await request(op="start", student="ann", settings=settings)
+            await request(op="answer", session=closed["session"], answer="1")
+            await request(op="close", session=closed["session"])
+            # The other test is left open when the client disconnects
+            await request(op="start", student="ann", settings=settings)
+
+        self.serve(client)
+        sampler, = self.engine.adaptive_samplers.values()
+        self.assertEqual(sampler._pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
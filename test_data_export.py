@@ -0,0 +1,83 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import csv
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from data_export import ExportJob, export
+from operators import get_operator
+from questions import Question
+from session_store import SessionStore
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SessionStore(os.path.join(self.directory, "sessions.db"))
+        session_id, user_id = self.store.start_session("ann", 50)
+        for number in range(50):
+            question = Question(number, 2, get_operator("Addition"), number + 2)
+            self.store.record_answer(session_id, user_id, number + 1, question, number + 2, True, 1000000)
+        self.path = os.path.join(self.directory, "answers.csv")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def exported(self):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith("answers"))
+
+    def test_progress(self):
+        rows = []
+        self.assertEqual(export(self.store, self.path, chunk_size=20, progress=rows.append), 50)
+        self.assertEqual(rows, [20, 40, 50])
+        with open(self.path, newline="", encoding="utf-8") as file:
+            self.assertEqual(len(list(csv.reader(file))), 51)
+
+    def test_cancel_removes_the_partial_file(self):
+        cancel = threading.Event()
+        self.assertIsNone(export(self.store, self.path, chunk_size=20, progress=lambda rows: cancel.set(),
+                                 cancel=cancel))
+        self.assertEqual(self.exported(), [])
+
+    def test_job(self):
+        job = ExportJob(self.store, self.path, chunk_size=10)
+        self.assertTrue(job.wait(30))
+        self.assertIsNone(job.error)
+        self.assertEqual((job.result, job.rows_written), (50, 50))
+        self.assertEqual(self.exported(), ["answers.csv"])
+
+    def test_job_cancelled(self):
+        job = ExportJob(self.store, self.path, chunk_size=1)
+        job.cancel()
+        self.assertTrue(job.wait(30))
+        self.assertIsNone(job.result)
+        self.assertEqual(self.exported(), [])
+
+    def test_job_error(self):
+        job = ExportJob(self.store, os.path.join(self.directory, "answers.xlsx"))
+        self.assertTrue(job.wait(30))
+        self.assertIsInstance(job.error, ValueError)
+
+    def test_job_reports_any_error(self):
+        job = ExportJob(None, self.path)
+        self.assertTrue(job.wait(30))
+        self.assertIsInstance(job.error, AttributeError)
+
+    def test_error_removes_the_partial_file(self):
+        def progress(rows):
+            raise RuntimeError("disk full")
+
+        with self.assertRaises(RuntimeError):
+            export(self.store, self.path, chunk_size=20, progress=progress)
+        self.assertEqual(self.exported(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import io
+import unittest
+from error_log import ErrorLog, RingBuffer
+from error_log_model import ErrorLogFilter, ErrorLogModel, OPERATOR_ROLE
+from operators import get_operator
+from questions import Question
+
+
+def question(x, operator="Addition"):
+    return Question(x, 1, get_operator(operator), x + 1)
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_wraparound_keeps_the_order(self):
+        buffer = RingBuffer(3)
+        dropped = [buffer.append(item) for item in range(8)]
+        self.assertEqual(dropped, [None, None, None, 0, 1, 2, 3, 4])
+        self.assertEqual(list(buffer), [5, 6, 7])
+        self.assertEqual([buffer[0], buffer[1], buffer[2], buffer[-1]], [5, 6, 7, 7])
+        self.assertTrue(buffer.is_full())
+        with self.assertRaises(IndexError):
+            buffer[3]
+
+    def test_popleft_and_append_around_the_end(self):
+        buffer = RingBuffer(4)
+        for item in range(6):
+            buffer.append(item)
+        self.assertEqual(buffer.popleft(), 2)
+        buffer.append(6)
+        self.assertEqual(list(buffer), [3, 4, 5, 6])
+        while len(buffer):
+            buffer.popleft()
+        with self.assertRaises(IndexError):
+            buffer.popleft()
+        buffer.append(7)
+        self.assertEqual(list(buffer), [7])
+
+    def test_capacity(self):
+        with self.assertRaises(ValueError):
+            RingBuffer(0)
+        buffer = RingBuffer(1)
+        buffer.append(1)
+        self.assertEqual(buffer.append(2), 1)
+        self.assertEqual(list(buffer), [2])
+
+
+class ErrorLogTest(unittest.TestCase):
+    def test_capacity_drops_the_oldest(self):
+        log = ErrorLog(5)
+        for number in range(1, 13):
+            log.add(number, question(number, "Addition" if number % 2 else "Multiplication"), 0, answered_at=0)
+        self.assertEqual([entry.number for entry in log.entries], [8, 9, 10, 11, 12])
+        self.assertEqual(log.dropped, 7)
+        self.assertEqual(log.counts_by_operator(), {"Addition": 2, "Multiplication": 3})
+        self.assertEqual([entry.number for entry in log.filtered("Addition")], [9, 11])
+        output = io.StringIO()
+        log.export_csv(output, "Addition")
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+
+class ErrorLogModelTest(unittest.TestCase):
+    def setUp(self):
+        self.model = ErrorLogModel(ErrorLog(3))
+        self.events = []
+        self.model.rowsAboutToBeRemoved.connect(lambda parent, first, last: self.events.append(("remove", first, last)))
+        self.model.rowsInserted.connect(lambda parent, first, last: self.events.append(("insert", first, last)))
+
+    def rows(self, model=None):
+        model = model or self.model
+        return [model.data(model.index(row, 0)) for row in range(model.rowCount())]
+
+    def test_signals_when_full(self):
+        for number in range(1, 6):
+            self.model.add(number, question(number), 0)
+        self.assertEqual(self.events, [("insert", 0, 0), ("insert", 1, 1), ("insert", 2, 2),
+                                       ("remove", 0, 0), ("insert", 2, 2), ("remove", 0, 0), ("insert", 2, 2)])
+        self.assertEqual(self.rows(), ["3", "4", "5"])
+        self.assertEqual(self.model.data(self.model.index(2, 1)), "5 + 1")
+        self.assertEqual(self.model.data(self.model.index(2, 0), OPERATOR_ROLE), "Addition")
+
+    def test_filter(self):
+        proxy = ErrorLogFilter(self.model)
+        for number, operator in enumerate(("Addition", "Multiplication", "Addition", "Multiplication"), start=1):
+            self.model.add(number, question(number, operator), 0)
+        proxy.set_operator("Multiplication")
+        self.assertEqual(self.rows(proxy), ["2", "4"])
+        proxy.set_operator(None)
+        self.assertEqual(self.rows(proxy), ["2", "3", "4"])
+
+    def test_clear(self):
+        self.model.add(1, question(1), 0)
+        self.model.clear()
+        self.assertEqual(self.model.rowCount(), 0)
+        self.assertEqual(self.model.error_log.dropped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
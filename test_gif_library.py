@@ -0,0 +1,120 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from gif_library import CORRECT_DIR, WRONG_DIR, GifLibrary, read_gif_info
+
+
+def gif_bytes(width=1, height=1, frames=1):
+    """
+    Gif of blank frames with a two colour global palette
+    """
+    data = b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80, 0, 0) + b"\x00\x00\x00\xff\xff\xff"
+    for _ in range(frames):
+        data += b"\x21\xf9\x04\x00\x0a\x00\x00\x00"
+        data += b"\x2c" + struct.pack("<HHHHB", 0, 0, width, height, 0) + b"\x02\x02\x44\x01\x00"
+    return data + b"\x3b"
+
+
+class GifLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name in (CORRECT_DIR, WRONG_DIR):
+            os.mkdir(os.path.join(self.root, name))
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, data, mtime_ns=None):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def library(self, **kwargs):
+        return GifLibrary(self.root, manifest_path=self.manifest_path, **kwargs)
+
+    def test_read_gif_info(self):
+        path = self.write("frames.gif", gif_bytes(3, 2, 4))
+        self.assertEqual(read_gif_info(path), (3, 2, 4))
+
+    def test_refresh(self):
+        happy = self.write(os.path.join(CORRECT_DIR, "happy.gif"), gif_bytes())
+        sad = self.write(os.path.join(WRONG_DIR, "sad.gif"), gif_bytes())
+        self.write(os.path.join(WRONG_DIR, "notes.txt"), b"not a gif")
+        library = self.library()
+        self.assertTrue(library.refresh())
+        self.assertEqual(library.files(True), [happy])
+        self.assertEqual(library.files(False), [sad])
+        self.assertFalse(library.refresh())
+
+        # A new library starts from the saved manifest
+        library = self.library()
+        self.assertFalse(library.refresh())
+        self.assertEqual(library.files(True), [happy])
+
+        added = self.write(os.path.join(CORRECT_DIR, "added.gif"), gif_bytes(2, 2, 2))
+        self.assertTrue(library.refresh())
+        self.assertEqual(library.files(True), [added, happy])
+        self.assertEqual(library.info(added)["frames"], 2)
+
+        os.remove(happy)
+        self.assertTrue(library.refresh())
+        self.assertEqual(library.files(True), [added])
+
+        # Rewritten in place with a different size, the folder itself does not change
+        self.write(os.path.join(CORRECT_DIR, "added.gif"), gif_bytes(5, 4, 3))
+        self.assertTrue(library.refresh())
+        self.assertEqual((library.info(added)["width"], library.info(added)["frames"]), (5, 3))
+
+        # Same size, only the modification time tells it changed
+        stat = os.stat(added)
+        self.write(os.path.join(CORRECT_DIR, "added.gif"), gif_bytes(7, 4, 3), mtime_ns=stat.st_mtime_ns + 10 ** 9)
+        self.assertTrue(library.refresh())
+        self.assertEqual(library.info(added)["width"], 7)
+
+        shutil.rmtree(os.path.join(self.root, WRONG_DIR))
+        self.assertTrue(library.refresh())
+        self.assertEqual(library.files(False), [])
+        self.assertEqual(library.files(True), [added])
+
+    def test_broken(self):
+        good = self.write(os.path.join(CORRECT_DIR, "good.gif"), gif_bytes(2, 2, 1))
+        paths = {"text": self.write(os.path.join(CORRECT_DIR, "text.gif"), b"hello, this is not a gif"),
+                 "empty": self.write(os.path.join(CORRECT_DIR, "empty.gif"), b""),
+                 "header": self.write(os.path.join(WRONG_DIR, "header.gif"), gif_bytes()[:30]),
+                 "truncated": self.write(os.path.join(WRONG_DIR, "truncated.gif"), gif_bytes()[:-4]),
+                 "large": self.write(os.path.join(WRONG_DIR, "large.gif"), gif_bytes(100, 100, 3))}
+        library = self.library(max_pixels=10000)
+        library.refresh()
+        self.assertEqual(library.files(True), [good])
+        self.assertEqual(library.files(False), [])
+        errors = dict(library.broken())
+        self.assertEqual(set(errors), set(paths.values()))
+        self.assertEqual(errors[paths["text"]], "Not a gif file")
+        self.assertEqual(errors[paths["empty"]], "Not a gif file")
+        self.assertEqual(errors[paths["truncated"]], "Unexpected end of file")
+        self.assertEqual(errors[paths["large"]], "Gif too large")
+
+        # A gif fixed in place is shown again
+        self.write(os.path.join(WRONG_DIR, "truncated.gif"), gif_bytes())
+        self.assertTrue(library.refresh())
+        self.assertEqual(library.files(False), [paths["truncated"]])
+
+        library = self.library(max_size=10)
+        library.refresh()
+        self.assertEqual(dict(library.broken())[good], "File too large")
+
+
+if __name__ == "__main__":
+    unittest.main()
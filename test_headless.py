@@ -0,0 +1,50 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import contextlib
+import io
+import json
+import unittest
+from unittest import mock
+import numpy as np
+from headless import main, run_tests, simulated_answers
+from session import SessionEngine, make_settings
+
+
+class SimulateTest(unittest.TestCase):
+    def run_simulated(self, accuracy, seed=3):
+        settings = make_settings(0, 20, 12, ["Addition", "Subtraction", "Multiplication"], 5, False, False, False)
+        engine = SessionEngine(seed, None)
+        return run_tests(engine, "asha", settings, 2, simulated_answers(accuracy, np.random.default_rng(seed)))
+
+    def test_scores(self):
+        summaries, throughput = self.run_simulated(1.0)
+        self.assertEqual([summary["total_correct"] for summary in summaries], [12, 12])
+        self.assertEqual(throughput["questions"], 24)
+        summaries, _ = self.run_simulated(0.0)
+        self.assertEqual([summary["total_wrong"] for summary in summaries], [12, 12])
+        scores = [[(summary["total_correct"], summary["total_wrong"]) for summary in self.run_simulated(0.5)[0]]
+                  for _ in range(2)]
+        self.assertEqual(scores[0], scores[1])
+
+    def test_json(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(main(["--simulate", "1", "--questions", "5", "--tests", "3", "--seed", "1",
+                                   "--no-store", "--json"]), 0)
+        result = json.loads(output.getvalue())
+        self.assertEqual([summary["total_correct"] for summary in result["tests"]], [5, 5, 5])
+        self.assertEqual(result["throughput"]["questions"], 15)
+
+    def test_no_elapsed_time(self):
+        output = io.StringIO()
+        with mock.patch("headless.time.perf_counter", return_value=1.0), contextlib.redirect_stdout(output):
+            self.assertEqual(main(["--simulate", "0.5", "--questions", "3", "--seed", "1", "--no-store"]), 0)
+        self.assertIn("3 questions in 0.000 s (too fast to measure)", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import math
+import statistics
+import unittest
+import numpy as np
+from latency import BUCKET_GROWTH, MAX_LATENCY_NS, MIN_LATENCY_NS, LatencyHistogram, LatencyStats
+from operators import get_operator
+from questions import Question
+
+
+def answer_times(count, seed=1):
+    """
+    Response times of answers in nanoseconds, around 3 s with a long tail
+    """
+    return [int(value) for value in np.random.default_rng(seed).lognormal(math.log(3e9), 0.8, count)]
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def test_percentiles_within_the_bucket_error(self):
+        values = answer_times(20000)
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        ordered = sorted(values)
+        quantiles = statistics.quantiles(values, n=100, method="inclusive")
+        for percent in range(1, 100):
+            estimate = histogram.percentile(percent)
+            # Nearest rank, the bucket bound is at most one bucket above it
+            exact = ordered[math.ceil(len(values) * percent / 100) - 1]
+            self.assertGreaterEqual(estimate, exact)
+            self.assertLessEqual(estimate, exact * BUCKET_GROWTH)
+            self.assertAlmostEqual(estimate / quantiles[percent - 1], 1, delta=BUCKET_GROWTH - 1 + 0.01)
+        self.assertEqual(histogram.percentile(100), max(values))
+        self.assertEqual(histogram.count, len(values))
+        self.assertAlmostEqual(histogram.mean(), statistics.fmean(values))
+
+    def test_short_latencies(self):
+        values = [int(value) for value in np.random.default_rng(2).uniform(2000, 900000, 5000)]
+        histogram = LatencyHistogram(1000)
+        for value in values:
+            histogram.record(value)
+        ordered = sorted(values)
+        for percent in (10, 50, 90, 99):
+            exact = ordered[math.ceil(len(values) * percent / 100) - 1]
+            self.assertLessEqual(histogram.percentile(percent), exact * BUCKET_GROWTH)
+            self.assertGreaterEqual(histogram.percentile(percent), exact)
+
+    def test_out_of_range_values_are_clamped(self):
+        histogram = LatencyHistogram()
+        for value in (0, 10, 2 * MAX_LATENCY_NS):
+            histogram.record(value)
+        # Values below the floor share the first bucket
+        self.assertEqual(histogram.percentile(1), MIN_LATENCY_NS)
+        self.assertEqual(histogram.percentile(100), 2 * MAX_LATENCY_NS)
+        self.assertEqual(histogram.counts[-1], 1)
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertIsNone(histogram.mean())
+        self.assertEqual(histogram.summary(), {"count": 0, "mean": None, "min": None, "max": None, "p50": None,
+                                               "p90": None, "p99": None})
+
+    def test_merge(self):
+        values = answer_times(3000)
+        merged = LatencyHistogram()
+        single = LatencyHistogram()
+        parts = [LatencyHistogram() for _ in range(3)]
+        for index, value in enumerate(values):
+            parts[index % 3].record(value)
+            single.record(value)
+        # Merging an empty histogram changes nothing, in either direction
+        merged.merge(LatencyHistogram())
+        self.assertIsNone(merged.min_ns)
+        for part in parts:
+            merged.merge(part)
+        merged.merge(LatencyHistogram())
+        self.assertEqual(list(merged.counts), list(single.counts))
+        self.assertEqual(merged.summary(), single.summary())
+
+    def test_merge_different_bounds(self):
+        with self.assertRaises(ValueError):
+            LatencyHistogram().merge(LatencyHistogram(1000))
+
+
+class LatencyStatsTest(unittest.TestCase):
+    def test_histograms_per_operator_and_size(self):
+        stats = LatencyStats()
+        addition = get_operator("Addition")
+        multiplication = get_operator("Multiplication")
+        stats.record(Question(3, 4, addition, 7), 1e9)
+        stats.record(Question(30, 4, addition, 34), 2e9)
+        stats.record(Question(3, 4, multiplication, 12), 4e9)
+        self.assertEqual(stats.histogram().count, 3)
+        self.assertEqual(stats.histogram("Addition").count, 2)
+        self.assertEqual(stats.histogram(size=1).count, 2)
+        self.assertEqual(stats.histogram("Addition", 2).max_ns, 2e9)
+        self.assertEqual([(name, size) for name, size, _ in stats.summary()],
+                         [("Addition", 1), ("Addition", 2), ("Multiplication", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
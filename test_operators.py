@@ -0,0 +1,40 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import unittest
+import numpy as np
+from operators import MAX_EXPONENT, get_operator
+from questions import QuestionGenerator
+
+
+class PowerTest(unittest.TestCase):
+    def solve(self, name, bases):
+        bases = np.array(bases, dtype=np.int64)
+        operator = get_operator(name)
+        return operator.solve(bases.copy(), bases, np.full(len(bases), operator.exponent, dtype=np.int64))
+
+    def test_cube_at_the_int64_boundary(self):
+        # 2097151 ** 3 is the largest cube below 2 ** 63
+        self.assertEqual(self.solve("Cube", [2097151, 2097152, -2097152]),
+                         [2097151 ** 3, 2 ** 63, -2 ** 63])
+
+    def test_large_cube_is_exact(self):
+        self.assertEqual(self.solve("Cube", [822943677]), [822943677 ** 3])
+        self.assertEqual(self.solve("Square", [3037000500]), [3037000500 ** 2])
+
+    def test_generated_cubes_up_to_a_billion(self):
+        batch = QuestionGenerator(1).generate(200, 10 ** 9 - 1000, 10 ** 9, ["Cube", "Square"])
+        for question in batch:
+            self.assertEqual(question.answer, question.y ** question.z)
+
+    def test_exponent_out_of_range(self):
+        operator = get_operator("Exponent")
+        with self.assertRaises(ValueError):
+            operator.solve(np.zeros(1, dtype=np.int64), np.array([10]), np.array([MAX_EXPONENT + 1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
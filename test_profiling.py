@@ -0,0 +1,54 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import tracemalloc
+import unittest
+from profiling import SlotProfiler
+
+MIB = 2 ** 20
+
+
+class NestedSlotTest(unittest.TestCase):
+    def setUp(self):
+        self.tracing = tracemalloc.is_tracing()
+        self.profiler = SlotProfiler(trace_memory=True)
+
+    def tearDown(self):
+        if not self.tracing:
+            tracemalloc.stop()
+
+    def test_inner_slot_does_not_reset_outer_peak(self):
+        def inner():
+            return bytearray(1 * MIB)
+
+        profiled_inner = self.profiler.wrap("inner", inner)
+
+        def outer():
+            # The outer slot peaks at 8 MiB before it calls the inner one
+            buffer = bytearray(8 * MIB)
+            del buffer
+            profiled_inner()
+
+        self.profiler.wrap("outer", outer)()
+        outer_stats = self.profiler.stats("outer")
+        inner_stats = self.profiler.stats("inner")
+        self.assertGreaterEqual(outer_stats.allocated_max, 8 * MIB)
+        self.assertGreaterEqual(inner_stats.allocated_max, 1 * MIB)
+        self.assertLess(inner_stats.allocated_max, 2 * MIB)
+        self.assertGreaterEqual(self.profiler.results()["memory"]["peak_bytes"], 8 * MIB)
+
+    def test_inner_peak_counts_for_outer_slot(self):
+        def inner():
+            bytearray(4 * MIB)
+
+        profiled_inner = self.profiler.wrap("inner", inner)
+        self.profiler.wrap("outer", lambda: profiled_inner())()
+        self.assertGreaterEqual(self.profiler.stats("outer").allocated_max, 4 * MIB)
+        self.assertGreaterEqual(self.profiler.stats("inner").allocated_max, 4 * MIB)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import unittest
+import numpy as np
+from operators import MAX_SPACE_SIZE, OPERATORS, get_operator
+from questions import LazyPermutation, Question, QuestionGenerator
+
+RANGES = [(0, 0), (0, 1), (1, 1), (0, 5), (3, 7), (-3, 3), (-4, -1), (-3, 0), (0, 20)]
+
+
+def question_set(operator, x, y, z):
+    """
+    Returns the questions as (expression, answer), operands which are not shown are left out
+    """
+    answers = operator.solve(x, y, z)
+    return {(operator.expression(Question(a, b, operator, answer, c)), answer)
+            for a, b, c, answer in zip(x.tolist(), y.tolist(), z.tolist(), answers)}
+
+
+class LazyPermutationTest(unittest.TestCase):
+    def test_bijection(self):
+        for size in (1, 2, 3, 4, 5, 7, 16, 17, 100, 1000, 4097):
+            permutation = LazyPermutation(size, np.random.default_rng(size))
+            self.assertEqual(sorted(permutation[position] for position in range(size)), list(range(size)))
+
+    def test_take_continues_without_repeats(self):
+        permutation = LazyPermutation(1000, np.random.default_rng(1))
+        values = []
+        while permutation.remaining():
+            values.extend(permutation.take(300))
+        self.assertEqual(permutation.take(10), [])
+        self.assertEqual(sorted(values), list(range(1000)))
+        self.assertNotEqual(values, list(range(1000)))
+
+    def test_seeds_give_other_orders(self):
+        first = LazyPermutation(1000, np.random.default_rng(1)).take(1000)
+        second = LazyPermutation(1000, np.random.default_rng(2)).take(1000)
+        self.assertNotEqual(first, second)
+
+    def test_huge_size(self):
+        permutation = LazyPermutation(MAX_SPACE_SIZE, np.random.default_rng(1))
+        values = permutation.take(1000)
+        self.assertEqual(len(set(values)), 1000)
+        self.assertTrue(all(0 <= value < MAX_SPACE_SIZE for value in values))
+
+
+class OperandsAtTest(unittest.TestCase):
+    def test_same_questions_as_generate(self):
+        rng = np.random.default_rng(1)
+        for name, operator in OPERATORS.items():
+            for start, end in RANGES:
+                if name == "SquareRoot" and start < 0:
+                    continue
+                with self.subTest(operator=name, range=(start, end)):
+                    size = operator.space_size(start, end)
+                    space = question_set(operator, *operator.operands_at(np.arange(size, dtype=np.int64),
+                                                                        start, end))
+                    # Every position is another question
+                    self.assertEqual(len(space), size)
+                    generated = question_set(operator, *operator.generate(rng, start, end, 40 * size + 200))
+                    self.assertEqual(space, generated)
+
+    def test_division_of_zero_range(self):
+        division = get_operator("Division")
+        self.assertEqual(division.space_size(0, 0), 1)
+        x, y, z = division.operands_at(np.array([0]), 0, 0)
+        self.assertEqual((x.tolist(), y.tolist()), ([1], [1]))
+
+
+class UniqueQuestionsTest(unittest.TestCase):
+    def test_no_repeats_across_tests(self):
+        generator = QuestionGenerator(1)
+        operators = ["Addition", "Division", "Square", "Fraction"]
+        questions = []
+        for _ in range(4):
+            batch = generator.generate(20, 0, 30, operators, unique=True)
+            questions.extend((question.operator.name, question.operator.expression(question)) for question in batch)
+        self.assertEqual(len(set(questions)), len(questions))
+
+    def test_new_round_when_every_question_was_asked(self):
+        generator = QuestionGenerator(1)
+        size = get_operator("Addition").space_size(0, 4)
+        first = [str(question) for question in generator.generate(size, 0, 4, ["Addition"], unique=True)]
+        second = [str(question) for question in generator.generate(size, 0, 4, ["Addition"], unique=True)]
+        self.assertEqual(len(set(first)), size)
+        self.assertEqual(sorted(first), sorted(second))
+
+    def test_answers(self):
+        generator = QuestionGenerator(1)
+        for question in generator.generate(200, 0, 30, list(OPERATORS), unique=True):
+            self.assertEqual(question.operator.solve(np.array([question.x]), np.array([question.y]),
+                                                     np.array([question.z]))[0], question.answer)
+
+
+if __name__ == "__main__":
+    unittest.main()
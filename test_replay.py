@@ -0,0 +1,99 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from benchmarks import environment
+from replay import SessionRecorder, read_log, replay_headless, replay_window
+
+TESTS = 3
+QUESTIONS = 15
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.environment = environment(QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+                                       ADALAN_HOME=self.directory,
+                                       ADALAN_GIF_ROOT=os.path.join(self.directory, "gifs"))
+        self.environment.__enter__()
+        self.path = os.path.join(self.directory, "session.jsonl.gz")
+
+    def tearDown(self):
+        self.environment.__exit__(None, None, None)
+        shutil.rmtree(self.directory)
+
+    def record(self):
+        """
+        Takes tests in a recorded window: every third answer is wrong and one question a test runs out of time
+        :return: summaries of the tests
+        """
+        from PyQt6.QtWidgets import QApplication
+        from Adalan import MainWindow
+        from session_store import SessionStore
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        recorder = SessionRecorder(self.path)
+        window = MainWindow(seed=7, store=SessionStore(os.path.join(self.directory, "recorded.db")),
+                            recorder=recorder)
+        window.results_view().exec = lambda: 0
+        window.menu_auto_advance.setChecked(False)
+        window.show()
+        for checkbox in window.operator_checkboxes[:4]:
+            checkbox.setChecked(True)
+        window.inp_total_question.setValue(QUESTIONS)
+        window.student = "asha"
+        summaries = []
+        try:
+            for test_number in range(TESTS):
+                window.chk_adaptive.setChecked(test_number == 1)
+                for number in range(QUESTIONS):
+                    window.start_testing()
+                    # The count down is driven by the test, not by the clock
+                    window.timer.stop()
+                    test = window.test
+                    if number == 5:
+                        window.inp_result.setText("1")
+                        while window.start:
+                            window.show_time()
+                    else:
+                        correct = number % 3 != 0
+                        window.inp_result.setText(str(window.question.answer) if correct else "-1")
+                        window.validate_result()
+                    app.processEvents()
+                summaries.append(test.summary())
+        finally:
+            window.close()
+            recorder.close()
+            app.processEvents()
+        return summaries
+
+    def test_round_trip(self):
+        summaries = self.record()
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            self.assertEqual(json.loads(file.readline())["seed"], 7)
+        header, events = read_log(self.path)
+        kinds = {event[1] for event in events}
+        self.assertTrue({"settings", "start", "answer", "tick"} <= kinds)
+        for results in (replay_headless(header, events), replay_window(header, events)):
+            with self.subTest(mode=results["mode"]):
+                self.assertEqual(results["diverged"], 0, results["differences"])
+                self.assertEqual(results["answers"], TESTS * QUESTIONS)
+                self.assertEqual(results["tests"], summaries)
+
+    def test_not_a_log(self):
+        with open(self.path.replace(".gz", ""), "w", encoding="utf-8") as file:
+            file.write('{"something": 1}\n')
+        with self.assertRaises(ValueError):
+            read_log(self.path.replace(".gz", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
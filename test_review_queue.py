@@ -0,0 +1,73 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import os
+import shutil
+import tempfile
+import unittest
+from operators import get_operator
+from questions import Question
+from review_queue import BOX_DELAYS, ReviewQueue
+from session_store import SessionStore
+
+
+def question(x):
+    return Question(x, 1, get_operator("Addition"), x + 1)
+
+
+class ReviewQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "sessions.db")
+        self.store = SessionStore(self.path)
+        self.user_id = self.store.user_id("ann")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.store.close()
+        self.store = SessionStore(self.path)
+        return ReviewQueue(self.store, self.user_id)
+
+    def test_large_queue_is_kept(self):
+        queue = ReviewQueue(self.store, self.user_id)
+        for x in range(20000):
+            queue.record(question(x), False, now=1000 + x)
+        # Half of them answered correctly once, they wait in box 1
+        for x in range(0, 20000, 2):
+            queue.record(question(x), True, now=50000)
+        self.store.flush()
+        queue = self.reopen()
+        self.assertEqual(len(queue), 20000)
+        self.assertEqual(len(self.store.review_items(self.user_id)), 20000)
+        self.assertEqual(len(queue.due(100000, now=50000)), 10000)
+
+    def test_heap_stays_bounded(self):
+        queue = ReviewQueue()
+        for x in range(100):
+            queue.record(question(x), False, now=0)
+        # Every item is rescheduled many times without being taken out of the queue
+        for now in range(1, 200):
+            for x in range(100):
+                queue.record(question(x), now % 2 == 0, now=now)
+        self.assertEqual(len(queue), 100)
+        self.assertLessEqual(len(queue.heap), 2 * len(queue) + 64)
+        self.assertEqual(len(queue.due(1000, now=10 ** 9)), 100)
+
+    def test_retired_items_are_deleted(self):
+        queue = ReviewQueue(self.store, self.user_id)
+        queue.record(question(7), False, now=0)
+        for _ in BOX_DELAYS:
+            queue.record(question(7), True, now=0)
+        self.store.flush()
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(self.store.review_items(self.user_id), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
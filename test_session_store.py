@@ -0,0 +1,115 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from operators import get_operator
+from questions import Question
+from session_store import ANSWER_COLUMNS, SessionStore, rollup_rows
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "sessions.db")
+        self.store = SessionStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+
+class LargeAnswerTest(StoreTestCase):
+    def test_answers_beyond_int64_are_saved(self):
+        question = Question(10 ** 9, 10 ** 9, get_operator("Cube"), 10 ** 27, 3)
+        session_id, user_id = self.store.start_session("ada", 1)
+        self.store.record_answer(session_id, user_id, 1, question, 10 ** 27, True, 1000000)
+        self.store.record_answer(session_id, user_id, 2, question, 10 ** 400, False, 1000000)
+        self.store.flush()
+        answers = self.store.answers("ada")
+        self.assertEqual([answer["answer"] for answer in answers], [1e27, 1e27])
+        self.assertEqual(answers[0]["given"], 1e27)
+        self.assertEqual(len(answers), 2)
+
+
+class RollupTest(StoreTestCase):
+    def save_test(self, student, first, count, started_at):
+        session_id, user_id = self.store.start_session(student, count)
+        for number in range(count):
+            x = first + number * 37
+            question = Question(x, 7, get_operator("Addition" if number % 2 else "Multiplication"), x + 7)
+            self.store.record_answer(session_id, user_id, number + 1, question, x + 7 if number % 3 else 0,
+                                     number % 3 != 0, None if number == 4 else 1000000 * number,
+                                     started_at + number * 3600)
+
+    def recomputed(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            rows = connection.execute(f"SELECT {', '.join(ANSWER_COLUMNS)} FROM answers").fetchall()
+            return sorted(rollup_rows(rows)), sorted(connection.execute("SELECT * FROM rollups").fetchall())
+        finally:
+            connection.close()
+
+    def wait_backfill(self):
+        deadline = time.monotonic() + 30
+        while self.store.backfilling() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(self.store.backfilling())
+
+    def test_rollups_follow_the_answers(self):
+        self.save_test("ann", 5, 30, 1700000000)
+        self.save_test("bob", 9500, 20, 1700050000)
+        self.store.flush()
+        expected, rollups = self.recomputed()
+        self.assertEqual(rollups, expected)
+        totals = self.store.rollups(())
+        self.assertEqual(totals[0]["answers"], 50)
+        self.assertEqual(self.store.rollups((), user="bob")[0]["answers"], 20)
+
+    def test_backfill_of_an_old_database(self):
+        self.save_test("ann", 5, 30, 1700000000)
+        self.save_test("bob", 9500, 20, 1700050000)
+        self.store.close()
+        # A database written before the rollups existed
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("DELETE FROM rollups")
+        connection.execute("PRAGMA user_version = 0")
+        connection.close()
+
+        self.store = SessionStore(self.path)
+        # Saved while the old answers are rolled up, counted once
+        self.save_test("cid", 120, 10, 1700090000)
+        self.wait_backfill()
+        self.store.flush()
+        expected, rollups = self.recomputed()
+        self.assertEqual(rollups, expected)
+        self.assertEqual(self.store.rollups(())[0]["answers"], 60)
+
+    def test_interrupted_backfill_goes_on(self):
+        self.save_test("ann", 5, 30, 1700000000)
+        self.store.close()
+        connection = sqlite3.connect(self.path)
+        with connection:
+            # Stopped after the first 12 answers were rolled up
+            connection.execute("DELETE FROM rollups")
+            rows = connection.execute(f"SELECT {', '.join(ANSWER_COLUMNS)} FROM answers WHERE id <= 12").fetchall()
+            connection.executemany("INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rollup_rows(rows))
+            connection.execute("INSERT INTO rollup_backfill (next_id, end_id) VALUES (12, 30)")
+        connection.close()
+
+        self.store = SessionStore(self.path)
+        self.wait_backfill()
+        expected, rollups = self.recomputed()
+        self.assertEqual(rollups, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
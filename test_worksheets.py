@@ -0,0 +1,85 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from worksheets import WorksheetJob, key_path_for, write_worksheets
+
+
+class WorksheetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "worksheets.pdf")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_progress(self):
+        pages = []
+        result = write_worksheets(self.path, 5, 0, 20, ["Addition"], seed=1, progress=pages.append)
+        self.assertEqual(pages, [1, 2, 3, 4, 5])
+        self.assertEqual(result["pages"], 5)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(key_path_for(self.path)))
+
+    def test_cancel_removes_the_files(self):
+        cancel = threading.Event()
+
+        def progress(page):
+            if page == 3:
+                cancel.set()
+
+        self.assertIsNone(write_worksheets(self.path, 100, 0, 20, ["Addition"], seed=1, progress=progress,
+                                           cancel=cancel))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_job(self):
+        job = WorksheetJob(self.path, 20, 0, 20, ["Addition", "Multiplication"], True, seed=1)
+        self.assertTrue(job.wait(30))
+        self.assertIsNone(job.error)
+        self.assertEqual(job.pages_written, 20)
+        self.assertEqual(job.result["pages"], 20)
+
+    def test_job_cancelled(self):
+        job = WorksheetJob(self.path, 100000, 0, 20, ["Addition"])
+        job.cancel()
+        self.assertTrue(job.wait(30))
+        self.assertIsNone(job.result)
+        self.assertLess(job.pages_written, 100000)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_key_which_cannot_be_opened(self):
+        key_path = os.path.join(self.directory, "missing", "key.pdf")
+        with self.assertRaises(OSError):
+            write_worksheets(self.path, 2, 0, 20, ["Addition"], key_path=key_path)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failure_removes_the_files(self):
+        def progress(page):
+            raise MemoryError
+
+        with self.assertRaises(MemoryError):
+            write_worksheets(self.path, 5, 0, 20, ["Addition"], progress=progress)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_job_reports_any_error(self):
+        job = WorksheetJob(self.path, 1, 0, 20, ["NoSuchOperator"])
+        self.assertTrue(job.wait(30))
+        self.assertIsNotNone(job.error)
+        self.assertNotIsInstance(job.error, (OSError, ValueError))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_job_error(self):
+        job = WorksheetJob(os.path.join(self.directory, "worksheets.txt"), 1, 0, 20, ["Addition"])
+        self.assertTrue(job.wait(30))
+        self.assertIsInstance(job.error, ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
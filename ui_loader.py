@@ -0,0 +1,64 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Loads the Qt Designer ui files.
+
+The ui files are compiled to Python modules by build_ui.py. Importing the
+compiled module is much faster than parsing the XML with loadUi at every
+start. When the compiled module is missing or older than the ui file, the ui
+file is loaded at runtime.
+
+ADALAN_UI_MODE selects the mode: "auto" (default), "compiled" or "runtime".
+"""
+import importlib
+import os
+from PyQt6.uic import loadUi
+from app_paths import resource_path
+
+# ui file -> (compiled module, ui class)
+UI_MODULES = {"Adalan.ui": ("ui_adalan", "Ui_MainWindow"),
+              "Results.ui": ("ui_results", "Ui_Dialog"),
+              "Analytics.ui": ("ui_analytics", "Ui_Dialog")}
+UI_MODE = os.environ.get("ADALAN_UI_MODE", "auto")
+
+
+def compiled_is_current(module, ui_file):
+    """
+    Returns True if the compiled module is not older than the ui file
+    """
+    try:
+        return os.path.getmtime(module.__file__) >= os.path.getmtime(resource_path(ui_file))
+    except (OSError, TypeError, AttributeError):
+        # Bundled applications do not have the source files, the compiled module is used
+        return True
+
+
+def setup_ui(widget, ui_file, mode=None):
+    """
+    Creates the widgets of the ui file on widget. Like loadUi every named widget becomes an attribute of widget.
+    :param widget: widget to set up
+    :param ui_file: name of the ui file
+    :param mode: "auto", "compiled" or "runtime", defaults to ADALAN_UI_MODE
+    :return: "compiled" or "runtime", the mode which was used
+    """
+    mode = mode or UI_MODE
+    if mode != "runtime":
+        module_name, class_name = UI_MODULES[ui_file]
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            if mode == "compiled":
+                raise
+            module = None
+        if module is not None and (mode == "compiled" or compiled_is_current(module, ui_file)):
+            ui = getattr(module, class_name)()
+            ui.setupUi(widget)
+            for name, value in vars(ui).items():
+                setattr(widget, name, value)
+            return "compiled"
+    loadUi(resource_path(ui_file), widget)
+    return "runtime"
@@ -0,0 +1,311 @@
+#########################################################################
+#
+#   Designed and developed by Prabhu Kalaimani
+#   prabhu_tigers@yahoo.com
+#
+##########################################################################
+"""
+Printable worksheets with their answer key.
+
+    python worksheets.py OUTPUT.pdf|OUTPUT.html [--pages 100] [--operators Addition Division]
+                         [--range 0 50] [--vertical] [--no-repeat] [--seed SEED] [--key KEY_PATH]
+
+Questions are generated one page at a time with the same generator and
+operators as the tests, and every page is written to the worksheet and to
+the answer key as soon as it is generated, so the memory used does not
+depend on the number of pages. PDF files are written by a small built-in
+writer (standard fonts, compressed page contents), HTML files have one
+section per page and print one page per sheet. The application writes them
+with WorksheetJob, on a background thread which can be cancelled.
+"""
+import argparse
+import contextlib
+import html
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from operators import OPERATORS
+from questions import QuestionGenerator
+
+# A4 in points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 48
+FONT_SIZE = 13
+TITLE_SIZE = 16
+LINE_HEIGHT = 1.35 * FONT_SIZE
+# (columns, rows) of questions on a page, for the horizontal (False) and vertical (True) layouts
+GRID = {False: (2, 16), True: (5, 5)}
+ANSWER_BLANK = "______"
+
+
+def question_cell(number, question, vertical, key):
+    """
+    Returns the lines of text of one question
+    :param number: question number on the worksheet
+    :param key: True to write the answer, False to leave a blank
+    """
+    answer = str(question.answer) if key else ""
+    lines = question.lines(vertical)
+    if vertical:
+        width = max(len(lines[-1]), len(answer))
+        return [f"{number})"] + [line.rjust(width) for line in lines] + [answer.rjust(width)]
+    return [f"{number}) {lines[0]} = {answer or ANSWER_BLANK}"]
+
+
+class PdfWorksheet:
+    """
+    Minimal streaming PDF writer. Each page is written when it is added; only the object offsets
+    are kept for the cross reference table.
+    """
+    def __init__(self, path, title, key=False):
+        self.file = open(path, "wb")
+        self.title = title
+        self.key = key
+        self.position = 0
+        # Objects 1 and 2 (catalog and page tree) are written last, when every page is known
+        self.offsets = [None, None]
+        self.page_ids = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def _object(self, body, object_id=None):
+        if object_id is None:
+            self.offsets.append(None)
+            object_id = len(self.offsets)
+        self.offsets[object_id - 1] = self.position
+        self._write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+        return object_id
+
+    @staticmethod
+    def _text(x, y, font, size, text):
+        # Standard fonts have no square root sign
+        text = text.replace("√", "sqrt ").replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return f"BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({text}) Tj ET\n"
+
+    def add_page(self, page_number, cells, columns, rows):
+        """
+        Writes one page
+        :param cells: list of questions, each a list of lines
+        """
+        content = [self._text(MARGIN, PAGE_HEIGHT - MARGIN, "F1", TITLE_SIZE, self.title),
+                   self._text(PAGE_WIDTH - MARGIN - 60, PAGE_HEIGHT - MARGIN, "F1", 10, f"Page {page_number}")]
+        if not self.key:
+            content.append(self._text(MARGIN, PAGE_HEIGHT - MARGIN - 22, "F1", 10,
+                                      "Name: ______________________    Date: ____________"))
+        top = PAGE_HEIGHT - MARGIN - 60
+        cell_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+        cell_height = (top - MARGIN) / rows
+        for index, lines in enumerate(cells):
+            # Questions are numbered down the columns
+            column, row = divmod(index, rows)
+            x = MARGIN + column * cell_width
+            y = top - row * cell_height
+            for line in lines:
+                content.append(self._text(x, y, "F2", FONT_SIZE, line))
+                y -= LINE_HEIGHT
+        data = zlib.compress("".join(content).encode("cp1252", "replace"))
+        stream = self._object(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        self.page_ids.append(self._object(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {stream} 0 R >>".encode("ascii")))
+
+    def close(self):
+        kids = " ".join(f"{page} 0 R" for page in self.page_ids)
+        self._object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode("ascii"), 2)
+        self._object(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+        xref = self.position
+        table = [f"xref\n0 {len(self.offsets) + 1}\n", "0000000000 65535 f \n"]
+        table.extend(f"{offset:010d} 00000 n \n" for offset in self.offsets)
+        self._write("".join(table).encode("ascii"))
+        self._write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+                    .encode("ascii"))
+        self.file.close()
+
+
+class HtmlWorksheet:
+    """
+    Streaming HTML writer, one section per printed page
+    """
+    style = "body{font-family:sans-serif}section{page-break-after:always;padding:1em}" \
+            "h1{font-size:1.3em}.grid{display:grid;grid-auto-flow:column;gap:.4em 1em}" \
+            "pre{font-size:1.05em;margin:0}"
+
+    def __init__(self, path, title, key=False):
+        self.file = open(path, "w", encoding="utf-8")
+        self.title = title
+        self.key = key
+        self.file.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+                        f"<style>{self.style}</style></head><body>\n")
+
+    def add_page(self, page_number, cells, columns, rows):
+        self.file.write(f"<section><h1>{html.escape(self.title)} <small>page {page_number}</small></h1>\n")
+        if not self.key:
+            self.file.write("<p>Name: ______________________ Date: ____________</p>\n")
+        self.file.write(f"<div class=\"grid\" style=\"grid-template-columns:repeat({columns},1fr);"
+                        f"grid-template-rows:repeat({rows},auto)\">\n")
+        for lines in cells:
+            self.file.write(f"<pre>{html.escape(chr(10).join(lines))}</pre>\n")
+        self.file.write("</div></section>\n")
+
+    def close(self):
+        self.file.write("</body></html>\n")
+        self.file.close()
+
+
+WRITERS = {".pdf": PdfWorksheet, ".html": HtmlWorksheet, ".htm": HtmlWorksheet}
+
+
+def remove_files(paths):
+    """
+    Removes the files of an unfinished export
+    """
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def key_path_for(path):
+    name, extension = os.path.splitext(path)
+    return f"{name}_key{extension}"
+
+
+def write_worksheets(path, pages, start, end, operators, vertical=False, unique=False, seed=None, key_path=None,
+                     title="Adalan worksheet", progress=None, cancel=None):
+    """
+    Writes worksheets and their answer key, the format is taken from the file extension
+    :param pages: number of pages
+    :param operators: list of operator names
+    :param vertical: True for the vertical layout
+    :param unique: True to not repeat a question until every question of the operator was asked
+    :param key_path: path of the answer key, <name>_key.<extension> by default
+    :param progress: called with the number of pages written after every page
+    :param cancel: threading.Event, when it is set the files are removed and None is returned. They are also
+                   removed when writing them fails.
+    :return: number of pages and questions written
+    """
+    writer = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer is None:
+        raise ValueError(f"Unknown worksheet format, use one of {', '.join(WRITERS)}")
+    if len(operators) == 0:
+        raise ValueError("Chose at least one operator")
+    key_path = key_path or key_path_for(path)
+    generator = QuestionGenerator(seed)
+    columns, rows = GRID[vertical]
+    per_page = columns * rows
+    cancelled = False
+    # Files opened, they are removed if the export does not end
+    opened = []
+    try:
+        with contextlib.ExitStack() as stack:
+            worksheet = writer(path, title)
+            opened.append(path)
+            stack.callback(worksheet.close)
+            key = writer(key_path, f"{title} answer key", key=True)
+            opened.append(key_path)
+            stack.callback(key.close)
+            for page in range(pages):
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    break
+                batch = generator.generate(per_page, start, end, operators, unique)
+                first = page * per_page + 1
+                worksheet.add_page(page + 1, [question_cell(first + index, question, vertical, False)
+                                              for index, question in enumerate(batch)], columns, rows)
+                key.add_page(page + 1, [question_cell(first + index, question, vertical, True)
+                                        for index, question in enumerate(batch)], columns, rows)
+                if progress is not None:
+                    progress(page + 1)
+    except BaseException:
+        remove_files(opened)
+        raise
+    if cancelled:
+        remove_files(opened)
+        return None
+    return {"pages": pages, "questions": pages * per_page, "worksheet": path, "key": key_path}
+
+
+class WorksheetJob:
+    """
+    Writes worksheets on a background thread, the arguments are the ones of write_worksheets.
+    The application polls pages_written and done() instead of waiting for the pages.
+    """
+    def __init__(self, path, pages, *args, **kwargs):
+        self.pages = pages
+        self.pages_written = 0
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        kwargs.update(progress=self._progress, cancel=self._cancel)
+        self._thread = threading.Thread(target=self._run, args=(path, pages) + args, kwargs=kwargs,
+                                        name="worksheets", daemon=True)
+        self._thread.start()
+
+    def _run(self, *args, **kwargs):
+        try:
+            self.result = write_worksheets(*args, **kwargs)
+        except Exception as error:
+            self.error = error
+
+    def _progress(self, pages):
+        self.pages_written = pages
+
+    def cancel(self):
+        """
+        Stops the job after the page being written, the files are removed
+        """
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write printable worksheets and their answer key")
+    parser.add_argument("output", help="worksheet file, .pdf or .html")
+    parser.add_argument("--pages", type=int, default=10, help="number of pages")
+    parser.add_argument("--operators", nargs="+", default=["Addition"], choices=list(OPERATORS), metavar="OPERATOR",
+                        help=f"operators to ask, from: {', '.join(OPERATORS)}")
+    parser.add_argument("--range", nargs=2, type=int, default=[0, 50], metavar=("START", "END"),
+                        help="lowest and highest operand")
+    parser.add_argument("--vertical", action="store_true", help="put the operands one above the other")
+    parser.add_argument("--no-repeat", action="store_true", help="do not repeat a question")
+    parser.add_argument("--seed", type=int, help="seed of the questions")
+    parser.add_argument("--key", help="answer key file, OUTPUT_key by default")
+    parser.add_argument("--title", default="Adalan worksheet")
+    parser.add_argument("--trace-memory", action="store_true", help="print the peak memory used")
+    args = parser.parse_args(argv)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = write_worksheets(args.output, args.pages, args.range[0], args.range[1], args.operators,
+                                  args.vertical, args.no_repeat, args.seed, args.key, args.title)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - started
+    print(f"{result['pages']} pages ({result['questions']} questions) written to {result['worksheet']} "
+          f"and {result['key']} in {elapsed:.2f} s")
+    if args.trace_memory:
+        print(f"Peak memory: {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())